@@ -0,0 +1,101 @@
+"""
+Profiles peak and net memory per pipeline stage on real-world-sized
+Chinese pages, with timings, and checks for memory regressions
+Peak Python allocations (tracemalloc) are compared with a stored
+baseline; RSS figures are shown but not checked, as they vary with
+the allocator and platform
+
+Run from the project root:
+    python -m benchmarks.memory           # report and check
+    python -m benchmarks.memory --update  # report and store a new baseline
+"""
+
+import json
+import os
+import sys
+from benchmarks.parsers import PAGES, TEST_ASSETS, build_page
+from src.xiwen.app import analyse_html
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.memory import (
+    disable_memory_profiling,
+    enable_memory_profiling,
+    get_memory_profile,
+    reset_memory_profile,
+)
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "memory_baseline.json")
+# A stage regresses if its peak grows by more than this share of the
+# baseline, and by more than SLACK bytes (small stages are noisy)
+TOLERANCE = 0.25
+SLACK = 64 * 1024
+PARSERS = ["html.parser", "text"]
+
+
+def profile_pages() -> dict:
+    """Returns {page: {stage: profile row}} for each page and parser"""
+    profiles = dict()
+    for name, (filename, copies) in PAGES.items():
+        with open(os.path.join(TEST_ASSETS, filename), "r", encoding=ENCODING) as f:
+            markup = build_page(f.read(), copies)
+        for parser in PARSERS:
+            # Build cached reference data first so it is not counted
+            analyse_html(markup, parser)
+            reset_memory_profile()
+            enable_memory_profiling()
+            try:
+                analyse_html(markup, parser)
+            finally:
+                disable_memory_profiling()
+            rows = get_memory_profile().rows(named=True)
+            profiles[f"{name} ({parser})"] = {row["stage"]: row for row in rows}
+
+    return profiles
+
+
+def main() -> int:
+    update = "--update" in sys.argv[1:]
+    profiles = profile_pages()
+    baseline = dict()
+    if not update and os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding=ENCODING) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    print(
+        f"{'Page':<24}{'Stage':<17}{'Time (ms)':>10}{'Peak (KB)':>11}"
+        f"{'Net (KB)':>10}{'RSS peak (KB)':>15}{'Baseline':>10}"
+    )
+    for page, stages in profiles.items():
+        for stage, row in stages.items():
+            expected = baseline.get(page, {}).get(stage)
+            line = (
+                f"{page:<24}{stage:<17}{row['seconds'] * 1000:>10.1f}"
+                f"{row['peak_bytes'] / 1024:>11.0f}{row['net_bytes'] / 1024:>10.0f}"
+                f"{row['rss_peak_bytes'] / 1024:>15.0f}"
+            )
+            if expected is not None:
+                line += f"{expected / 1024:>10.0f}"
+                growth = row["peak_bytes"] - expected
+                if growth > SLACK and growth > TOLERANCE * expected:
+                    line += "  REGRESSION"
+                    regressions += 1
+            print(line)
+
+    if update:
+        peaks = {
+            page: {stage: row["peak_bytes"] for stage, row in stages.items()}
+            for page, stages in profiles.items()
+        }
+        with open(BASELINE_PATH, "w", encoding=ENCODING) as f:
+            json.dump(peaks, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif not baseline:
+        print("No baseline found - run with --update to store one")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Compares HTML parser backends on real-world-sized Chinese pages
+Times parsing only: hanzi extraction is identical for every backend
+Verifies every backend extracts the same hanzi as html.parser
+
+Run from the project root:
+    python -m benchmarks.parsers
+"""
+
+import os
+import sys
+import time
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.parse import PARSERS, lxml
+
+
+TEST_ASSETS = os.path.join(os.path.dirname(__file__), "..", "tests", "assets")
+PAGES = {
+    # name: (source text, copies of the text on the page)
+    "bjzd x1": ("bjzd.txt", 1),
+    "bjzd x10": ("bjzd.txt", 10),
+    "ttc x1": ("ttc.txt", 1),
+    "ttc x25": ("ttc.txt", 25),
+}
+REPEATS = 5
+
+
+def build_page(text: str, copies: int) -> str:
+    """
+    Wraps text in markup typical of a news or blog page:
+    navigation, attributes and scripts containing hanzi,
+    comments, character references and one <p> per line
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    nav = "".join(
+        f'<li><a href="/c/{i}" title="{line[:8]}">{line[:4]}</a></li>'
+        for i, line in enumerate(lines[:30])
+    )
+    body = "\n".join(
+        f'<p class="para" data-id="{i}">{line}&nbsp;&#x4e2d;&#25991;</p>'
+        for i, line in enumerate(lines)
+    )
+    script = '<script>var meta = {"title": "%s", "tags": ["&#20013;"]};</script>'
+    page = [
+        "<!DOCTYPE html>",
+        '<html lang="zh"><head><meta charset="utf-8">',
+        f"<title>{lines[0]}</title>",
+        script % lines[0],
+        "<style>.para { margin: 0 }</style>",
+        f"</head><body><nav><ul>{nav}</ul></nav><!-- 正文 开始 -->",
+    ]
+    page += [f"<article>{body}</article>" for _ in range(copies)]
+    page += ["<!-- 正文 结束 --><footer>版权所有 &copy; 2024</footer></body></html>"]
+
+    return "\n".join(page)
+
+
+def time_backend(parser, markup: str) -> float:
+    """Returns best-of-REPEATS seconds for parsing alone"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        parser(markup)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main() -> int:
+    backends = {k: v for k, v in PARSERS.items() if k != "lxml" or lxml is not None}
+    if "lxml" not in backends:
+        print("lxml not installed - skipping lxml backend")
+
+    mismatches = 0
+    print(f"{'Page':<10}{'Size (KB)':>10}" + "".join(f"{b:>14}" for b in backends))
+    for name, (filename, copies) in PAGES.items():
+        with open(os.path.join(TEST_ASSETS, filename), "r", encoding=ENCODING) as f:
+            markup = build_page(f.read(), copies)
+
+        # html.parser may reorder attributes so compare hanzi counts, not order
+        expected = sorted(filter_hanzi_from_html(PARSERS["html.parser"](markup)))
+        row = f"{name:<10}{len(markup.encode(ENCODING)) / 1024:>10.0f}"
+        for backend, parser in backends.items():
+            if sorted(filter_hanzi_from_html(parser(markup))) != expected:
+                print(f"MISMATCH: {backend} on {name}")
+                mismatches += 1
+            row += f"{time_backend(parser, markup) * 1000:>12.1f}ms"
+        print(row)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
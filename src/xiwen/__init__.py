@@ -1 +1,16 @@
+from .api import Analysis, analyse_file, analyse_text, analyse_url  # noqa: F401
+from .corpus import analyse_epub, analyse_warc  # noqa: F401
 from .interface import xw  # noqa: F401
+from .utils.memory import (  # noqa: F401
+    disable_memory_profiling,
+    enable_memory_profiling,
+    get_memory_profile,
+)
+from .utils.metrics import (  # noqa: F401
+    disable_metrics,
+    enable_metrics,
+    render_metrics,
+    serve_metrics,
+)
+from .utils.tracing import configure_tracing, disable_tracing  # noqa: F401
+from .utils.warm import load_snapshot, save_snapshot, warm_up  # noqa: F401
@@ -0,0 +1,232 @@
+import polars as pl
+from array import array
+from typing import Optional, Union
+from .utils.analyse import (
+    estimate_variant,
+    get_stats_df_from_counts,
+    identify_variant,
+)
+from .utils.config import HTML_PARSER
+from .utils.count import counts_by_hanzi, get_counts_per_hanzi
+from .utils.extract import filter_codepoints_from_html, read_codepoints, to_hanzi
+from .utils.heavy_hitters import SpaceSaving
+from .utils.html import fetch_html
+from .utils.parse import parse_html
+from .utils.transform import partition_hanzi
+
+
+class Analysis:
+    """
+    Result of analysing a text
+    Holds the hanzi as a compact codepoint array; counts and tables
+    are computed on first access and cached, so reading variant or
+    total_count never builds a DataFrame
+
+    Attributes
+    ----------
+    hanzi : array
+        codepoints of all hanzi in the text (with duplicates)
+
+    variant : str
+        hanzi variant of the text (Simplified|Traditional|Unknown)
+
+    outliers : array | SpaceSaving
+        codepoints of non-HSK hanzi, or a summary of the most frequent
+    """
+
+    __slots__ = (
+        "hanzi",
+        "variant",
+        "outliers",
+        "_hsk_hanzi",
+        "_counts",
+        "_hanzi_df",
+        "_stats_df",
+    )
+
+    def __init__(
+        self,
+        hanzi: array,
+        variant: str,
+        hsk_hanzi: array,
+        outliers: Union[array, SpaceSaving],
+    ):
+        self.hanzi = hanzi
+        self.variant = variant
+        self.outliers = outliers
+        # HSK hanzi of the variant, which hanzi_df counts
+        self._hsk_hanzi = hsk_hanzi
+        self._counts = None
+        self._hanzi_df = None
+        self._stats_df = None
+
+    def __repr__(self):
+        return (
+            f"Analysis(variant={self.variant!r}, total_count={self.total_count}, "
+            f"unique_count={self.unique_count})"
+        )
+
+    @property
+    def total_count(self) -> int:
+        """Number of hanzi in the text, with duplicates"""
+        return len(self.hanzi)
+
+    @property
+    def unique_count(self) -> int:
+        """Number of distinct hanzi in the text"""
+        return len(self.counts)
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """Occurrences of each hanzi in the text"""
+        if self._counts is None:
+            self._counts = counts_by_hanzi(self.hanzi)
+
+        return self._counts
+
+    @property
+    def hanzi_list(self) -> list[str]:
+        """All hanzi in the text as characters, as returned by coordinator"""
+        return to_hanzi(self.hanzi)
+
+    @property
+    def hanzi_df(self) -> pl.DataFrame:
+        """HSK hanzi with counts, as returned by coordinator"""
+        if self._hanzi_df is None:
+            self._hanzi_df = get_counts_per_hanzi(self._hsk_hanzi, self.variant)
+
+        return self._hanzi_df
+
+    @property
+    def stats_df(self) -> pl.DataFrame:
+        """Stats by HSK grade, as returned by coordinator, without hanzi_df"""
+        if self._stats_df is None:
+            self._stats_df = get_stats_df_from_counts(self.counts, self.variant)
+
+        return self._stats_df
+
+
+def analyse_text(
+    text: str,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+) -> Optional[Analysis]:
+    """
+    Analyses the hanzi in a text
+
+    Parameters
+    ----------
+    text : str
+        text to analyse; any non-hanzi characters are ignored
+
+    outliers_top_k : int | None
+        if set, outliers are a SpaceSaving summary of the most frequent
+        non-HSK hanzi instead of every occurrence
+
+    early_variant : bool
+        if True, the variant is estimated from a sample of the text first
+        so that only the HSK hanzi list for that variant is built
+
+    Returns
+    -------
+    _ : Analysis | None
+        result, or None if the text contains no HSK hanzi
+    """
+    return analyse_codepoints(
+        filter_codepoints_from_html(text), outliers_top_k, early_variant
+    )
+
+
+def analyse_file(
+    path: str,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+) -> Optional[Analysis]:
+    """
+    Analyses the hanzi in a local HTML or text file, which may be gzip,
+    bz2, zstd or xz compressed; it is streamed, never read in full
+
+    Parameters
+    ----------
+    path : str
+        file path
+
+    outliers_top_k, early_variant
+        see analyse_text
+
+    Returns
+    -------
+    _ : Analysis | None
+        result, or None if the file contains no HSK hanzi
+    """
+    return analyse_codepoints(read_codepoints(path), outliers_top_k, early_variant)
+
+
+def analyse_codepoints(
+    hanzi: array,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+) -> Optional[Analysis]:
+    """
+    Analyses extracted hanzi, see analyse_text
+
+    Parameters
+    ----------
+    hanzi : array
+        codepoints of all hanzi in a text (with duplicates)
+
+    outliers_top_k, early_variant
+        see analyse_text
+
+    Returns
+    -------
+    _ : Analysis | None
+        result, or None if there are no HSK hanzi
+    """
+    if not hanzi:
+        return None
+
+    variant = estimate_variant(hanzi)[0] if early_variant else None
+    simplified, traditional, outliers = partition_hanzi(hanzi, outliers_top_k, variant)
+    if not simplified and not traditional:
+        return None
+
+    if variant is None:
+        variant = identify_variant(simplified, traditional)
+    hsk_hanzi = simplified if variant == "Simplified" else traditional
+
+    return Analysis(hanzi, variant, hsk_hanzi, outliers)
+
+
+def analyse_url(
+    target_url: str,
+    parser: str = HTML_PARSER,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+) -> Optional[Analysis]:
+    """
+    Fetches a page and analyses the hanzi in its text
+
+    Parameters
+    ----------
+    target_url : str
+        URL to extract HTML from
+
+    parser : str
+        HTML parser backend (html.parser|lxml|text)
+
+    outliers_top_k, early_variant
+        see analyse_text
+
+    Returns
+    -------
+    _ : Analysis | None
+        result, or None if the page contains no HSK hanzi
+
+    Raises FetchError if the URL cannot be fetched
+    """
+    markup = fetch_html(target_url)
+    if not markup:
+        return None
+
+    return analyse_text(parse_html(markup, parser), outliers_top_k, early_variant)
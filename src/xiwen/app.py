@@ -1,9 +1,54 @@
-from .utils.analyse import analyse_hanzi
-from .utils.extract import get_hanzi_from_url
+import asyncio
+import multiprocessing
+import os
+import polars as pl
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Iterable, Optional
+from .utils.analyse import analyse_hanzi, estimate_variant, identify_variant
+from .utils.config import ASYNC_FETCH_WORKERS, ASYNC_QUEUE_SIZE, HTML_PARSER
+from .utils.extract import (
+    filter_codepoints_from_html,
+    filter_hanzi_from_html,
+    iter_hanzi_runs,
+    read_codepoints,
+    to_hanzi,
+)
+from .utils.html import fetch_html
+from .utils.memory import measure_memory
+from .utils.metrics import (
+    collect_metrics,
+    inc,
+    merge_metrics,
+    metrics_enabled,
+    timed,
+)
+from .utils.ngrams import count_ngrams, get_ngrams_df
+from .utils.parse import parse_html
+from .utils.scheduler import FetchError, FetchScheduler, get_scheduler
+from .utils.shared import attach_reference_tables, read_reference_tables
+from .utils.store import ResultStore
+from .utils.tracing import (
+    add_spans,
+    collect_spans,
+    current_span,
+    end_span,
+    get_trace_context,
+    span,
+    start_span,
+    use_span,
+)
 from .utils.transform import partition_hanzi
 
 
-def coordinator(target_url: str):
+def coordinator(
+    target_url: str,
+    parser: str = HTML_PARSER,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+    store: Optional[ResultStore] = None,
+    compact: bool = False,
+):
     """
     Handles calls throughout pipeline
 
@@ -11,15 +56,532 @@ def coordinator(target_url: str):
     ----------
     target_url : str
         URL to extract HTML from
+
+    parser : str
+        HTML parser backend (html.parser|lxml|text)
+
+    outliers_top_k : int | None
+        if set, outliers are returned as a SpaceSaving summary of the
+        most frequent non-HSK hanzi instead of every occurrence
+
+    early_variant : bool
+        if True, the variant is estimated from a sample of the text first
+        so that only the HSK hanzi list for that variant is built
+
+    store : ResultStore | None
+        if set, results are also appended to the store
+
+    compact : bool
+        if True, hanzi_list and outliers are array("I") codepoints, which
+        take several times less memory than lists of characters;
+        export_hanzi converts them back on export
+
+    Raises FetchError if the URL cannot be fetched
+    """
+    with span("coordinator", url=target_url):
+        markup = fetch_html(target_url)
+        if markup:
+            results = analyse_html(
+                markup, parser, outliers_top_k, early_variant, compact
+            )
+            if results and store is not None:
+                hanzi_df, stats_df, hanzi_list, outliers, variant = results
+                store.add(target_url, hanzi_list, stats_df, variant)
+
+            return results
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Records a pipeline stage in every enabled instrument: its duration
+    (metrics), a trace span, and its memory use (memory profiling)
+
+    Parameters
+    ----------
+    name : str
+        stage name, e.g. parse
+    """
+    with timed("xiwen_stage_seconds", stage=name), span(name):
+        with measure_memory(name):
+            yield
+
+
+def analyse_html(
+    markup: str,
+    parser: str = HTML_PARSER,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+    compact: bool = False,
+    stats_only: bool = False,
+):
+    """
+    Runs the CPU-bound stages of the pipeline on a fetched document
+    Defined at module level so it can be sent to a process pool
+
+    Parameters
+    ----------
+    markup : str
+        HTML document
+
+    parser : str
+        HTML parser backend (html.parser|lxml|text)
+
+    outliers_top_k : int | None
+        see coordinator
+
+    early_variant : bool
+        see coordinator
+
+    compact : bool
+        see coordinator
+
+    stats_only : bool
+        if True, hanzi_df is None and stats_df is computed without it
+    """
+    document = span("analyse_html", bytes=len(markup))
+    with document as document_span, measure_memory("analyse_html"):
+        with stage("parse"):
+            text = parse_html(markup, parser)
+        with stage("extract"):
+            if compact:
+                hanzi_list = filter_codepoints_from_html(text)
+            else:
+                hanzi_list = filter_hanzi_from_html(text)
+        document_span.set_attribute("hanzi", len(hanzi_list))
+
+        return analyse_extracted(hanzi_list, outliers_top_k, early_variant, stats_only)
+
+
+def analyse_path(
+    path: str,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+    compact: bool = False,
+    stats_only: bool = False,
+):
+    """
+    Runs the pipeline on a local HTML or text file, which may be gzip,
+    bz2, zstd or xz compressed (detected from its first bytes)
+    The file is decompressed and decoded in chunks straight into hanzi
+    extraction, so neither it nor its text is held in memory in full;
+    hanzi are found as by the text parser
+
+    Parameters
+    ----------
+    path : str
+        file path
+
+    outliers_top_k, early_variant, compact, stats_only
+        see analyse_html
+    """
+    document = span("analyse_path", path=path)
+    with document as document_span, measure_memory("analyse_path"):
+        with stage("extract"):
+            hanzi_list = read_codepoints(path)
+        if not compact:
+            hanzi_list = to_hanzi(hanzi_list)
+        document_span.set_attribute("hanzi", len(hanzi_list))
+
+        return analyse_extracted(hanzi_list, outliers_top_k, early_variant, stats_only)
+
+
+def analyse_extracted(
+    hanzi_list,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+    stats_only: bool = False,
+):
     """
-    hanzi_list = get_hanzi_from_url(target_url)
+    Runs the stages after hanzi extraction
 
+    Parameters
+    ----------
+    hanzi_list : list[str] | array
+        all hanzi of a document (with duplicates), as characters or
+        codepoints
+
+    outliers_top_k, early_variant, stats_only
+        see analyse_html
+    """
     if hanzi_list:
-        simplified, traditional, outliers = partition_hanzi(hanzi_list)
+        with stage("partition"):
+            variant = estimate_variant(hanzi_list)[0] if early_variant else None
+            simplified, traditional, outliers = partition_hanzi(
+                hanzi_list, outliers_top_k, variant
+            )
 
         if simplified or traditional:
-            hanzi_df, stats_df, variant = analyse_hanzi(
-                hanzi_list, simplified, traditional
-            )
+            with stage("analyse"):
+                hanzi_df, stats_df, variant = analyse_hanzi(
+                    hanzi_list, simplified, traditional, variant, stats_only
+                )
+            inc("xiwen_documents_total", result="analysed")
+            inc("xiwen_hanzi_total", len(hanzi_list))
+            current_span().set_attribute("variant", variant)
 
             return hanzi_df, stats_df, hanzi_list, outliers, variant
+
+    inc("xiwen_documents_total", result="empty")
+
+
+async def async_coordinator(
+    target_url: str,
+    parser: str = HTML_PARSER,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+    executor: Optional[Executor] = None,
+    scheduler: Optional[FetchScheduler] = None,
+    compact: bool = False,
+):
+    """
+    Non-blocking equivalent of coordinator for use inside an event loop
+    The request runs in a worker thread and analysis in executor;
+    retry backoff and rate limits are awaited
+
+    Parameters
+    ----------
+    target_url : str
+        URL to extract HTML from
+
+    parser, outliers_top_k, early_variant
+        see coordinator
+
+    executor : Executor | None
+        executor for the CPU-bound stages (None: the loop's default)
+
+    scheduler : FetchScheduler | None
+        retry and rate limit policy (None: the shared scheduler)
+
+    compact : bool
+        see coordinator
+
+    Raises FetchError if the URL cannot be fetched
+    """
+    loop = asyncio.get_running_loop()
+    with span("coordinator", url=target_url):
+        markup = await (scheduler or get_scheduler()).afetch(target_url)
+        if markup:
+            output = await loop.run_in_executor(
+                executor,
+                run_in_worker,
+                get_worker_context(),
+                analyse_html,
+                markup,
+                parser,
+                outliers_top_k,
+                early_variant,
+                compact,
+            )
+            return merge_worker_output(output)
+
+
+async def async_pipeline(
+    target_urls: Iterable[str],
+    parser: str = HTML_PARSER,
+    outliers_top_k: Optional[int] = None,
+    early_variant: bool = False,
+    executor: Optional[Executor] = None,
+    fetch_workers: int = ASYNC_FETCH_WORKERS,
+    queue_size: int = ASYNC_QUEUE_SIZE,
+    scheduler: Optional[FetchScheduler] = None,
+    compact: bool = False,
+    analysis_workers: Optional[int] = None,
+) -> AsyncIterator[tuple]:
+    """
+    Fetches and analyses many URLs, overlapping network I/O with analysis
+        - fetch_workers requests run concurrently in threads; retry
+          backoff and rate limits are awaited, so waiting holds no thread
+        - fetched documents wait in a queue of queue_size, and fetchers
+          pause while it is full, so memory stays bounded when analysis
+          is the bottleneck
+        - one analysis task per executor worker takes from the queue
+    URLs are consumed lazily, so target_urls may be a generator
+
+    Parameters
+    ----------
+    target_urls : Iterable[str]
+        URLs to extract HTML from
+
+    parser, outliers_top_k, early_variant
+        see coordinator
+
+    executor : Executor | None
+        executor for the CPU-bound stages (None: a process pool whose
+        workers share memory-mapped reference tables, shut down when the
+        pipeline ends)
+
+    fetch_workers : int
+        number of concurrent fetches
+
+    queue_size : int
+        maximum fetched documents awaiting analysis
+
+    scheduler : FetchScheduler | None
+        retry and rate limit policy (None: the shared scheduler)
+
+    compact : bool
+        see coordinator; codepoint arrays are also cheaper to send back
+        from worker processes
+
+    analysis_workers : int | None
+        number of analysis tasks, which should match the workers of
+        executor (None: os.cpu_count(), the size of the default pool)
+
+    Yields
+    ------
+    target_url : str
+        URL, in order of completion
+
+    result : tuple | FetchError | None
+        coordinator output for the URL, the error if it could not be
+        fetched, or None if it contains no HSK hanzi
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    executor, analysis_workers = get_analysis_executor(executor, analysis_workers)
+    fetch_executor = ThreadPoolExecutor(fetch_workers)
+    scheduler = scheduler or get_scheduler()
+    urls = iter(target_urls)
+    fetched = asyncio.Queue(maxsize=queue_size)
+    results = asyncio.Queue(maxsize=queue_size)
+    closing = asyncio.Event()
+
+    async def fetch():
+        # Workers share one iterator, so each URL is fetched once
+        for url in urls:
+            # One trace per URL, from its fetch to the end of its analysis
+            document = start_span("document", url=url)
+            try:
+                with use_span(document):
+                    markup = await scheduler.afetch(url, fetch_executor)
+            except FetchError as e:
+                end_span(document, e)
+                await results.put((url, e))
+            else:
+                await fetched.put((url, markup, document))
+
+    async def fetch_all():
+        try:
+            await asyncio.gather(*(fetch() for _ in range(fetch_workers)))
+        finally:
+            # Sentinels stop the analysis tasks, unless the pipeline is closing
+            if not closing.is_set():
+                for _ in range(analysis_workers):
+                    await fetched.put(None)
+
+    async def analyse():
+        while (item := await fetched.get()) is not None:
+            url, markup, document = item
+            result = None
+            with use_span(document):
+                try:
+                    if markup:
+                        output = await loop.run_in_executor(
+                            executor,
+                            run_in_worker,
+                            get_worker_context(),
+                            analyse_html,
+                            markup,
+                            parser,
+                            outliers_top_k,
+                            early_variant,
+                            compact,
+                        )
+                        result = merge_worker_output(output)
+                except BaseException as e:
+                    end_span(document, e)
+                    raise
+            end_span(document)
+            await results.put((url, result))
+
+    async def analyse_all():
+        try:
+            await asyncio.gather(*(analyse() for _ in range(analysis_workers)))
+        finally:
+            if not closing.is_set():
+                await results.put(None)
+
+    fetching = asyncio.create_task(fetch_all())
+    analysing = asyncio.create_task(analyse_all())
+    try:
+        while (item := await results.get()) is not None:
+            yield item
+        # Raise any error from the stages once the results are drained
+        await analysing
+        await fetching
+    finally:
+        closing.set()
+        for task in (fetching, analysing):
+            task.cancel()
+        await asyncio.gather(fetching, analysing, return_exceptions=True)
+        fetch_executor.shutdown(wait=False, cancel_futures=True)
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_pool_initializer() -> dict:
+    """
+    Process pool arguments that attach each worker to the shared
+    reference tables, or none if the tables file cannot be written
+    """
+    try:
+        read_reference_tables()
+    except OSError:
+        return dict()
+
+    return dict(initializer=attach_reference_tables)
+
+
+def get_analysis_executor(
+    executor: Optional[Executor] = None, workers: Optional[int] = None
+) -> tuple[Executor, int]:
+    """
+    Executor for the CPU-bound stages of a pipeline, and its worker count
+
+    Parameters
+    ----------
+    executor : Executor | None
+        executor given by the caller (None: a new process pool whose
+        workers share memory-mapped reference tables; the caller shuts
+        it down)
+
+    workers : int | None
+        number of workers of executor, or of the new pool
+        (None: os.cpu_count())
+
+    Returns
+    -------
+    executor : Executor
+        executor to submit analysis to
+
+    workers : int
+        number of its workers
+    """
+    workers = workers or os.cpu_count() or 1
+    if executor is not None:
+        return executor, workers
+    # Forking after polars has started its thread pool can deadlock
+    executor = ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        **get_pool_initializer(),
+    )
+
+    return executor, workers
+
+
+def get_worker_context() -> tuple:
+    """
+    Instrument settings of the calling process, and its current trace,
+    sent with each job to an executor so run_in_worker can match them
+    """
+    return os.getpid(), metrics_enabled(), get_trace_context()
+
+
+def run_in_worker(context: tuple, function: Callable, *args) -> tuple:
+    """
+    Runs function(*args) as instrumented as the process that sent it
+        - in a worker process, metrics are recorded if the sender records
+          them and returned with the result, as the sender cannot see the
+          worker's registry; in a thread of the sender they are recorded
+          directly
+        - spans are nested in the sender's current span and returned, to
+          be written with the sender's trace
+    Defined at module level so it can be sent to a process pool
+
+    Parameters
+    ----------
+    context : tuple
+        from get_worker_context, in the sending process
+
+    function : Callable
+        module-level function
+
+    Returns
+    -------
+    result
+        output of function
+
+    values : dict | None
+        metrics recorded in a worker process, see merge_worker_output
+
+    spans : list[Span]
+        spans of the job, see merge_worker_output
+    """
+    pid, metrics_on, trace_context = context
+    if os.getpid() == pid:
+        with collect_spans(trace_context) as spans:
+            result = function(*args)
+        return result, None, spans
+    with collect_metrics(metrics_on) as values, collect_spans(trace_context) as spans:
+        result = function(*args)
+
+    return result, values, spans
+
+
+def merge_worker_output(output: tuple):
+    """
+    Merges the metrics and spans sent back by run_in_worker into this
+    process's (spans join the current span's trace), and returns the result
+    """
+    result, values, spans = output
+    if values:
+        merge_metrics(values)
+    add_spans(spans)
+
+    return result
+
+
+def ngram_coordinator(
+    target_url: str,
+    n: int = 2,
+    top_k: Optional[int] = None,
+    max_entries: Optional[int] = None,
+    parser: str = HTML_PARSER,
+) -> Optional[pl.DataFrame]:
+    """
+    Handles calls for n-gram frequency analysis
+    Result can be exported with save_file like hanzi_df
+
+    Parameters
+    ----------
+    target_url : str
+        URL to extract HTML from
+
+    n : int
+        n-gram length (2: bigrams, 3: trigrams)
+
+    top_k : int | None
+        number of most frequent n-grams to return (None: all)
+
+    max_entries : int | None
+        n-gram table size that triggers pruning (None: exact counts)
+
+    parser : str
+        HTML parser backend (html.parser|lxml|text)
+
+    Returns
+    -------
+    ngrams_df : pl.DataFrame | None
+        n-grams with HSK grades and counts, None if the page is empty
+
+    Raises FetchError if the URL cannot be fetched
+    """
+    markup = fetch_html(target_url)
+    if not markup:
+        return None
+
+    unique_hanzi = set()
+
+    def runs():
+        for run in iter_hanzi_runs(parse_html(markup, parser)):
+            unique_hanzi.update(run)
+            yield run
+
+    counter = count_ngrams(runs(), n, max_entries)
+    # identify_variant compares sets, so unique hanzi suffice
+    simplified, traditional, _ = partition_hanzi(list(unique_hanzi))
+    variant = identify_variant(simplified, traditional)
+
+    return get_ngrams_df(counter, variant, top_k)
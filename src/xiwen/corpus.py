@@ -0,0 +1,330 @@
+import polars as pl
+from collections import deque
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Union
+from .app import (
+    analyse_html,
+    get_analysis_executor,
+    get_worker_context,
+    merge_worker_output,
+    run_in_worker,
+)
+from .utils.tracing import end_span, start_span, use_span
+from .utils.analyse import analyse_counts
+from .utils.config import CORPUS_PENDING_PER_WORKER, HTML_PARSER, WARC_MAX_PAYLOAD
+from .utils.count import counts_by_hanzi, merge_counts
+from .utils.decode import decode_html
+from .utils.epub import iter_epub_chapters
+from .utils.warc import iter_warc_responses
+
+
+def analyse_payload(
+    payload: bytes,
+    headers: Optional[Mapping] = None,
+    parser: str = HTML_PARSER,
+    early_variant: bool = False,
+) -> Optional[tuple[pl.DataFrame, str, dict[str, int]]]:
+    """
+    Decodes and analyses one document of a corpus
+    Defined at module level so it can be sent to a process pool; only
+    the stats and per-hanzi counts are sent back, not the hanzi
+
+    Parameters
+    ----------
+    payload : bytes
+        raw document, e.g. an HTTP response body
+
+    headers : Mapping | None
+        HTTP response headers, used for the declared charset
+
+    parser, early_variant
+        see analyse_html
+
+    Returns
+    -------
+    stats_df : pl.DataFrame
+        stats for the document
+
+    variant : str
+        hanzi variant of the document
+
+    counts : dict[str, int]
+        counts of every hanzi in the document, for merging
+
+    None if the document contains no HSK hanzi
+    """
+    markup = decode_html(payload, headers)
+    results = analyse_html(
+        markup, parser, early_variant=early_variant, compact=True, stats_only=True
+    )
+    if results is None:
+        return None
+    _, stats_df, hanzi_list, _, variant = results
+
+    return stats_df, variant, counts_by_hanzi(hanzi_list)
+
+
+def map_documents(
+    function: Callable,
+    documents: Iterable[tuple],
+    executor: Optional[Executor] = None,
+    max_pending: Optional[int] = None,
+    analysis_workers: Optional[int] = None,
+) -> Iterator[tuple]:
+    """
+    Runs function on documents in parallel, in order
+    At most max_pending documents are submitted ahead of the one being
+    collected, and documents are consumed lazily, so memory stays bounded
+    however many there are
+    A document whose function raises, or whose worker dies, yields the
+    error as its result and the iteration moves on; if a worker of the
+    default pool dies, later documents go to a new pool
+
+    Parameters
+    ----------
+    function : Callable
+        module-level function, called as function(*args); in worker
+        processes, its metrics are recorded as in this process
+
+    documents : Iterable[tuple]
+        (key, *args) per document
+
+    executor : Executor | None
+        executor to run function in (None: a process pool whose workers
+        share memory-mapped reference tables, shut down when done)
+
+    max_pending : int | None
+        documents in flight (None: CORPUS_PENDING_PER_WORKER per worker)
+
+    analysis_workers : int | None
+        number of workers of executor, or of the default pool
+        (None: os.cpu_count())
+
+    Yields
+    ------
+    key
+        key of the document, in order of documents
+
+    result
+        output of function for the document, or the Exception it raised
+    """
+    own_executor = executor is None
+    executor, workers = get_analysis_executor(executor, analysis_workers)
+    max_pending = max_pending or workers * CORPUS_PENDING_PER_WORKER
+    pending = deque()
+
+    def submit(context: tuple, args: list) -> Future:
+        nonlocal executor
+        try:
+            return executor.submit(run_in_worker, context, function, *args)
+        except BrokenProcessPool as e:
+            if not own_executor:
+                future = Future()
+                future.set_exception(e)
+                return future
+        # Documents in flight in the dead pool fail; later ones get a new one
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor, _ = get_analysis_executor(workers=workers)
+
+        return executor.submit(run_in_worker, context, function, *args)
+
+    def collect(key, future, document) -> tuple:
+        with use_span(document):
+            try:
+                result = merge_worker_output(future.result())
+            except Exception as e:
+                # A bad document must not end the corpus
+                end_span(document, e)
+                return key, e
+            except BaseException as e:
+                end_span(document, e)
+                raise
+        end_span(document)
+
+        return key, result
+
+    try:
+        for key, *args in documents:
+            # One trace per document
+            document = start_span("document", key=str(key))
+            with use_span(document):
+                context = get_worker_context()
+            pending.append((key, submit(context, args), document))
+            if len(pending) >= max_pending:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+    finally:
+        for _, future, _ in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CorpusAnalysis:
+    """
+    Per-document results of a corpus, produced lazily as it is iterated
+    Each document's hanzi counts are merged as it arrives, so stats for
+    the whole corpus need neither a second pass nor its hanzi
+
+    Attributes
+    ----------
+    counts : dict[str, int]
+        counts of every hanzi in the documents iterated so far
+
+    documents : int
+        documents iterated so far that contain HSK hanzi
+
+    empty : int
+        documents iterated so far that do not
+
+    failed : int
+        documents iterated so far whose analysis raised an error
+    """
+
+    def __init__(self, results: Iterable[tuple]):
+        self.results = iter(results)
+        self.counts = dict()
+        self.documents = 0
+        self.empty = 0
+        self.failed = 0
+
+    def __repr__(self):
+        return (
+            f"CorpusAnalysis(documents={self.documents}, empty={self.empty}, "
+            f"failed={self.failed})"
+        )
+
+    def __iter__(self) -> Iterator[tuple]:
+        """
+        Yields
+        ------
+        key : str
+            document key, e.g. target URI or chapter path
+
+        result : tuple[pl.DataFrame, str, dict[str, int]] | Exception | None
+            stats_df, variant and counts of the document, see
+            analyse_payload, the error its analysis raised, or None if
+            it contains no HSK hanzi
+        """
+        for key, result in self.results:
+            if result is None:
+                self.empty += 1
+            elif isinstance(result, Exception):
+                self.failed += 1
+            else:
+                self.documents += 1
+                merge_counts(self.counts, result[2])
+            yield key, result
+
+    def aggregate(self) -> Optional[tuple[pl.DataFrame, str]]:
+        """
+        Stats for the whole corpus, from the merged counts
+        Documents not yet iterated are analysed (and discarded) first
+
+        Returns
+        -------
+        _ : tuple[pl.DataFrame, str] | None
+            stats_df and variant, or None if there are no HSK hanzi
+        """
+        for _ in self:
+            pass
+
+        return analyse_counts(self.counts)
+
+
+def analyse_warc(
+    paths: Union[str, Iterable[str]],
+    parser: str = HTML_PARSER,
+    early_variant: bool = False,
+    executor: Optional[Executor] = None,
+    max_pending: Optional[int] = None,
+    max_payload: int = WARC_MAX_PAYLOAD,
+    analysis_workers: Optional[int] = None,
+) -> CorpusAnalysis:
+    """
+    Analyses the HTML and text responses of WARC archives, e.g. Common
+    Crawl .warc.gz files, record by record
+    Records are streamed from each file in turn and analysed in
+    parallel, so memory stays constant however large the archives
+
+    Parameters
+    ----------
+    paths : str | Iterable[str]
+        WARC file(s), possibly gzip, bz2, zstd or xz compressed
+
+    parser, early_variant
+        see analyse_html
+
+    executor, max_pending
+        see map_documents
+
+    max_payload : int
+        response records larger than this many bytes are skipped
+
+    analysis_workers
+        see map_documents
+
+    Returns
+    -------
+    _ : CorpusAnalysis
+        yields (target URI, result) per record; aggregate() gives stats
+        for all records
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    def records():
+        for path in paths:
+            for uri, payload, headers in iter_warc_responses(path, max_payload):
+                yield uri, payload, headers, parser, early_variant
+
+    return CorpusAnalysis(
+        map_documents(
+            analyse_payload, records(), executor, max_pending, analysis_workers
+        )
+    )
+
+
+def analyse_epub(
+    path: str,
+    parser: str = HTML_PARSER,
+    early_variant: bool = False,
+    executor: Optional[Executor] = None,
+    max_pending: Optional[int] = None,
+    analysis_workers: Optional[int] = None,
+) -> CorpusAnalysis:
+    """
+    Analyses an EPUB chapter by chapter, reading the chapters straight
+    from the zip in reading order and analysing them in parallel
+    Whole-book stats are merged from the chapters' counts, so the book
+    is not scanned twice
+
+    Parameters
+    ----------
+    path : str
+        EPUB file path
+
+    parser, early_variant
+        see analyse_html
+
+    executor, max_pending, analysis_workers
+        see map_documents
+
+    Returns
+    -------
+    _ : CorpusAnalysis
+        yields (chapter path, result) per chapter, in reading order;
+        aggregate() gives stats for the whole book
+    """
+
+    def chapters():
+        for chapter, content in iter_epub_chapters(path):
+            yield chapter, content, None, parser, early_variant
+
+    return CorpusAnalysis(
+        map_documents(
+            analyse_payload, chapters(), executor, max_pending, analysis_workers
+        )
+    )
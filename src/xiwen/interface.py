@@ -3,6 +3,7 @@ import random
 from .app import coordinator
 from .utils.config import DEMO1, DEMO2
 from .utils.export import export_hanzi
+from .utils.scheduler import FetchError
 from .utils.terminal_display import get_TerminalDisplay_instance
 
 
@@ -24,7 +25,15 @@ def xw():
             print(terminal_display.get_demo_message())
 
         if target_url:
-            hanzi_df, stats_df, hanzi_list, outliers, variant = coordinator(target_url)
+            try:
+                results = coordinator(target_url, compact=True)
+            except FetchError as e:
+                print(f"Could not fetch {target_url}: {e.reason}")
+                continue
+            if results is None:
+                print("No HSK hanzi found")
+                continue
+            hanzi_df, stats_df, hanzi_list, outliers, variant = results
 
             with pl.Config(
                 tbl_formatting="ASCII_MARKDOWN",
@@ -0,0 +1,341 @@
+import argparse
+import io
+import os
+import sqlite3
+import time
+import polars as pl
+from typing import Callable, Iterable, Iterator, Optional
+from .app import analyse_html, analyse_path
+from .utils.config import (
+    HTML_PARSER,
+    JOB_COMMIT_EVERY,
+    JOB_PROGRESS_EVERY,
+    STATS_COLUMNS,
+)
+from .utils.html import fetch_html
+from .utils.store import ResultStore
+
+
+# Statuses of completed items: analysed, no HSK hanzi found, or failed
+DONE, EMPTY, FAILED = "done", "empty", "failed"
+
+
+def read_manifest(path: str) -> Iterator[str]:
+    """
+    Reads a manifest of URLs and/or file paths, one per line
+    Blank lines and lines starting with # are skipped
+
+    Parameters
+    ----------
+    path : str
+        manifest file path
+
+    Yields
+    ------
+    item : str
+        URL or file path
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            item = line.strip()
+            if item and not item.startswith("#"):
+                yield item
+
+
+def is_url(item: str) -> bool:
+    return item.startswith(("http://", "https://"))
+
+
+def load_item(item: str) -> str:
+    """
+    Gets the HTML for a URL manifest item
+
+    Parameters
+    ----------
+    item : str
+        URL
+
+    Returns
+    -------
+    _ : str
+        decoded document
+    """
+    return fetch_html(item)
+
+
+def analyse_item(item: str, parser: str = HTML_PARSER):
+    """
+    Analyses a manifest item, see analyse_html
+    Files are streamed (and decompressed) straight into extraction
+    whatever the parser, so a large file is never held in memory in full;
+    their hanzi are found as by the text parser
+
+    Parameters
+    ----------
+    item : str
+        URL or file path, possibly compressed
+
+    parser : str
+        HTML parser backend (html.parser|lxml|text) for URLs
+    """
+    if not is_url(item):
+        return analyse_path(item, stats_only=True)
+
+    return analyse_html(load_item(item), parser, stats_only=True)
+
+
+class Checkpoint:
+    """
+    SQLite record of completed job items and their results
+    Results are committed in transactions of commit_every items, so a
+    crash loses at most the uncommitted batch and never a partial row
+
+    Attributes
+    ----------
+    path : str
+        database file path
+
+    commit_every : int
+        completed items per transaction
+
+    before_commit : Callable[[], None] | None
+        called before each transaction, e.g. to flush a ResultStore so
+        that items are never marked complete before their results are saved
+    """
+
+    def __init__(
+        self,
+        path: str,
+        commit_every: int = JOB_COMMIT_EVERY,
+        before_commit: Optional[Callable[[], None]] = None,
+    ):
+        self.path = path
+        self.commit_every = commit_every
+        self.before_commit = before_commit
+        self.pending = []
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS items (
+                    item TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    variant TEXT,
+                    stats TEXT,
+                    error TEXT,
+                    finished_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get_completed(self, include_failed: bool = True) -> set[str]:
+        """Items already recorded (including any not yet committed)"""
+        query = "SELECT item FROM items"
+        if not include_failed:
+            query += f" WHERE status != '{FAILED}'"
+        completed = {row[0] for row in self.conn.execute(query)}
+        completed.update(
+            row[0] for row in self.pending if include_failed or row[1] != FAILED
+        )
+
+        return completed
+
+    def record(
+        self,
+        item: str,
+        status: str,
+        variant: Optional[str] = None,
+        stats_df: Optional[pl.DataFrame] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        stats = stats_df.write_json(row_oriented=True) if stats_df is not None else None
+        self.pending.append((item, status, variant, stats, error, time.time()))
+        if len(self.pending) >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        if not self.pending:
+            return
+        if self.before_commit is not None:
+            self.before_commit()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?)", self.pending
+            )
+        self.pending = []
+
+    def get_result(self, item: str) -> Optional[tuple]:
+        """
+        Gets the recorded result for an item
+
+        Returns
+        -------
+        status : str
+            done|empty|failed
+
+        variant : str | None
+            hanzi variant, if analysed
+
+        stats_df : pl.DataFrame | None
+            stats for the item, if analysed
+
+        error : str | None
+            failure reason, if failed
+
+        None if the item has not been recorded
+        """
+        self.commit()
+        row = self.conn.execute(
+            "SELECT status, variant, stats, error FROM items WHERE item = ?", (item,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, variant, stats, error = row
+        if stats is not None:
+            stats = pl.read_json(io.StringIO(stats), schema=STATS_COLUMNS)
+
+        return status, variant, stats, error
+
+    def get_progress(self) -> dict:
+        """Number of recorded items per status"""
+        self.commit()
+        progress = {DONE: 0, EMPTY: 0, FAILED: 0}
+        for status, count in self.conn.execute(
+            "SELECT status, COUNT(*) FROM items GROUP BY status"
+        ):
+            progress[status] = count
+
+        return progress
+
+    def close(self) -> None:
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_progress(
+    progress: dict, processed: int, skipped: int, elapsed: float
+) -> str:
+    """One-line summary of a job's progress"""
+    rate = processed / elapsed if elapsed > 0 else 0.0
+
+    return (
+        f"{progress[DONE]} done, {progress[EMPTY]} empty, {progress[FAILED]} failed "
+        f"({skipped} skipped as already completed, {rate:.1f} items/s)"
+    )
+
+
+def run_job(
+    items: Iterable[str],
+    checkpoint_path: str,
+    parser: str = HTML_PARSER,
+    retry_failed: bool = False,
+    progress_every: int = JOB_PROGRESS_EVERY,
+    store: Optional[ResultStore] = None,
+) -> dict:
+    """
+    Analyses every item of a manifest, resuming from a checkpoint
+    Items recorded by an earlier run are skipped, so a restart only
+    costs reading the checkpoint; an item raising any error is recorded
+    as failed, with the error, and the job moves on
+
+    Parameters
+    ----------
+    items : Iterable[str]
+        URLs and/or file paths, e.g. from read_manifest
+
+    checkpoint_path : str
+        SQLite checkpoint file (created if missing)
+
+    parser : str
+        HTML parser backend (html.parser|lxml|text) for URLs
+
+    retry_failed : bool
+        if True, items that failed in an earlier run are attempted again
+
+    progress_every : int
+        items between progress reports (0: no reports)
+
+    store : ResultStore | None
+        if set, results are also appended to the store, which is flushed
+        before each checkpoint transaction (a crash in between can
+        store an item twice, but never lose it)
+
+    Returns
+    -------
+    progress : dict
+        number of items per status (done|empty|failed) in the checkpoint
+    """
+    start = time.perf_counter()
+    processed, skipped = 0, 0
+    before_commit = store.flush if store is not None else None
+    with Checkpoint(checkpoint_path, before_commit=before_commit) as checkpoint:
+        completed = checkpoint.get_completed(include_failed=not retry_failed)
+        for item in items:
+            if item in completed:
+                skipped += 1
+                continue
+            completed.add(item)  # Manifests may repeat items
+            try:
+                result = analyse_item(item, parser)
+            except Exception as e:
+                # A bad item must not stop the job, or crash every resume
+                checkpoint.record(item, FAILED, error=f"{type(e).__name__}: {e}")
+            else:
+                if result is None:
+                    checkpoint.record(item, EMPTY)
+                else:
+                    _, stats_df, hanzi_list, _, variant = result
+                    if store is not None:
+                        store.add(item, hanzi_list, stats_df, variant)
+                    checkpoint.record(item, DONE, variant, stats_df)
+
+            processed += 1
+            if progress_every and processed % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                progress = checkpoint.get_progress()
+                print(format_progress(progress, processed, skipped, elapsed))
+
+        progress = checkpoint.get_progress()
+        elapsed = time.perf_counter() - start
+        print(format_progress(progress, processed, skipped, elapsed))
+
+    return progress
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Command line entry point for resumable jobs
+    e.g. python -m src.xiwen.jobs urls.txt --checkpoint urls.sqlite
+    """
+    parser = argparse.ArgumentParser(description="Analyse a manifest of URLs/files")
+    parser.add_argument("manifest", help="file listing one URL or path per line")
+    parser.add_argument(
+        "--checkpoint", help="SQLite checkpoint (default: <manifest>.sqlite)"
+    )
+    parser.add_argument("--parser", default=HTML_PARSER, help="HTML parser backend")
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="retry items that failed before"
+    )
+    parser.add_argument("--store", help="ResultStore directory for per-item results")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or os.path.splitext(args.manifest)[0] + ".sqlite"
+    store = ResultStore(args.store) if args.store else None
+    run_job(
+        read_manifest(args.manifest),
+        checkpoint_path,
+        args.parser,
+        args.retry_failed,
+        store=store,
+    )
+
+
+if __name__ == "__main__":
+    main()
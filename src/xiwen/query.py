@@ -0,0 +1,234 @@
+import argparse
+import polars as pl
+from typing import Optional, Sequence
+from .utils.config import COVERAGE_THRESHOLDS, HSK_GRADES
+from .utils.ngrams import OUTLIER_GRADE
+from .utils.score import score_documents
+from .utils.store import scan_counts, scan_documents
+
+
+# Quantiles reported by coverage_distribution
+COVERAGE_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def coverage_share(max_grade: int) -> pl.Expr:
+    """Share of a document's hanzi (by count) at or below max_grade"""
+    if not 1 <= max_grade <= HSK_GRADES:
+        raise ValueError(
+            f"max_grade must be between 1 and {HSK_GRADES}, got {max_grade}"
+        )
+    counts = [pl.col(f"hsk{g}_count") for g in range(1, max_grade + 1)]
+
+    return pl.sum_horizontal(counts) / pl.col("total_count")
+
+
+def documents_by_coverage(
+    root: str, max_grade: int = 4, min_share: float = 0.95, **filters
+) -> pl.LazyFrame:
+    """
+    Documents where at least min_share of hanzi are HSK max_grade or below,
+    e.g. 95% of characters HSK 1-4
+
+    Parameters
+    ----------
+    root : str
+        ResultStore directory
+
+    max_grade : int
+        highest HSK grade counted as covered (1 to HSK_GRADES)
+
+    min_share : float
+        minimum covered share (0 to 1)
+
+    filters
+        date_from, date_to, domains (see scan_dataset); non-matching
+        partitions are never read
+
+    Returns
+    -------
+    _ : pl.LazyFrame
+        url, domain, date, variant, total_count and coverage per document,
+        highest coverage first
+    """
+    documents = scan_documents(root, **filters)
+
+    return (
+        documents.filter(pl.col("total_count") > 0)
+        .select(
+            "url",
+            "domain",
+            "date",
+            "variant",
+            "total_count",
+            coverage_share(max_grade).alias("coverage"),
+        )
+        .filter(pl.col("coverage") >= min_share)
+        .sort(["coverage", "url"], descending=[True, False])
+    )
+
+
+def top_outliers(root: str, top_k: int = 10, **filters) -> pl.LazyFrame:
+    """
+    Most frequent hanzi beyond HSK in each domain
+
+    Parameters
+    ----------
+    root : str
+        ResultStore directory
+
+    top_k : int
+        hanzi per domain
+
+    filters
+        date_from, date_to, domains (see scan_dataset); non-matching
+        partitions are never read
+
+    Returns
+    -------
+    _ : pl.LazyFrame
+        domain, hanzi, count and number of documents containing it
+    """
+    counts = scan_counts(root, **filters)
+
+    return (
+        counts.filter(pl.col("grade") == OUTLIER_GRADE)
+        .group_by("domain", "hanzi")
+        .agg(pl.col("count").cast(pl.Int64).sum(), pl.len().alias("documents"))
+        .sort(["domain", "count", "hanzi"], descending=[False, True, False])
+        .group_by("domain", maintain_order=True)
+        .head(top_k)
+    )
+
+
+def coverage_distribution(
+    root: str, quantiles: Sequence[float] = COVERAGE_QUANTILES, **filters
+) -> pl.LazyFrame:
+    """
+    Distribution across documents of cumulative coverage by HSK grade,
+    e.g. the median share of hanzi at HSK 3 or below
+
+    Parameters
+    ----------
+    root : str
+        ResultStore directory
+
+    quantiles : Sequence[float]
+        quantiles to report
+
+    filters
+        date_from, date_to, domains (see scan_dataset); non-matching
+        partitions are never read
+
+    Returns
+    -------
+    _ : pl.LazyFrame
+        one row per grade: number of documents, mean and quantiles
+    """
+    documents = scan_documents(root, **filters)
+    grades = [str(g) for g in range(1, HSK_GRADES + 1)]
+
+    return (
+        documents.filter(pl.col("total_count") > 0)
+        .select(coverage_share(int(g)).alias(g) for g in grades)
+        .melt(value_vars=grades, variable_name="grade", value_name="coverage")
+        .group_by(pl.col("grade").cast(pl.Int8))
+        .agg(
+            pl.len().alias("documents"),
+            pl.col("coverage").mean().alias("mean"),
+            *[
+                pl.col("coverage").quantile(q).alias(f"p{round(q * 100)}")
+                for q in quantiles
+            ],
+        )
+        .sort("grade")
+    )
+
+
+def document_scores(
+    root: str, thresholds: Sequence[float] = COVERAGE_THRESHOLDS, **filters
+) -> pl.LazyFrame:
+    """
+    Coverage thresholds, difficulty and unknown share for stored documents
+    Sort the result to rank candidate texts for a learner
+
+    Parameters
+    ----------
+    root : str
+        ResultStore directory
+
+    thresholds : Sequence[float]
+        coverage shares (0 to 1) to find the minimum grade for
+
+    filters
+        date_from, date_to, domains (see scan_dataset); non-matching
+        partitions are never read
+
+    Returns
+    -------
+    _ : pl.LazyFrame
+        one row of scores per document (see score_documents)
+    """
+    counts = scan_counts(root, **filters)
+
+    return score_documents(counts, ["url", "domain", "date"], thresholds)
+
+
+def collect(lf: pl.LazyFrame) -> pl.DataFrame:
+    """Runs a query with the streaming engine, in batches rather than all at once"""
+    return lf.collect(streaming=True)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Command line entry point for stored result queries
+    e.g. python -m src.xiwen.query store/ coverage --max-grade 4 --min-share 0.95
+    """
+    parser = argparse.ArgumentParser(description="Query stored xiwen results")
+    parser.add_argument("root", help="ResultStore directory")
+    parser.add_argument("--date-from", help="first date, YYYY-MM-DD")
+    parser.add_argument("--date-to", help="last date, YYYY-MM-DD")
+    parser.add_argument("--domain", action="append", help="domain (repeatable)")
+    parser.add_argument("--output", help="write to CSV or Parquet instead of printing")
+    queries = parser.add_subparsers(dest="query", required=True)
+
+    coverage = queries.add_parser("coverage", help="documents by HSK coverage")
+    coverage.add_argument(
+        "--max-grade", type=int, default=4, choices=range(1, HSK_GRADES + 1)
+    )
+    coverage.add_argument("--min-share", type=float, default=0.95)
+    outliers = queries.add_parser("outliers", help="top non-HSK hanzi by domain")
+    outliers.add_argument("--top-k", type=int, default=10)
+    queries.add_parser("distribution", help="coverage quantiles per HSK grade")
+    scores = queries.add_parser("scores", help="readability scores per document")
+    scores.add_argument("--sort", default="difficulty", help="column to rank by")
+    scores.add_argument("--descending", action="store_true")
+    scores.add_argument("--limit", type=int, help="number of documents to show")
+
+    args = parser.parse_args(argv)
+    filters = dict(date_from=args.date_from, date_to=args.date_to, domains=args.domain)
+
+    if args.query == "coverage":
+        lf = documents_by_coverage(args.root, args.max_grade, args.min_share, **filters)
+    elif args.query == "outliers":
+        lf = top_outliers(args.root, args.top_k, **filters)
+    elif args.query == "distribution":
+        lf = coverage_distribution(args.root, **filters)
+    else:
+        lf = document_scores(args.root, **filters).sort(
+            [args.sort, "url"], descending=[args.descending, False]
+        )
+        if args.limit:
+            lf = lf.head(args.limit)
+
+    df = collect(lf)
+    if not args.output:
+        with pl.Config(tbl_rows=-1, tbl_hide_dataframe_shape=True):
+            print(df)
+    elif args.output.lower().endswith(".parquet"):
+        df.write_parquet(args.output)
+    else:
+        df.write_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
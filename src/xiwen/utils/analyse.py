@@ -1,24 +1,36 @@
+import math
 import polars as pl
-from .config import HSK_GRADES, STATS_COLUMNS
+from array import array
+from typing import Iterable, Optional, Union
+from .config import (
+    HSK_GRADES,
+    STATS_COLUMNS,
+    VARIANT_CONFIDENCE,
+    VARIANT_SAMPLE_SIZE,
+    VARIANT_THRESHOLD,
+)
 from .count import (
+    counts_by_hanzi,
+    get_counts_per_hsk_grade_from_counts,
     get_cumulative_counts_per_hsk_grade,
     get_counts_per_hanzi,
     get_counts_per_hanzi_per_hsk_grade,
 )
-from .transform import filter_dataframe_by_hanzi_variant
+from .hsk_hanzi import get_exclusive_hanzi
+from .transform import filter_dataframe_by_hanzi_variant, partition_hanzi
 
 
-def identify_variant(simplified: list, traditional: list) -> str:
+def variant_from_counts(num_simplified: float, num_traditional: float) -> str:
     """
     Identifies text as Simplified or Traditional based on character ratio
 
     Parameters
     ----------
-    simplified : list
-        simplified characters in HSK1 to HSK7-9 found in content
+    num_simplified : float
+        number of unique hanzi found only in the simplified set
 
-    traditional : list
-        traditional equivalents to simplified found in content
+    num_traditional : float
+        number of unique hanzi found only in the traditional set
 
     Returns
     -------
@@ -26,14 +38,12 @@ def identify_variant(simplified: list, traditional: list) -> str:
         text character variant
     """
     epsilon = 0.0000000001  # mitigate float rounding errors
-    threshold = 0.90  # to decide which variant text belongs to
-    simplified_set = set(simplified) - set(traditional)
-    traditional_set = set(traditional) - set(simplified)
+    threshold = VARIANT_THRESHOLD  # to decide which variant text belongs to
 
-    if not simplified_set and not traditional_set:
+    if not num_simplified and not num_traditional:
         return "Unknown"
 
-    ratio = len(simplified_set) / (len(simplified_set) + len(traditional_set))
+    ratio = num_simplified / (num_simplified + num_traditional)
     if ratio >= threshold - epsilon:
         return "Simplified"
     elif ratio <= 1 - threshold + epsilon:
@@ -41,6 +51,136 @@ def identify_variant(simplified: list, traditional: list) -> str:
     return "Unknown"
 
 
+def identify_variant(simplified: list, traditional: list) -> str:
+    """
+    Identifies text as Simplified or Traditional based on character ratio
+
+    Parameters
+    ----------
+    simplified : list
+        simplified characters in HSK1 to HSK7-9 found in content
+
+    traditional : list
+        traditional equivalents to simplified found in content
+
+    Returns
+    -------
+    _ : str
+        text character variant
+    """
+    simplified_set = set(simplified) - set(traditional)
+    traditional_set = set(traditional) - set(simplified)
+
+    return variant_from_counts(len(simplified_set), len(traditional_set))
+
+
+def get_variant_confidence(num_simplified: int, num_traditional: int) -> dict:
+    """
+    Estimates how likely each variant is from a sample of unique hanzi
+    Each confidence is a one-sided normal approximation that the
+    simplified share of all unique variant-exclusive hanzi in the text
+    falls within that variant's range of variant_from_counts
+
+    Parameters
+    ----------
+    num_simplified : int
+        number of sampled unique hanzi found only in the simplified set
+
+    num_traditional : int
+        number of sampled unique hanzi found only in the traditional set
+
+    Returns
+    -------
+    _ : dict
+        confidence per variant (Simplified|Traditional|Unknown)
+    """
+    n = num_simplified + num_traditional
+    if not n:
+        return {"Simplified": 0.0, "Traditional": 0.0, "Unknown": 0.0}
+
+    ratio = num_simplified / n
+    upper, lower = VARIANT_THRESHOLD, 1 - VARIANT_THRESHOLD
+    standard_error = math.sqrt(upper * lower / n)
+
+    def above(bound: float) -> float:
+        # P(true ratio > bound) under the normal approximation
+        return 0.5 * (1 + math.erf((ratio - bound) / (standard_error * math.sqrt(2))))
+
+    return {
+        "Simplified": above(upper),
+        "Traditional": 1 - above(lower),
+        "Unknown": max(above(lower) - above(upper), 0.0),
+    }
+
+
+def estimate_variant(
+    hanzi_list: Iterable[str],
+    sample_size: int = VARIANT_SAMPLE_SIZE,
+    confidence: float = VARIANT_CONFIDENCE,
+) -> tuple[str, float]:
+    """
+    Identifies the character variant early from a prefix sample
+    Scans hanzi in order until sample_size unique variant-exclusive hanzi
+    are found, then decides if one variant reaches the confidence level
+    Otherwise falls back to the full computation of identify_variant
+
+    Parameters
+    ----------
+    hanzi_list : Iterable[str] | array
+        all characters (with duplicates) found in target content,
+        or their codepoints in an array("I")
+
+    sample_size : int
+        unique variant-exclusive hanzi to sample before deciding
+
+    confidence : float
+        confidence required to decide from the sample
+
+    Returns
+    -------
+    variant : str
+        text character variant
+
+    confidence : float
+        confidence of the decision (1.0 if computed from the full text)
+    """
+    exclusive = get_exclusive_hanzi()
+    simplified_only, traditional_only = (
+        exclusive["Simplified"],
+        exclusive["Traditional"],
+    )
+    sampled = {"Simplified": set(), "Traditional": set()}
+    hanzi_iter = (
+        map(chr, hanzi_list) if isinstance(hanzi_list, array) else iter(hanzi_list)
+    )
+    unique = set()
+
+    for zi in hanzi_iter:
+        unique.add(zi)
+        if zi in simplified_only:
+            sampled["Simplified"].add(zi)
+        elif zi in traditional_only:
+            sampled["Traditional"].add(zi)
+        else:
+            continue
+        if len(sampled["Simplified"]) + len(sampled["Traditional"]) >= sample_size:
+            confidences = get_variant_confidence(
+                len(sampled["Simplified"]), len(sampled["Traditional"])
+            )
+            variant = max(confidences, key=confidences.get)
+            if confidences[variant] >= confidence:
+                return variant, confidences[variant]
+            break
+
+    # Sample exhausted the text or was ambiguous: use every unique hanzi
+    unique.update(hanzi_iter)
+    variant = variant_from_counts(
+        len(unique & simplified_only), len(unique & traditional_only)
+    )
+
+    return variant, 1.0
+
+
 def compute_stats(
     raw_counts: list[list[int]], get_cumulative_counts_per_hsk_grade: list[list[int]]
 ) -> list[list]:
@@ -148,7 +288,11 @@ def compute_stats(
 
 
 def analyse_hanzi(
-    hanzi_list: list, simplified: list, traditional: list
+    hanzi_list: list,
+    simplified: list,
+    traditional: list,
+    variant: str = None,
+    stats_only: bool = False,
 ) -> tuple[str, pl.DataFrame]:
     """
     Gets character variant and statistical breakdowns
@@ -157,19 +301,28 @@ def analyse_hanzi(
 
     Parameters
     ----------
-    hanzi_list : list
-        all characters (with duplicates) found in target content
+    hanzi_list : list | array
+        all characters (with duplicates) found in target content,
+        or their codepoints in an array("I")
 
-    simplified : list
-        simplified HSK hanzi in hanzi_list
+    simplified : list | array
+        simplified HSK hanzi in hanzi_list (same form as hanzi_list)
 
-    traditional : list
-        traditional HSK equivalents in hanzi_list
+    traditional : list | array
+        traditional HSK equivalents in hanzi_list (same form as hanzi_list)
+
+    variant : str
+        hanzi variant if already known, e.g. from estimate_variant
+        (default: identified from simplified and traditional)
+
+    stats_only : bool
+        if True, stats_df is computed straight from per-hanzi counts
+        and hanzi_df is not built
 
     Returns
     -------
-    hanzi_df : pl.DataFrame
-        df of hanzi_list with counts added
+    hanzi_df : pl.DataFrame | None
+        df of hanzi_list with counts added (None if stats_only)
 
     stats_df : pl.DataFrame
         stats for the content
@@ -177,16 +330,100 @@ def analyse_hanzi(
     variant : str
         hanzi variant of the content
     """
-    variant = identify_variant(simplified, traditional)
+    if variant is None:
+        variant = identify_variant(simplified, traditional)
     variants = {
         "Simplified": simplified,
         "Traditional": traditional,
         "Unknown": traditional,
     }
+    if stats_only:
+        return (
+            None,
+            get_stats_df_from_counts(counts_by_hanzi(hanzi_list), variant),
+            variant,
+        )
+
     hanzi_df = get_counts_per_hanzi(variants[variant], variant)
+    stats_df = get_stats_df(hanzi_df, hanzi_list, variant)
+
+    return hanzi_df, stats_df, variant
+
+
+def get_stats_df(
+    hanzi_df: pl.DataFrame, hanzi_list: Union[list, array], variant: str
+) -> pl.DataFrame:
+    """
+    Computes the stats table from hanzi_df
+
+    Parameters
+    ----------
+    hanzi_df : pl.DataFrame
+        HSK hanzi with counts, from get_counts_per_hanzi
+
+    hanzi_list : list | array
+        all characters (with duplicates) found in target content,
+        or their codepoints in an array("I")
+
+    variant : str
+        hanzi variant of the content
+
+    Returns
+    -------
+    stats_df : pl.DataFrame
+        stats for the content
+    """
     filtered_hanzi_df = filter_dataframe_by_hanzi_variant(hanzi_df, variant)
     grade_counts = get_counts_per_hanzi_per_hsk_grade(filtered_hanzi_df, hanzi_list)
     cumul_counts = get_cumulative_counts_per_hsk_grade(grade_counts)
-    stats_df = compute_stats(grade_counts, cumul_counts)
 
-    return hanzi_df, stats_df, variant
+    return compute_stats(grade_counts, cumul_counts)
+
+
+def get_stats_df_from_counts(
+    hanzi_counts: dict[str, int], variant: str
+) -> pl.DataFrame:
+    """
+    Computes the same stats table as get_stats_df without hanzi_df
+
+    Parameters
+    ----------
+    hanzi_counts : dict[str, int]
+        counts of every hanzi found in target content
+
+    variant : str
+        hanzi variant of the content
+
+    Returns
+    -------
+    stats_df : pl.DataFrame
+        stats for the content
+    """
+    grade_counts = get_counts_per_hsk_grade_from_counts(hanzi_counts, variant)
+    cumul_counts = get_cumulative_counts_per_hsk_grade(grade_counts)
+
+    return compute_stats(grade_counts, cumul_counts)
+
+
+def analyse_counts(hanzi_counts: dict[str, int]) -> Optional[tuple[pl.DataFrame, str]]:
+    """
+    Identifies the variant of content known only by its per-hanzi
+    counts, e.g. counts merged across documents, and computes its stats
+
+    Parameters
+    ----------
+    hanzi_counts : dict[str, int]
+        counts of every hanzi found in the content
+
+    Returns
+    -------
+    _ : tuple[pl.DataFrame, str] | None
+        stats_df and variant, or None if there are no HSK hanzi
+    """
+    # identify_variant compares sets, so unique hanzi suffice
+    simplified, traditional, _ = partition_hanzi(list(hanzi_counts))
+    if not simplified and not traditional:
+        return None
+    variant = identify_variant(simplified, traditional)
+
+    return get_stats_df_from_counts(hanzi_counts, variant), variant
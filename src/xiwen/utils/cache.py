@@ -0,0 +1,72 @@
+import inspect
+from functools import wraps
+from typing import Callable, Iterable
+from .metrics import inc
+
+
+# Cached reference data by (function name, arguments), see cached
+_entries = dict()
+
+
+def cached(func: Callable) -> Callable:
+    """
+    Caches a function's results per arguments for the life of the process
+    Like lru_cache(maxsize=None), but entries live in one registry that
+    warm.py can save to a snapshot and restore in new workers
+    Arguments are bound to the signature with defaults applied, so e.g.
+    f(), f(False) and f(flag=False) share one entry
+    Results are shared, so callers must not modify them
+
+    Parameters
+    ----------
+    func : Callable
+        function of hashable arguments
+
+    Returns
+    -------
+    wrapper : Callable
+        cached function
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (name, bound.args + tuple(sorted(bound.kwargs.items())))
+        if key not in _entries:
+            inc("xiwen_cache_requests_total", function=name, result="miss")
+            _entries[key] = func(*bound.args, **bound.kwargs)
+        else:
+            inc("xiwen_cache_requests_total", function=name, result="hit")
+
+        return _entries[key]
+
+    wrapper.cache_name = name
+
+    return wrapper
+
+
+def get_cached(exclude: Iterable[Callable] = ()) -> dict:
+    """
+    Copy of every cached entry
+
+    Parameters
+    ----------
+    exclude : Iterable[Callable]
+        cached functions whose entries are left out
+    """
+    excluded = {func.cache_name for func in exclude}
+
+    return {key: value for key, value in _entries.items() if key[0] not in excluded}
+
+
+def update_cached(entries: dict) -> None:
+    """Adds entries, e.g. from get_cached in another process"""
+    _entries.update(entries)
+
+
+def clear_cached() -> None:
+    """Drops every cached entry"""
+    _entries.clear()
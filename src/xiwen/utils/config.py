@@ -4,13 +4,81 @@ import polars as pl
 
 ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets")
 PINYIN_PATH = os.path.join(ASSETS_DIR, "hanzi_pinyin_characters.tsv.txt")
+# Files generated from the assets, kept per user as ASSETS_DIR may be
+# read-only; XIWEN_CACHE_DIR overrides the location
+CACHE_DIR = os.environ.get("XIWEN_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "xiwen",
+)
 
 # Test case (simplified hanzi)
 DEMO1 = "https://www.xuan-zang.com/bjzd"
 # Test case (traditional hanzi)
 DEMO2 = "https://www.xuan-zang.com/ttc"
 ENCODING = "utf-8"
+# Legacy Chinese encodings tried after UTF-8 when no charset is declared
+FALLBACK_ENCODINGS = ["gb18030", "big5"]
+# Bytes scanned for <meta charset> declarations
+SNIFF_BYTES = 4096
+# Bytes read at a time when streaming (possibly compressed) files
+STREAM_CHUNK_SIZE = 1 << 16
+# HTML parser backend (html.parser|lxml|text)
+HTML_PARSER = "html.parser"
 HSK_GRADES = 7
+# Fetching: requests per second and burst size per host, attempts per URL,
+# jittered backoff base and cap (seconds), longest Retry-After honoured
+# (seconds), and consecutive host failures that open the circuit breaker
+# for BREAKER_COOLDOWN seconds
+FETCH_TIMEOUT = 10
+FETCH_RATE = 2.0
+FETCH_BURST = 4
+FETCH_MAX_RETRIES = 3
+FETCH_BACKOFF_BASE = 1.0
+FETCH_BACKOFF_CAP = 30.0
+FETCH_MAX_RETRY_AFTER = 60.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+# Jobs: completed items per checkpoint transaction, and items between
+# progress reports
+JOB_COMMIT_EVERY = 50
+JOB_PROGRESS_EVERY = 1000
+# Result store: buffered documents, or per-hanzi count rows, per write
+STORE_BATCH_DOCUMENTS = 1000
+STORE_MAX_BUFFERED_ROWS = 500_000
+# Async pipeline: concurrent fetches, and fetched documents buffered
+# ahead of analysis (fetchers wait once the queue is full)
+ASYNC_FETCH_WORKERS = 8
+ASYNC_QUEUE_SIZE = 16
+# Corpora (WARC, EPUB): documents submitted per worker ahead of the one
+# being collected, WARC response records larger than this are skipped,
+# and longer WARC header blocks (bytes) are rejected as malformed
+CORPUS_PENDING_PER_WORKER = 4
+WARC_MAX_PAYLOAD = 16 * 1024 * 1024
+WARC_MAX_HEADER = 64 * 1024
+# Metrics: histogram bucket upper bounds (seconds) and serve_metrics defaults
+METRICS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+# Tracing: share of traces kept, and duration (seconds) above which a
+# trace is kept regardless
+TRACE_SAMPLE_RATE = 0.1
+TRACE_SLOW_THRESHOLD = 10.0
+# Memory profiling: seconds between RSS samples
+MEMORY_RSS_INTERVAL = 0.005
+# Share of variant-exclusive unique hanzi needed to call a text
+# Simplified (or, for its complement, Traditional)
+VARIANT_THRESHOLD = 0.90
+# Early variant detection: unique variant-exclusive hanzi to sample,
+# and confidence needed to decide without scanning the full text
+VARIANT_SAMPLE_SIZE = 200
+VARIANT_CONFIDENCE = 0.99
+# Coverage shares for which score_documents reports the minimum HSK grade
+COVERAGE_THRESHOLDS = [0.90, 0.95, 0.98]
+# Approximate counting: Count-Min overcount as a fraction of all hanzi,
+# probability that bound holds, and HyperLogLog relative standard error
+SKETCH_COUNT_ERROR = 0.0001
+SKETCH_CONFIDENCE = 0.99
+SKETCH_UNIQUE_ERROR = 0.02
 
 HSK30_HANZI_SCHEMA = {
     "Simplified": pl.Utf8,
@@ -1,6 +1,12 @@
 import polars as pl
+from array import array
+from typing import Mapping, Union
 from .config import HSK_GRADES
-from .hsk_hanzi import HSKHanzi
+from .hsk_hanzi import HSK30_CATEGORICAL_COLUMNS, HSKHanzi, get_hsk_rows
+
+
+# HSK dataset columns holding the codepoint of each variant
+CODEPOINT_COLUMNS = {"Simplified": "Unicode (Simp.)", "Traditional": "Unicode (Trad.)"}
 
 
 def unit_counts_per_hanzi(hanzi: list) -> dict:
@@ -24,14 +30,82 @@ def unit_counts_per_hanzi(hanzi: list) -> dict:
     return counts
 
 
-def get_counts_per_hanzi(hanzi_subset: list, variant: str) -> pl.DataFrame:
+def count_codepoints(codes: array) -> pl.DataFrame:
+    """
+    Vectorized equivalent of unit_counts_per_hanzi for codepoint arrays
+    Counting runs in polars rather than a Python loop
+
+    Parameters
+    ----------
+    codes : array
+        codepoints in an array("I")
+
+    Returns
+    -------
+    _ : pl.DataFrame
+        codepoint (UInt32) and count (Int32) of each unique codepoint
+    """
+    codes = pl.Series("codepoint", codes, dtype=pl.UInt32)
+
+    return codes.value_counts().with_columns(pl.col("count").cast(pl.Int32))
+
+
+def counts_by_hanzi(hanzi: Union[list, array]) -> dict[str, int]:
+    """
+    Counts occurrences of each character, keyed by character
+    even when hanzi holds codepoints
+
+    Parameters
+    ----------
+    hanzi : list | array
+        characters, or their codepoints in an array("I")
+
+    Returns
+    -------
+    counts : dict
+        counts of each character
+    """
+    if isinstance(hanzi, array):
+        counts = count_codepoints(hanzi).sort("codepoint")
+        return dict(zip(map(chr, counts["codepoint"]), counts["count"]))
+
+    return unit_counts_per_hanzi(hanzi)
+
+
+def merge_counts(total: dict[str, int], counts: Mapping[str, int]) -> dict[str, int]:
+    """
+    Adds per-hanzi counts, e.g. of one document, to a running total
+
+    Parameters
+    ----------
+    total : dict[str, int]
+        running counts, updated in place
+
+    counts : Mapping[str, int]
+        counts to add
+
+    Returns
+    -------
+    total : dict[str, int]
+        the updated running counts
+    """
+    for zi, count in counts.items():
+        total[zi] = total.get(zi, 0) + count
+
+    return total
+
+
+def get_counts_per_hanzi(
+    hanzi_subset: Union[list, array], variant: str
+) -> pl.DataFrame:
     """
     Gets count of occurrences of each Chinese character
 
     Parameters
     ----------
-    hanzi_subset : list
-        character subset to be analysed (simplified or traditional)
+    hanzi_subset : list | array
+        character subset to be analysed (simplified or traditional),
+        or its codepoints in an array("I")
 
     variant : str
         variant of the character set (Simplified|Traditional|Unknown)
@@ -42,21 +116,38 @@ def get_counts_per_hanzi(hanzi_subset: list, variant: str) -> pl.DataFrame:
         DataFrame of hsk_hanzi with counts applied
     """
     hsk_hanzi = HSKHanzi().get_all_HSK_hanzi()
-    counts = unit_counts_per_hanzi(hanzi_subset)
+    # The shared frame keeps categorical columns; results hold strings
+    strings = [pl.col(col).cast(pl.Utf8) for col in HSK30_CATEGORICAL_COLUMNS]
 
     if variant == "Unknown":
         variant = "Traditional"
 
+    if isinstance(hanzi_subset, array):
+        # Gather counts straight into the dataset's row order, no join
+        counts = count_codepoints(hanzi_subset)
+        return hsk_hanzi.with_columns(
+            *strings,
+            pl.col(CODEPOINT_COLUMNS[variant])
+            .replace(counts["codepoint"], counts["count"], default=0)
+            .cast(pl.Int32)
+            .alias("Count"),
+        )
+
+    counts = unit_counts_per_hanzi(hanzi_subset)
     counts_df = pl.DataFrame(
         list(counts.items()), schema={variant: pl.String, "Count": pl.Int32}
     )
-    merged_df = hsk_hanzi.join(counts_df, on=variant, coalesce=True, how="left")
+    merged_df = hsk_hanzi.with_columns(*strings).join(
+        counts_df, on=variant, coalesce=True, how="left"
+    )
     merged_df = merged_df.fill_null(0).with_columns(pl.col("Count").cast(pl.Int32))
 
     return merged_df
 
 
-def get_counts_per_hanzi_per_hsk_grade(df: pl.DataFrame, hanzi_all: list) -> dict:
+def get_counts_per_hanzi_per_hsk_grade(
+    df: pl.DataFrame, hanzi_all: Union[list, array]
+) -> dict:
     """
     Breaks down counts by HSK grades
 
@@ -65,8 +156,9 @@ def get_counts_per_hanzi_per_hsk_grade(df: pl.DataFrame, hanzi_all: list) -> dic
     df : pl.DataFrame
         all unique hanzi in HSK1 to HSK7-9 with counts column
 
-    hanzi_all : list
-        all hanzi (with duplicates including non-HSK) found in text being analysed
+    hanzi_all : list | array
+        all hanzi (with duplicates including non-HSK) found in text being
+        analysed, or their codepoints
 
     Returns
     -------
@@ -74,7 +166,10 @@ def get_counts_per_hanzi_per_hsk_grade(df: pl.DataFrame, hanzi_all: list) -> dic
         counts for hanzi per HSK grade
     """
     grade_stats = dict()
-    num_unique_hanzi = len(set(hanzi_all))
+    if isinstance(hanzi_all, array):
+        num_unique_hanzi = pl.Series(hanzi_all, dtype=pl.UInt32).n_unique()
+    else:
+        num_unique_hanzi = len(set(hanzi_all))
     num_total_hanzi = len(hanzi_all)
     grade_stats[0] = num_unique_hanzi, num_total_hanzi  # Reserve key "0" for totals
 
@@ -87,6 +182,55 @@ def get_counts_per_hanzi_per_hsk_grade(df: pl.DataFrame, hanzi_all: list) -> dic
     return grade_stats
 
 
+def get_counts_per_hsk_grade_from_counts(
+    hanzi_counts: dict[str, int], variant: str
+) -> dict:
+    """
+    Breaks down counts by HSK grades straight from per-hanzi counts
+    Gives the same figures as get_counts_per_hanzi_per_hsk_grade on the
+    filtered output of get_counts_per_hanzi, without building either
+    DataFrame: rows are looked up with get_hsk_rows, and a row is skipped
+    where filter_dataframe_by_hanzi_variant would drop it, i.e. when an
+    earlier row has the same deduplication key and count
+
+    Parameters
+    ----------
+    hanzi_counts : dict[str, int]
+        counts of every hanzi (including non-HSK) found in text being analysed
+
+    variant : str
+        variant of the character set (Simplified|Traditional|Unknown)
+
+    Returns
+    -------
+    grade_stats : dict
+        counts for hanzi per HSK grade
+    """
+    hsk_rows = get_hsk_rows(variant)
+    matched = sorted(
+        (row, key, grade, count)
+        for zi, count in hanzi_counts.items()
+        if zi in hsk_rows
+        for row, key, grade in hsk_rows[zi]
+    )
+
+    grade_stats = dict()
+    # Reserve key "0" for totals
+    grade_stats[0] = len(hanzi_counts), sum(hanzi_counts.values())
+    for i in range(1, 8):
+        grade_stats[i] = [0, 0]
+
+    kept = set()
+    for _, key, grade, count in matched:
+        if (key, count) in kept:
+            continue
+        kept.add((key, count))
+        grade_stats[grade][0] += 1
+        grade_stats[grade][1] += count
+
+    return grade_stats
+
+
 def get_cumulative_counts_per_hsk_grade(
     raw_counts: dict[int : list[int]],
 ) -> list[list[int]]:
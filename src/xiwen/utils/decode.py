@@ -0,0 +1,242 @@
+import codecs
+import re
+from collections.abc import Mapping
+from typing import Optional
+from .config import ENCODING, FALLBACK_ENCODINGS, SNIFF_BYTES
+
+
+# Byte order marks checked before any declared or fallback encoding
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# Legacy labels replaced with the supersets browsers decode them as,
+# keyed by Python codec name with "_" for "-" (see normalise_encoding)
+SUPERSETS = {
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+    "big5": "big5hkscs",
+    "iso8859_1": "cp1252",
+    "ascii": "cp1252",
+}
+# Matches <meta charset> and <meta http-equiv="Content-Type"> declarations
+META_CHARSET = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+HEADER_CHARSET = re.compile(r"""charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+# Share of private use codepoints above which a fallback decode is rejected
+MAX_PRIVATE_USE_RATIO = 0.01
+
+
+def normalise_encoding(label: Optional[str]) -> Optional[str]:
+    """
+    Maps an encoding label to a Python codec name
+
+    Parameters
+    ----------
+    label : str | None
+        encoding label from HTTP headers or HTML
+
+    Returns
+    -------
+    _ : str | None
+        codec name, or None if the label is not recognised
+    """
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().lower()).name
+    except LookupError:
+        return None
+
+    return SUPERSETS.get(name.replace("-", "_"), name)
+
+
+def get_header_charset(headers: Optional[Mapping]) -> Optional[str]:
+    """
+    Gets the charset declared in a Content-Type header
+
+    Parameters
+    ----------
+    headers : Mapping | None
+        HTTP response headers
+
+    Returns
+    -------
+    _ : str | None
+        codec name, or None if no usable charset is declared
+    """
+    if not headers:
+        return None
+    content_type = next(
+        (v for k, v in headers.items() if k.lower() == "content-type"), ""
+    )
+    match = HEADER_CHARSET.search(content_type)
+
+    return normalise_encoding(match.group(1)) if match else None
+
+
+def sniff_meta_charset(content: bytes) -> Optional[str]:
+    """
+    Gets the charset declared in a <meta> tag within the first SNIFF_BYTES
+
+    Parameters
+    ----------
+    content : bytes
+        raw response body
+
+    Returns
+    -------
+    _ : str | None
+        codec name, or None if no usable charset is declared
+    """
+    match = META_CHARSET.search(content[:SNIFF_BYTES])
+
+    return normalise_encoding(match.group(1).decode("ascii")) if match else None
+
+
+def is_plausible(text: str) -> bool:
+    """
+    Checks decoded text for signs of a mismatched legacy encoding
+    Big5 bytes decode without error as GB18030 (and vice versa)
+    but map heavily onto private use codepoints
+
+    Parameters
+    ----------
+    text : str
+        sample of decoded text
+
+    Returns
+    -------
+    bool
+        True if the share of private use codepoints is negligible
+    """
+    non_ascii = [char for char in text if char > "\x7f"]
+    if not non_ascii:
+        return True
+    private_use = sum(1 for char in non_ascii if "\ue000" <= char <= "\uf8ff")
+
+    return private_use / len(non_ascii) <= MAX_PRIVATE_USE_RATIO
+
+
+def detect_encoding(content: bytes) -> Optional[str]:
+    """
+    Runs full-body charset detection as a last resort
+
+    Parameters
+    ----------
+    content : bytes
+        raw response body
+
+    Returns
+    -------
+    _ : str | None
+        detected codec name, or None if detection fails
+    """
+    from charset_normalizer import from_bytes
+
+    best = from_bytes(content).best()
+
+    return normalise_encoding(best.encoding) if best else None
+
+
+def detect_stream_encoding(head: bytes) -> str:
+    """
+    Chooses the codec for a document decoded in chunks, from its start
+    Candidates are tried as in decode_html, except that no header is
+    available and guesses are checked against the first chunk only
+
+    Parameters
+    ----------
+    head : bytes
+        first bytes of the document
+
+    Returns
+    -------
+    _ : str
+        codec name
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    declared = sniff_meta_charset(head)
+    if declared:
+        return declared
+
+    fallbacks = [ENCODING] + [normalise_encoding(e) for e in FALLBACK_ENCODINGS]
+    for encoding in fallbacks:
+        try:
+            # Not final: the chunk may end part way through a character
+            text = codecs.getincrementaldecoder(encoding)().decode(head)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        if is_plausible(text[:SNIFF_BYTES]):
+            return encoding
+
+    return detect_encoding(head) or ENCODING
+
+
+def decode_html(content: bytes, headers: Optional[Mapping] = None) -> str:
+    """
+    Decodes a response body without requests' charset sniffing
+    Candidates are tried in order, with strict error handling:
+        - byte order mark
+        - charset in Content-Type header
+        - charset in <meta> tag (first SNIFF_BYTES only)
+        - UTF-8
+        - FALLBACK_ENCODINGS (GB18030, Big5)
+        - full-body detection, only if no charset was declared
+    If a declared charset fails to decode strictly, the body is decoded
+    with it and replacement characters; otherwise falls back to UTF-8
+    with replacement characters
+
+    Parameters
+    ----------
+    content : bytes
+        raw response body
+
+    headers : Mapping | None
+        HTTP response headers
+
+    Returns
+    -------
+    _ : str
+        decoded text
+    """
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return content.decode(encoding, errors="replace")
+
+    declared = [get_header_charset(headers), sniff_meta_charset(content)]
+    fallbacks = [ENCODING] + [normalise_encoding(e) for e in FALLBACK_ENCODINGS]
+    tried = set()
+
+    for encoding in declared + fallbacks:
+        if not encoding or encoding in tried:
+            continue
+        tried.add(encoding)
+        try:
+            text = content.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        # Declared charsets are trusted, guessed ones are sanity-checked
+        if encoding in declared or is_plausible(text[:SNIFF_BYTES]):
+            return text
+
+    # A declared charset that mostly fits beats detection, which reads
+    # the whole body
+    for encoding in declared:
+        if encoding:
+            try:
+                return content.decode(encoding, errors="replace")
+            except LookupError:
+                continue
+
+    detected = detect_encoding(content)
+    if detected:
+        try:
+            return content.decode(detected)
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+    return content.decode(ENCODING, errors="replace")
@@ -0,0 +1,119 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator
+from urllib.parse import unquote
+
+
+CONTAINER_PATH = "META-INF/container.xml"
+NAMESPACES = {
+    "container": "urn:oasis:names:tc:opendocument:xmlns:container",
+    "opf": "http://www.idpf.org/2007/opf",
+}
+# Spine items with these media types hold chapter text
+CHAPTER_TYPES = ("application/xhtml+xml", "text/html")
+
+
+class EpubFormatError(ValueError):
+    """Raised when a file is not a well-formed EPUB"""
+
+
+def read_xml(book: zipfile.ZipFile, name: str) -> ET.Element:
+    try:
+        return ET.fromstring(book.read(name))
+    except KeyError:
+        raise EpubFormatError(f"{name} missing from EPUB")
+    except ET.ParseError as e:
+        raise EpubFormatError(f"{name} is not valid XML: {e}")
+
+
+def get_package_path(book: zipfile.ZipFile) -> str:
+    """
+    Finds the package document (OPF) from META-INF/container.xml
+
+    Parameters
+    ----------
+    book : zipfile.ZipFile
+        open EPUB
+
+    Returns
+    -------
+    _ : str
+        path of the OPF file within the zip
+    """
+    container = read_xml(book, CONTAINER_PATH)
+    rootfile = container.find(".//container:rootfile", NAMESPACES)
+    if rootfile is None or not rootfile.get("full-path"):
+        raise EpubFormatError(f"no package document listed in {CONTAINER_PATH}")
+
+    return rootfile.get("full-path")
+
+
+def get_spine(book: zipfile.ZipFile) -> list[str]:
+    """
+    Lists the chapter documents of an EPUB in reading order
+    Spine items are looked up in the OPF manifest, and their hrefs
+    resolved relative to the OPF file; non-XHTML items are left out
+
+    Parameters
+    ----------
+    book : zipfile.ZipFile
+        open EPUB
+
+    Returns
+    -------
+    _ : list[str]
+        chapter paths within the zip, in spine order
+    """
+    package_path = get_package_path(book)
+    package = read_xml(book, package_path)
+    base = posixpath.dirname(package_path)
+
+    manifest = dict()
+    for item in package.iterfind("opf:manifest/opf:item", NAMESPACES):
+        if item.get("media-type") in CHAPTER_TYPES and item.get("href"):
+            href = unquote(item.get("href").split("#")[0])
+            manifest[item.get("id")] = posixpath.normpath(posixpath.join(base, href))
+
+    spine = package.find("opf:spine", NAMESPACES)
+    if spine is None:
+        raise EpubFormatError(f"no spine in {package_path}")
+    chapters = []
+    for itemref in spine.iterfind("opf:itemref", NAMESPACES):
+        path = manifest.get(itemref.get("idref"))
+        if path is not None and path not in chapters:
+            chapters.append(path)
+
+    return chapters
+
+
+def iter_epub_chapters(path: str) -> Iterator[tuple[str, bytes]]:
+    """
+    Reads the chapters of an EPUB straight from the zip, one at a time,
+    without extracting it to disk
+
+    Parameters
+    ----------
+    path : str
+        EPUB file path
+
+    Yields
+    ------
+    chapter : str
+        chapter path within the zip, in reading order
+
+    content : bytes
+        chapter (X)HTML
+    """
+    try:
+        book = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise EpubFormatError(f"{path} is not a zip archive")
+
+    with book:
+        for chapter in get_spine(book):
+            try:
+                content = book.read(chapter)
+            except KeyError:
+                raise EpubFormatError(f"{chapter} listed in spine but missing")
+            yield chapter, content
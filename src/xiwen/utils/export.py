@@ -1,7 +1,13 @@
 import os
 import polars as pl
+from array import array
+from typing import Union
+from .extract import to_hanzi
+from .heavy_hitters import SpaceSaving
+from .metrics import inc
 from .pinyin import map_pinyin, get_pinyin
 from .terminal_display import get_TerminalDisplay_instance
+from .tracing import span
 
 
 def save_file(data: pl.DataFrame) -> None:
@@ -30,13 +36,16 @@ def save_file(data: pl.DataFrame) -> None:
 
         extension = filename.split(".")[-1].lower()
 
-        if extension == "csv":
-            data.write_csv(os.path.join(directory_path, filename))
-        elif extension == "parquet":
-            data.write_parquet(os.path.join(directory_path, filename))
-        else:
+        if extension not in ("csv", "parquet"):
             print(f"Unsupported file extension: .{extension}")
             return
+        with span("save_file", format=extension, rows=data.height):
+            if extension == "csv":
+                data.write_csv(os.path.join(directory_path, filename))
+            else:
+                data.write_parquet(os.path.join(directory_path, filename))
+        inc("xiwen_exports_total", format=extension)
+        inc("xiwen_export_rows_total", data.height)
 
         print(f"Saved to {os.path.join(directory_path, filename)}")
 
@@ -145,15 +154,72 @@ def format_stats(stats: pl.DataFrame) -> pl.DataFrame:
     return stats
 
 
+def get_outliers_df(outliers: Union[list[str], array, SpaceSaving]) -> pl.DataFrame:
+    """
+    Tabulates outliers (non-HSK hanzi) with unicode and pinyin
+    Hanzi without pinyin are dropped
+
+    Parameters
+    ----------
+    outliers : list[str] | array | SpaceSaving
+        every outlier occurrence (characters or codepoints), or a summary
+        of the most frequent outliers
+
+    Returns
+    -------
+    outliers_df : pl.DataFrame
+        unique outliers sorted by unicode value, or for a summary,
+        outliers with counts sorted by descending count
+    """
+    # Map characters to accented pinyin
+    pinyin_map = map_pinyin()
+
+    if isinstance(outliers, SpaceSaving):
+        top_outliers = outliers.most_common()
+        top_hanzi = to_hanzi(zi for zi, _, _ in top_outliers)
+        # Get pinyin for outlier hanzi
+        recognised_outliers, outliers_pinyin = get_pinyin(top_hanzi, pinyin_map)
+        recognised = set(recognised_outliers)
+        counts = [
+            (c, e) for zi, (_, c, e) in zip(top_hanzi, top_outliers) if zi in recognised
+        ]
+        return pl.DataFrame(
+            {
+                "Hanzi": recognised_outliers,
+                "Unicode": [ord(hanzi) for hanzi in recognised_outliers],
+                "Pinyin": outliers_pinyin,
+                "Count": [c for c, _ in counts],
+                "Max. Overcount": [e for _, e in counts],
+            },
+            schema_overrides={"Count": pl.Int32, "Max. Overcount": pl.Int32},
+        )
+
+    # Get list of unique outlier hanzi
+    unique_outliers = to_hanzi(set(outliers))
+    # Get pinyin for outlier hanzi
+    recognised_outliers, outliers_pinyin = get_pinyin(unique_outliers, pinyin_map)
+    # Create DataFrame of outlier hanzi, unicode, and pinyin
+    outliers_df = pl.DataFrame(
+        {
+            "Hanzi": recognised_outliers,
+            "Unicode": [ord(hanzi) for hanzi in recognised_outliers],
+            "Pinyin": outliers_pinyin,
+        }
+    )
+
+    return outliers_df.sort(by="Unicode")
+
+
 def export_hanzi(
     hanzi_df: pl.DataFrame,
     stats_df: pl.DataFrame,
-    hanzi_list: list[str],
-    outliers_list: list[str],
+    hanzi_list: Union[list[str], array],
+    outliers_list: Union[list[str], array, SpaceSaving],
     variant: str,
 ) -> bool:
     """
     Interactive loop for export options
+    Codepoint arrays are converted to characters here, on export
     """
     terminal_display = get_TerminalDisplay_instance()
     options = ["A", "C", "F", "O", "S", "X"]
@@ -175,7 +241,7 @@ def export_hanzi(
             save_file(formatted_stats)
 
         elif command == "A":  # Export all unique HSK hanzi in text
-            hanzi_set = list(set(hanzi_list))  # filter hanzi_df with hanzi_list
+            hanzi_set = to_hanzi(set(hanzi_list))  # filter hanzi_df with hanzi_list
 
             if variant == "Simplified":
                 filtered_df = hanzi_df.filter(pl.col("Simplified").is_in(hanzi_set))
@@ -186,24 +252,9 @@ def export_hanzi(
             save_file(filtered_df)
 
         elif command == "O":  # Export outliers (non-HSK hanzi) in text
-            # Map characters to accented pinyin
-            pinyin_map = map_pinyin()
-            # Get list of unique outlier hanzi
-            outliers = list(set(outliers_list))
-            # Get pinyin for outlier hanzi
-            recognised_outliers, outliers_pinyin = get_pinyin(outliers, pinyin_map)
-            # Create DataFrame of outlier hanzi, unicode, and pinyin
-            outliers_df = pl.DataFrame(
-                {
-                    "Hanzi": recognised_outliers,
-                    "Unicode": [ord(hanzi) for hanzi in recognised_outliers],
-                    "Pinyin": outliers_pinyin,
-                }
-            )
-            outliers_df_sorted_by_unicode_value = outliers_df.sort(by="Unicode")
-            save_file(outliers_df_sorted_by_unicode_value)
+            save_file(get_outliers_df(outliers_list))
 
         elif command == "C":
             print(terminal_display.get_export_options_for_custom_grades())
-            unique_hanzi = list(set(hanzi_list))
+            unique_hanzi = to_hanzi(set(hanzi_list))
             custom_export(unique_hanzi, hanzi_df, variant)
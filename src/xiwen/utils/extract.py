@@ -1,4 +1,10 @@
-from .html import get_html
+from array import array
+from itertools import groupby
+from typing import Iterable
+from .config import HTML_PARSER, STREAM_CHUNK_SIZE
+from .html import fetch_html
+from .parse import parse_html
+from .stream import iter_text, iter_unescaped
 
 
 def filter_hanzi_by_unicode(char: str) -> bool:
@@ -54,7 +60,95 @@ def filter_hanzi_from_html(html: str) -> list[str]:
     return [zi for zi in html if filter_hanzi_by_unicode(zi)]
 
 
-def get_hanzi_from_url(target: str) -> list[str]:
+def filter_codepoints_from_html(html: str) -> array:
+    """
+    Compact equivalent of filter_hanzi_from_html
+    Stores each hanzi as a 4-byte codepoint in an array("I"), rather
+    than a pointer to a str object, for several times less memory
+    on large documents
+
+    Parameters
+    ----------
+    html : str
+        HTML extracted from URL
+
+    Returns
+    -------
+    result : array
+        codepoints of all hanzi found (duplicates included)
+    """
+    return array("I", map(ord, filter(filter_hanzi_by_unicode, html)))
+
+
+def read_codepoints(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> array:
+    """
+    Streams a (possibly compressed) HTML or text file straight into
+    hanzi extraction, so neither the file nor its text is held in full
+    Like the text parser, counts hanzi in text, attribute values,
+    comments and scripts, with character references decoded
+
+    Parameters
+    ----------
+    path : str
+        file path
+
+    chunk_size : int
+        decompressed bytes processed at a time
+
+    Returns
+    -------
+    _ : array
+        codepoints of all hanzi in the file (with duplicates)
+    """
+    hanzi = array("I")
+    for text in iter_unescaped(iter_text(path, chunk_size)):
+        hanzi.extend(filter_codepoints_from_html(text))
+
+    return hanzi
+
+
+def to_hanzi(hanzi: Iterable) -> list[str]:
+    """
+    Converts codepoints, e.g. from filter_codepoints_from_html,
+    back to characters for output; characters are kept as they are
+
+    Parameters
+    ----------
+    hanzi : Iterable
+        characters or codepoints
+
+    Returns
+    -------
+    _ : list[str]
+        characters in the same order
+    """
+    if isinstance(hanzi, array):
+        return [chr(code) for code in hanzi]
+
+    return [chr(zi) if isinstance(zi, int) else zi for zi in hanzi]
+
+
+def iter_hanzi_runs(html: str):
+    """
+    Splits text into runs of consecutive hanzi
+    Any non-hanzi character (punctuation, Latin, markup) ends a run
+
+    Parameters
+    ----------
+    html : str
+        HTML extracted from URL
+
+    Yields
+    ------
+    run : str
+        maximal sequence of adjacent hanzi
+    """
+    for is_hanzi, chars in groupby(html, key=filter_hanzi_by_unicode):
+        if is_hanzi:
+            yield "".join(chars)
+
+
+def get_hanzi_from_url(target: str, parser: str = HTML_PARSER) -> list[str]:
     """
     Passes URL to retrieve HTML
     Extracts all Chinese characters from HTML
@@ -64,12 +158,17 @@ def get_hanzi_from_url(target: str) -> list[str]:
     target : str
         URL to extract HTML from
 
+    parser : str
+        HTML parser backend (html.parser|lxml|text)
+
     Returns
     -------
     list of all hanzi found in HTML
+
+    Raises FetchError if the URL cannot be fetched
     """
-    html = get_html(target)
-    if not html:
+    markup = fetch_html(target)
+    if not markup:
         return []
 
-    return filter_hanzi_from_html(str(html))
+    return filter_hanzi_from_html(parse_html(markup, parser))
@@ -0,0 +1,136 @@
+import heapq
+from itertools import islice
+from typing import Iterable, Optional
+from .count import unit_counts_per_hanzi
+
+
+# Items tallied at a time by SpaceSaving.update
+UPDATE_CHUNK_SIZE = 4096
+# SpaceSaving rebuilds its heap once stale entries make it this many
+# times its capacity
+HEAP_REBUILD_FACTOR = 4
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the most frequent items in a stream
+    Holds at most capacity items; any item occurring more than
+    total / capacity times is guaranteed to be held
+
+    Attributes
+    ----------
+    capacity : int
+        maximum number of items tracked
+
+    counts : dict
+        item -> [count, error], where count overestimates the true count
+        by at most error
+
+    total : int
+        number of occurrences seen
+
+    heap : list[tuple]
+        min-heap of (count, item), to find the least frequent item in
+        O(log capacity); entries whose count is out of date are skipped
+        when they reach the top, and dropped when the heap is rebuilt
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.counts = dict()
+        self.total = 0
+        self.heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, item, count: int = 1) -> None:
+        self.total += count
+        entry = self.counts.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counts) < self.capacity:
+            entry = self.counts[item] = [count, 0]
+        else:
+            # Replace the least frequent item, inheriting its count as error
+            floor, evicted = self._pop_min()
+            del self.counts[evicted]
+            entry = self.counts[item] = [floor + count, floor]
+        self._push(item, entry[0])
+
+    def _push(self, item, count: int) -> None:
+        heapq.heappush(self.heap, (count, item))
+        if len(self.heap) > HEAP_REBUILD_FACTOR * self.capacity:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        self.heap = [(count, item) for item, (count, _) in self.counts.items()]
+        heapq.heapify(self.heap)
+
+    def _peek_min(self) -> tuple:
+        """Gets (count, item) of the least frequent item, skipping stale entries"""
+        heap, counts = self.heap, self.counts
+        while True:
+            count, item = heap[0]
+            entry = counts.get(item)
+            if entry is not None and entry[0] == count:
+                return count, item
+            heapq.heappop(heap)
+
+    def _pop_min(self) -> tuple:
+        entry = self._peek_min()
+        heapq.heappop(self.heap)
+
+        return entry
+
+    def update(self, items: Iterable, chunk_size: int = UPDATE_CHUNK_SIZE) -> None:
+        """
+        Adds a batch of items, tallying repeats in each chunk of
+        chunk_size items before touching the summary, so the tally never
+        holds more than chunk_size distinct items however many the
+        batch has
+        """
+        items = iter(items)
+        while chunk := list(islice(items, chunk_size)):
+            for item, count in unit_counts_per_hanzi(chunk).items():
+                self.add(item, count)
+
+    def min_count(self) -> int:
+        """Count below which untracked items must lie (0 while not full)"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._peek_min()[0]
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """
+        Combines summaries of two streams
+        Items missing from a full summary may have occurred up to its
+        min_count times there, which is added to their count and error
+        """
+        floors = self.min_count(), other.min_count()
+        merged = dict()
+        for item in self.counts.keys() | other.counts.keys():
+            count, error = 0, 0
+            for summary, floor in zip((self, other), floors):
+                entry = summary.counts.get(item, [floor, floor])
+                count += entry[0]
+                error += entry[1]
+            merged[item] = [count, error]
+
+        keep = sorted(merged, key=lambda k: merged[k][0], reverse=True)
+        self.counts = {k: merged[k] for k in keep[: self.capacity]}
+        self.total += other.total
+        self._rebuild_heap()
+
+    def most_common(self, k: Optional[int] = None) -> list[tuple]:
+        """
+        Gets (item, count, error) by descending count, ties in item order
+        """
+        ranked = sorted(
+            ((item, count, error) for item, (count, error) in self.counts.items()),
+            key=lambda entry: (-entry[1], entry[0]),
+        )
+
+        return ranked if k is None else ranked[:k]
@@ -1,6 +1,203 @@
 import os
 import polars as pl
-from .config import ASSETS_DIR, HSK30_HANZI_SCHEMA
+from .cache import cached
+from .config import ASSETS_DIR, CACHE_DIR, HSK30_HANZI_SCHEMA
+
+HSK30_PARQUET_PATH = os.path.join(ASSETS_DIR, "hsk30_hanzi.parquet")
+# Generated from the Parquet file and stamped with its modification time,
+# so it is rebuilt when the Parquet file changes
+HSK30_IPC_PATH = os.path.join(CACHE_DIR, "hsk30_hanzi.arrow")
+# Columns with few distinct values stored dictionary-encoded in the IPC file
+HSK30_CATEGORICAL_COLUMNS = ["Pinyin"]
+
+
+def write_hsk_hanzi_ipc(path: str = HSK30_IPC_PATH) -> None:
+    """
+    Writes the HSK dataset as an uncompressed Arrow IPC file
+    Uncompressed IPC can be memory-mapped read-only, so processes
+    reading it share the page cache instead of decoding private copies
+    The file is given the Parquet file's modification time, and is
+    replaced atomically so existing mappings stay valid
+
+    Parameters
+    ----------
+    path : str
+        destination of the IPC file
+    """
+    frame = pl.read_parquet(HSK30_PARQUET_PATH, hive_schema=HSK30_HANZI_SCHEMA)
+    frame = frame.with_columns(
+        pl.col(col).cast(pl.Categorical) for col in HSK30_CATEGORICAL_COLUMNS
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    frame.write_ipc(tmp_path, compression="uncompressed")
+    mtime = os.stat(HSK30_PARQUET_PATH).st_mtime_ns
+    os.utime(tmp_path, ns=(mtime, mtime))
+    os.replace(tmp_path, path)
+
+
+def _is_current(path: str) -> bool:
+    """
+    Whether an IPC file exists, generated from the current Parquet file
+
+    Parameters
+    ----------
+    path : str
+        location of the IPC file
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+    return mtime == os.stat(HSK30_PARQUET_PATH).st_mtime_ns
+
+
+def read_hsk_hanzi_ipc(path: str = HSK30_IPC_PATH) -> pl.DataFrame:
+    """
+    Memory-maps the Arrow IPC version of the HSK dataset
+    Generates it from the Parquet file first if it is missing or was
+    generated from another version of it
+
+    Parameters
+    ----------
+    path : str
+        location of the IPC file
+
+    Returns
+    -------
+    _ : pl.DataFrame
+        HSK dataset with categorical columns
+    """
+    if not _is_current(path):
+        write_hsk_hanzi_ipc(path)
+
+    return pl.read_ipc(path, memory_map=True)
+
+
+@cached
+def load_hsk_hanzi() -> pl.DataFrame:
+    """
+    Loads the HSK dataset once per process
+    Reads the memory-mapped IPC file, falling back to Parquet
+    if it cannot be generated, e.g. when CACHE_DIR is read-only
+    The frame is returned as mapped, so it is never copied; outputs
+    that need strings cast HSK30_CATEGORICAL_COLUMNS themselves
+
+    Returns
+    -------
+    _ : pl.DataFrame
+        DataFrame of all characters in HSK, with categorical columns
+    """
+    try:
+        return read_hsk_hanzi_ipc()
+    except OSError:
+        frame = pl.read_parquet(HSK30_PARQUET_PATH, hive_schema=HSK30_HANZI_SCHEMA)
+
+    return frame.with_columns(
+        pl.col(col).cast(pl.Categorical) for col in HSK30_CATEGORICAL_COLUMNS
+    )
+
+
+@cached
+def get_exclusive_hanzi() -> dict[str, frozenset]:
+    """
+    Gets the HSK hanzi that discriminate between character variants:
+        - Simplified: simplified hanzi with no identical traditional form
+        - Traditional: traditional hanzi with no identical simplified form
+
+    Returns
+    -------
+    _ : dict[str, frozenset]
+        variant-exclusive hanzi keyed by variant
+    """
+    frame = load_hsk_hanzi()
+    simplified = set(frame["Simplified"])
+    traditional = set(frame["Traditional"])
+
+    return {
+        "Simplified": frozenset(simplified - traditional),
+        "Traditional": frozenset(traditional - simplified),
+    }
+
+
+@cached
+def get_hsk_rows(variant: str) -> dict[str, tuple]:
+    """
+    Indexes the HSK dataset rows by hanzi of a variant, to compute stats
+    from per-hanzi counts without joining them onto the dataset
+    Unknown variants index Traditional hanzi, as in get_counts_per_hanzi
+
+    Parameters
+    ----------
+    variant : str
+        variant of the character set (Simplified|Traditional|Unknown)
+
+    Returns
+    -------
+    _ : dict[str, tuple]
+        (row number, deduplication key, HSK grade) of every row per hanzi
+        in dataset order, where the key is the column that
+        filter_dataframe_by_hanzi_variant deduplicates on along with
+        Count: the hanzi itself, or Simplified for Unknown
+    """
+    column = "Traditional" if variant == "Unknown" else variant
+    key = "Simplified" if variant == "Unknown" else variant
+    rows = dict()
+    frame = load_hsk_hanzi().select(
+        pl.col(column).alias("hanzi"), pl.col(key).alias("key"), "HSK Grade"
+    )
+    for i, (zi, dedup_key, grade) in enumerate(frame.iter_rows()):
+        rows.setdefault(zi, []).append((i, dedup_key, grade))
+
+    return {zi: tuple(zi_rows) for zi, zi_rows in rows.items()}
+
+
+@cached
+def get_hsk_grade_map(variant: str) -> dict[str, int]:
+    """
+    Shared, read-only HSKHanzi.get_HSK_grade_map, built once per process
+
+    Parameters
+    ----------
+    variant : str
+        variant of the character set (Simplified|Traditional|Unknown)
+
+    Returns
+    -------
+    _ : dict[str, int]
+        HSK grade of each hanzi of the variant
+    """
+    return HSKHanzi().get_HSK_grade_map(variant)
+
+
+@cached
+def get_hsk_lookup(codepoints: bool = False) -> tuple[frozenset]:
+    """
+    Gets the HSK hanzi sets that partition_hanzi tests membership against
+
+    Parameters
+    ----------
+    codepoints : bool
+        if True, sets hold codepoints rather than characters
+
+    Returns
+    -------
+    _ : tuple[frozenset]
+        simplified HSK hanzi, traditional equivalents, and either
+    """
+    frame = load_hsk_hanzi()
+    simplified = set(frame["Simplified"])
+    traditional = set(frame["Traditional"])
+    if codepoints:
+        simplified = set(map(ord, simplified))
+        traditional = set(map(ord, traditional))
+
+    return (
+        frozenset(simplified),
+        frozenset(traditional),
+        frozenset(simplified | traditional),
+    )
 
 
 class HSKHanzi:
@@ -18,10 +215,7 @@ class HSKHanzi:
     """
 
     def __init__(self, variant=None):
-        self.HSK_hanzi = pl.read_parquet(
-            os.path.join(ASSETS_DIR, "hsk30_hanzi.parquet"),
-            hive_schema=HSK30_HANZI_SCHEMA,
-        )
+        self.HSK_hanzi = load_hsk_hanzi()
         self.HSK_hanzi_sublist = self.HSK_hanzi.select(variant).to_series().to_list()
 
     def get_all_HSK_hanzi(self):
@@ -29,3 +223,18 @@ class HSKHanzi:
 
     def get_HSK_hanzi_sublist(self):
         return self.HSK_hanzi_sublist
+
+    def get_HSK_grade_map(self, variant: str) -> dict[str, int]:
+        """
+        Maps each hanzi of a variant to its HSK grade
+        Unknown variants map Traditional hanzi, as in get_counts_per_hanzi
+        Where a hanzi appears in several rows the first row is kept,
+        as in filter_dataframe_by_hanzi_variant
+        """
+        if variant == "Unknown":
+            variant = "Traditional"
+        grade_map = dict()
+        for zi, grade in self.HSK_hanzi.select(variant, "HSK Grade").iter_rows():
+            grade_map.setdefault(zi, grade)
+
+        return grade_map
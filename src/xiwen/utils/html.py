@@ -1,12 +1,59 @@
-import requests
-import time
+import logging
 from bs4 import BeautifulSoup
-from masquer import masq
+from .decode import decode_html
+from .scheduler import FetchError, get_scheduler
+from .stream import open_stream
+
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_html(url: str) -> str:
+    """
+    Fetches and decodes HTML from a user-provided URL
+    Retries, rate limits and circuit breaking follow the shared FetchScheduler
+
+    Parameters
+    ----------
+    url : str
+        URL provided by user
+
+    Returns
+    -------
+    _ : str
+        HTML document extracted from URL
+
+    Raises FetchError with the reason if the URL cannot be fetched
+    """
+    return get_scheduler().fetch(url)
+
+
+def read_html(path: str) -> str:
+    """
+    Reads and decodes a local HTML (or plain text) file
+    Compressed files (gzip, bz2, zstd, xz) are decompressed transparently
+    Encodings are resolved as for fetched pages, from <meta> or by fallback
+    The whole decompressed file is held in memory, so this is only for
+    files of bounded size; stream large ones with read_codepoints
+
+    Parameters
+    ----------
+    path : str
+        file path
+
+    Returns
+    -------
+    _ : str
+        decoded document
+    """
+    with open_stream(path) as f:
+        return decode_html(f.read())
 
 
 def get_html(url: str) -> BeautifulSoup:
     """
     Extracts HTML from a user-provided URL
+    Failures are logged with their reason
 
     Parameters
     ----------
@@ -16,18 +63,12 @@ def get_html(url: str) -> BeautifulSoup:
     Returns
     -------
     _ : BeautifulSoup
-        HTML extracted from URL
+        HTML extracted from URL, None if it could not be fetched
     """
-    max_retries = 3
-    for i in range(max_retries):
-        try:
-            header = masq(
-                ua=True, rf=True
-            )  # Get weighted-random user-agent and referer
-            header["Accept-Language"] = "en-US,en;q=0.9;q=0.7,zh-CN;q=0.6,zh;q=0.5"
-            response = requests.get(url, headers=header, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
-
-        except requests.exceptions.RequestException:
-            time.sleep(2**i)
+    try:
+        markup = fetch_html(url)
+    except FetchError as e:
+        logger.warning("Could not fetch HTML: %s", e)
+        return None
+
+    return BeautifulSoup(markup, "html.parser")
@@ -0,0 +1,216 @@
+import contextvars
+import os
+import polars as pl
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+from .config import MEMORY_RSS_INTERVAL
+from .tracing import current_span
+
+
+STATM_PATH = "/proc/self/statm"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+PROFILE_SCHEMA = {
+    "stage": pl.Utf8,
+    "calls": pl.Int64,
+    "seconds": pl.Float64,
+    "peak_bytes": pl.Int64,
+    "net_bytes": pl.Int64,
+    "rss_peak_bytes": pl.Int64,
+    "rss_net_bytes": pl.Int64,
+}
+
+_enabled = False
+_lock = threading.Lock()
+# Whether enable_memory_profiling started tracemalloc, so disabling
+# leaves tracing started by someone else running
+_started_tracemalloc = False
+_sampler = None
+_stop_sampler = threading.Event()
+# Highest RSS sampled since the last stage boundary
+_rss_peak = 0
+# Innermost open stage of this thread or task, as [start time, traced
+# bytes at start, traced peak, RSS at start, RSS peak, enclosing stage]
+_current = contextvars.ContextVar("xiwen_memory_stage", default=None)
+# Stage -> [calls, seconds, max peak, total net, max RSS peak, total RSS net]
+_profile = dict()
+
+
+def get_rss() -> Optional[int]:
+    """
+    Resident set size of this process in bytes
+
+    Returns
+    -------
+    _ : int | None
+        current RSS, or None where it cannot be read (non-Linux)
+    """
+    try:
+        with open(STATM_PATH, "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _sample_rss(interval: float) -> None:
+    global _rss_peak
+    while not _stop_sampler.wait(interval):
+        rss = get_rss() or 0
+        with _lock:
+            _rss_peak = max(_rss_peak, rss)
+
+
+def enable_memory_profiling(rss_interval: float = MEMORY_RSS_INTERVAL) -> None:
+    """
+    Starts recording memory per pipeline stage in this process
+        - peak and net Python allocations, with tracemalloc
+        - peak and net RSS, sampled by a background thread, which also
+          covers allocations tracemalloc cannot see (polars, lxml)
+    tracemalloc slows allocation-heavy code severalfold, so only
+    enable this for profiling runs and benchmarks
+
+    Parameters
+    ----------
+    rss_interval : float
+        seconds between RSS samples
+    """
+    global _enabled, _started_tracemalloc, _sampler
+    if _enabled:
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _stop_sampler.clear()
+    _sampler = threading.Thread(target=_sample_rss, args=(rss_interval,), daemon=True)
+    _sampler.start()
+    _enabled = True
+
+
+def disable_memory_profiling() -> None:
+    """Stops recording; the profile recorded so far is kept"""
+    global _enabled, _started_tracemalloc, _sampler
+    if not _enabled:
+        return
+    _enabled = False
+    _stop_sampler.set()
+    _sampler.join()
+    _sampler = None
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def reset_memory_profile() -> None:
+    """Drops the recorded profile"""
+    with _lock:
+        _profile.clear()
+
+
+def _enter() -> contextvars.Token:
+    global _rss_peak
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    rss = get_rss() or 0
+    parent = _current.get()
+    with _lock:
+        # Fold the enclosing stage's peak so far into it before resetting
+        if parent is not None:
+            parent[2] = max(parent[2], traced_peak)
+            parent[4] = max(parent[4], _rss_peak, rss)
+        tracemalloc.reset_peak()
+        _rss_peak = rss
+
+    return _current.set([time.perf_counter(), traced, traced, rss, rss, parent])
+
+
+def _exit(stage: str, token: contextvars.Token) -> tuple[int, int, int, int]:
+    global _rss_peak
+    end = time.perf_counter()
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    rss = get_rss() or 0
+    current = _current.get()
+    _current.reset(token)
+    with _lock:
+        start, start_traced, peak, start_rss, rss_peak, parent = current
+        peak = max(peak, traced_peak)
+        rss_peak = max(rss_peak, _rss_peak, rss)
+        # A nested stage's peak is also its enclosing stage's peak
+        if parent is not None:
+            parent[2] = max(parent[2], peak)
+            parent[4] = max(parent[4], rss_peak)
+        tracemalloc.reset_peak()
+        _rss_peak = rss
+
+        figures = (
+            peak - start_traced,
+            traced - start_traced,
+            rss_peak - start_rss,
+            rss - start_rss,
+        )
+        record = _profile.setdefault(stage, [0, 0.0, 0, 0, 0, 0])
+        record[0] += 1
+        record[1] += end - start
+        record[2] = max(record[2], figures[0])
+        record[3] += figures[1]
+        record[4] = max(record[4], figures[2])
+        record[5] += figures[3]
+
+    return figures
+
+
+@contextmanager
+def _measured(stage: str):
+    token = _enter()
+    try:
+        yield
+    finally:
+        peak, net, rss_peak, rss_net = _exit(stage, token)
+        stage_span = current_span()
+        stage_span.set_attribute("memory.peak_bytes", peak)
+        stage_span.set_attribute("memory.net_bytes", net)
+        stage_span.set_attribute("memory.rss_peak_bytes", rss_peak)
+        stage_span.set_attribute("memory.rss_net_bytes", rss_net)
+
+
+_NOT_MEASURED = nullcontext()
+
+
+def measure_memory(stage: str):
+    """
+    Context manager recording the memory and time used by its block
+    Stages may nest: an enclosing stage's peak includes its nested
+    stages' peaks. Allocations are counted process-wide, so measure
+    one document at a time for per-stage figures
+    While profiling is disabled, returns a shared no-op context manager
+    When tracing, the figures are also set on the current span
+
+    Parameters
+    ----------
+    stage : str
+        stage name, e.g. parse
+    """
+    if not _enabled:
+        return _NOT_MEASURED
+
+    return _measured(stage)
+
+
+def get_memory_profile() -> pl.DataFrame:
+    """
+    Memory and timing recorded per stage since the last reset
+        - peak_bytes: highest Python allocation above the stage's start
+        - net_bytes: Python allocations still held at the stage's end
+        - rss_peak_bytes, rss_net_bytes: the same for sampled RSS
+          (0 where RSS cannot be read)
+    Peaks are the maximum over calls; seconds and net figures are totals
+
+    Returns
+    -------
+    _ : pl.DataFrame
+        one row per stage, in the order first seen
+    """
+    with _lock:
+        rows = [[stage, *record] for stage, record in _profile.items()]
+
+    return pl.DataFrame(rows, schema=PROFILE_SCHEMA, orient="row")
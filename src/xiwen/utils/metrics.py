@@ -0,0 +1,325 @@
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import METRICS_BUCKETS, METRICS_HOST, METRICS_PORT
+
+
+# Metric name -> (type, help); values are only recorded for these names
+METRICS = {
+    "xiwen_documents_total": (
+        "counter",
+        "Documents analysed, by result (analysed|empty)",
+    ),
+    "xiwen_hanzi_total": (
+        "counter",
+        "Hanzi extracted from analysed documents (rate() gives hanzi per second)",
+    ),
+    "xiwen_stage_seconds": (
+        "histogram",
+        "Duration of pipeline stages, by stage",
+    ),
+    "xiwen_fetch_requests_total": (
+        "counter",
+        "HTTP requests sent, by outcome (ok|error)",
+    ),
+    "xiwen_fetch_seconds": ("histogram", "Latency of HTTP requests"),
+    "xiwen_fetch_bytes_total": ("counter", "Response bytes fetched"),
+    "xiwen_fetch_retries_total": ("counter", "Fetch retries, by reason"),
+    "xiwen_fetch_errors_total": ("counter", "Failed fetches, by reason"),
+    "xiwen_cache_requests_total": (
+        "counter",
+        "Reference data cache lookups, by function and result (hit|miss)",
+    ),
+    "xiwen_exports_total": ("counter", "Files exported, by format"),
+    "xiwen_export_rows_total": ("counter", "Rows exported"),
+}
+
+_enabled = False
+_lock = threading.Lock()
+# (name, labels) -> value for counters, [bucket counts, sum, count] for histograms
+_values = dict()
+
+
+def _reset_in_child() -> None:
+    # A forked child inherits the parent's values, which the parent still
+    # counts; starting empty keeps them from being merged back twice
+    global _enabled, _lock, _values
+    _enabled = False
+    _lock = threading.Lock()
+    _values = dict()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_in_child)
+
+
+def enable_metrics() -> None:
+    """Starts recording metrics in this process"""
+    global _enabled
+    _enabled = True
+
+
+def disable_metrics() -> None:
+    """Stops recording metrics; recorded values are kept"""
+    global _enabled
+    _enabled = False
+
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+
+def reset_metrics() -> None:
+    """Drops all recorded values"""
+    with _lock:
+        _values.clear()
+
+
+def take_metrics() -> dict:
+    """
+    Removes and returns all recorded values, e.g. to send those of a
+    worker process to its parent
+
+    Returns
+    -------
+    values : dict
+        recorded values, for merge_metrics
+    """
+    with _lock:
+        values = dict(_values)
+        _values.clear()
+
+    return values
+
+
+def merge_metrics(values: dict) -> None:
+    """
+    Adds values recorded elsewhere, e.g. in a worker process, to this
+    process's metrics
+
+    Parameters
+    ----------
+    values : dict
+        recorded values, from take_metrics
+    """
+    with _lock:
+        for key, value in values.items():
+            if not isinstance(value, list):
+                _values[key] = _values.get(key, 0) + value
+                continue
+            histogram = _values.get(key)
+            if histogram is None:
+                histogram = _values[key] = [[0] * len(METRICS_BUCKETS), 0.0, 0]
+            buckets, total, count = value
+            histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+            histogram[1] += total
+            histogram[2] += count
+
+
+@contextmanager
+def collect_metrics(enabled: bool):
+    """
+    Records the metrics of one job in a worker process, which starts
+    with metrics disabled and no values (forked children are reset),
+    so they can be merged into its parent's
+
+    Parameters
+    ----------
+    enabled : bool
+        whether the parent records metrics
+
+    Yields
+    ------
+    values : dict
+        filled on exit with the job's values, for merge_metrics
+    """
+    global _enabled
+    was_enabled = _enabled
+    _enabled = enabled
+    values = dict()
+    try:
+        yield values
+    finally:
+        _enabled = was_enabled
+        values.update(take_metrics())
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """
+    Adds to a counter; does nothing while metrics are disabled
+
+    Parameters
+    ----------
+    name : str
+        counter name, see METRICS
+
+    value : float
+        amount to add
+
+    labels
+        label values, e.g. reason="timeout"
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """
+    Records a value in a histogram; does nothing while metrics are disabled
+
+    Parameters
+    ----------
+    name : str
+        histogram name, see METRICS
+
+    value : float
+        observed value, e.g. seconds
+
+    labels
+        label values, e.g. stage="parse"
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _values.get(key)
+        if histogram is None:
+            histogram = _values[key] = [[0] * len(METRICS_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(METRICS_BUCKETS):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+@contextmanager
+def _timer(name: str, labels: dict):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+_NOT_TIMED = nullcontext()
+
+
+def timed(name: str, **labels):
+    """
+    Context manager recording the duration of its block in a histogram
+    While metrics are disabled, returns a shared no-op context manager
+
+    Parameters
+    ----------
+    name : str
+        histogram name, see METRICS
+
+    labels
+        label values, e.g. stage="parse"
+    """
+    if not _enabled:
+        return _NOT_TIMED
+
+    return _timer(name, labels)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics() -> str:
+    """
+    Formats all recorded values in the Prometheus text exposition format
+
+    Returns
+    -------
+    _ : str
+        metrics text, e.g. for a /metrics endpoint
+    """
+    with _lock:
+        values = sorted(
+            (k, [list(v[0]), v[1], v[2]] if isinstance(v, list) else v)
+            for k, v in _values.items()
+        )
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), value in values:
+            if metric != name:
+                continue
+            if kind == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            buckets, total, count = value
+            for bound, bucket_count in zip(METRICS_BUCKETS, buckets):
+                le = labels + (("le", _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(le)} {bucket_count}")
+            le = labels + (("le", "+Inf"),)
+            lines.append(f"{name}_bucket{_format_labels(le)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves render_metrics at /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(
+    port: int = METRICS_PORT, host: str = METRICS_HOST
+) -> ThreadingHTTPServer:
+    """
+    Enables metrics and serves them over HTTP from a background thread
+
+    Parameters
+    ----------
+    port : int
+        port to listen on (0: any free port, see server.server_port)
+
+    host : str
+        interface to listen on (default: local connections only)
+
+    Returns
+    -------
+    server : ThreadingHTTPServer
+        running server; call server.shutdown() to stop it
+    """
+    enable_metrics()
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
@@ -0,0 +1,190 @@
+import heapq
+import polars as pl
+from typing import Iterable, Optional
+from .hsk_hanzi import get_hsk_grade_map
+from .pinyin import map_pinyin
+
+# Grade assigned to n-grams containing any non-HSK hanzi, as in compute_stats
+OUTLIER_GRADE = 10
+
+
+def iter_ngrams(run: str, n: int):
+    """
+    Slides a window of n characters across one run of hanzi
+    Runs shorter than n yield nothing, so n-grams never span text boundaries
+
+    Parameters
+    ----------
+    run : str
+        sequence of adjacent hanzi
+
+    n : int
+        n-gram length
+
+    Yields
+    ------
+    _ : str
+        n-gram
+    """
+    for i in range(len(run) - n + 1):
+        yield run[i : i + n]
+
+
+class NGramCounter:
+    """
+    Streaming n-gram frequency table with bounded memory
+
+    When max_entries is set and the table grows beyond it, only the
+    max_entries // 2 most frequent n-grams are kept. Counts for surviving
+    n-grams may then be low by at most max_undercount.
+
+    Attributes
+    ----------
+    n : int
+        n-gram length
+
+    max_entries : int | None
+        table size that triggers pruning (None: never prune)
+
+    counts : dict
+        count of each n-gram
+
+    total : int
+        number of n-grams seen, including pruned ones
+
+    max_undercount : int
+        sum of the highest count discarded by each pruning,
+        an upper bound on how far any count may be too low
+    """
+
+    def __init__(self, n: int = 2, max_entries: Optional[int] = None):
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        if max_entries is not None and max_entries < 2:
+            raise ValueError(f"max_entries must be at least 2, got {max_entries}")
+        self.n = n
+        self.max_entries = max_entries
+        self.counts = dict()
+        self.total = 0
+        self.max_undercount = 0
+
+    def update(self, run: str) -> None:
+        """
+        Counts the n-grams in one run of adjacent hanzi
+        The table is pruned as soon as a new n-gram takes it beyond
+        max_entries, so a long run cannot grow it further
+        """
+        counts, max_entries = self.counts, self.max_entries
+        for ngram in iter_ngrams(run, self.n):
+            count = counts.get(ngram)
+            if count is not None:
+                counts[ngram] = count + 1
+                continue
+            counts[ngram] = 1
+            if max_entries is not None and len(counts) > max_entries:
+                self.prune()
+                counts = self.counts
+        self.total += max(len(run) - self.n + 1, 0)
+
+    def prune(self) -> None:
+        """
+        Keeps the max_entries // 2 most frequent n-grams
+        """
+        keep = heapq.nlargest(
+            self.max_entries // 2, self.counts.items(), key=lambda item: item[1]
+        )
+        kept = dict(keep)
+        if len(kept) < len(self.counts):
+            self.max_undercount += max(
+                v for k, v in self.counts.items() if k not in kept
+            )
+        self.counts = kept
+
+    def most_common(self, top_k: Optional[int] = None) -> list[tuple[str, int]]:
+        """
+        Gets n-grams by descending count, ties in codepoint order
+        """
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+        return ranked if top_k is None else ranked[:top_k]
+
+
+def count_ngrams(
+    runs: Iterable[str], n: int = 2, max_entries: Optional[int] = None
+) -> NGramCounter:
+    """
+    Counts n-grams over a stream of hanzi runs
+
+    Parameters
+    ----------
+    runs : Iterable[str]
+        sequences of adjacent hanzi, e.g. from iter_hanzi_runs
+
+    n : int
+        n-gram length
+
+    max_entries : int | None
+        table size that triggers pruning (None: exact counts)
+
+    Returns
+    -------
+    counter : NGramCounter
+        n-gram counts
+    """
+    counter = NGramCounter(n, max_entries)
+    for run in runs:
+        counter.update(run)
+
+    return counter
+
+
+def get_ngrams_df(
+    counter: NGramCounter, variant: str, top_k: Optional[int] = None
+) -> pl.DataFrame:
+    """
+    Tabulates n-gram counts with HSK grades and pinyin
+    An n-gram's grade is the highest grade of its hanzi,
+    or 10 if any of its hanzi are not in the HSK
+
+    Parameters
+    ----------
+    counter : NGramCounter
+        n-gram counts
+
+    variant : str
+        variant of the character set (Simplified|Traditional|Unknown)
+
+    top_k : int | None
+        number of most frequent n-grams to keep (None: all)
+
+    Returns
+    -------
+    ngrams_df : pl.DataFrame
+        n-grams sorted by descending count
+    """
+    grade_map = get_hsk_grade_map(variant)
+    pinyin_map = map_pinyin()
+    ngrams, counts, grades, pinyin = [], [], [], []
+
+    for ngram, count in counter.most_common(top_k):
+        ngrams.append(ngram)
+        counts.append(count)
+        grades.append(max(grade_map.get(zi, OUTLIER_GRADE) for zi in ngram))
+        pinyin.append(" ".join(pinyin_map.get(zi, "?") for zi in ngram))
+
+    ngrams_df = pl.DataFrame(
+        {
+            "N-gram": ngrams,
+            "Pinyin": pinyin,
+            "HSK Grade": grades,
+            "Count": counts,
+        },
+        schema={
+            "N-gram": pl.Utf8,
+            "Pinyin": pl.Utf8,
+            "HSK Grade": pl.Int8,
+            "Count": pl.Int32,
+        },
+    )
+
+    return ngrams_df
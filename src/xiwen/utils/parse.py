@@ -0,0 +1,169 @@
+import re
+import warnings
+from bs4 import BeautifulSoup
+from html import unescape
+from typing import Callable
+from .config import HTML_PARSER
+from .memory import measure_memory
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # Optional dependency
+    lxml = None
+
+
+# Comments, raw text elements (no entity decoding), then any other tag
+TOKEN = re.compile(
+    r"<!--(?P<comment>.*?)(?:-->|$)"
+    r"|<(?P<raw>script|style)\b(?P<raw_attrs>[^>]*)>(?P<raw_text>.*?)(?:</(?P=raw)\s*>|$)"
+    r"|<(?P<tag>[^>]*)>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def parse_with_html_parser(markup: str) -> str:
+    """
+    Parses HTML with BeautifulSoup and the standard library html.parser
+
+    Parameters
+    ----------
+    markup : str
+        HTML document
+
+    Returns
+    -------
+    _ : str
+        document serialised after parsing
+    """
+    with measure_memory("parse.soup"):
+        soup = BeautifulSoup(markup, "html.parser")
+    with measure_memory("parse.serialise"):
+        return str(soup)
+
+
+def parse_with_lxml(markup: str) -> str:
+    """
+    Parses HTML with lxml (C implementation, optional dependency)
+
+    Parameters
+    ----------
+    markup : str
+        HTML document
+
+    Returns
+    -------
+    _ : str
+        document serialised after parsing
+    """
+    if not markup.strip():
+        return ""
+    root = lxml.html.document_fromstring(markup)
+
+    return etree.tostring(root, encoding="unicode", method="html")
+
+
+def iter_text_nodes(markup: str):
+    """
+    Minimal tokenizer yielding the text-bearing parts of an HTML document
+        - text between tags, with character references decoded
+        - tag contents (attribute values), with character references decoded
+        - comments and script/style contents, verbatim
+
+    Parameters
+    ----------
+    markup : str
+        HTML document
+
+    Yields
+    ------
+    _ : str
+        text node
+    """
+    position = 0
+    for token in TOKEN.finditer(markup):
+        if token.start() > position:
+            yield unescape(markup[position : token.start()])
+        if token.group("comment") is not None:
+            yield token.group("comment")
+        elif token.group("raw") is not None:
+            yield unescape(token.group("raw_attrs"))
+            yield token.group("raw_text")
+        else:
+            yield unescape(token.group("tag"))
+        position = token.end()
+
+    if position < len(markup):
+        yield unescape(markup[position:])
+
+
+def parse_text_nodes(markup: str) -> str:
+    """
+    Extracts text nodes with the built-in tokenizer
+    Nodes are separated by newlines to preserve text boundaries
+
+    Parameters
+    ----------
+    markup : str
+        HTML document
+
+    Returns
+    -------
+    _ : str
+        text nodes joined by newlines
+    """
+    return "\n".join(iter_text_nodes(markup))
+
+
+PARSERS = {
+    "html.parser": parse_with_html_parser,
+    "lxml": parse_with_lxml,
+    "text": parse_text_nodes,
+}
+
+
+def get_parser(backend: str = HTML_PARSER) -> Callable[[str], str]:
+    """
+    Gets the parser function for a backend
+    Falls back to html.parser if lxml is not installed
+
+    Parameters
+    ----------
+    backend : str
+        parser backend name (html.parser|lxml|text)
+
+    Returns
+    -------
+    _ : Callable[[str], str]
+        function mapping HTML to the text to scan for hanzi
+    """
+    if backend not in PARSERS:
+        raise ValueError(
+            f"Unknown parser backend '{backend}', expected one of {list(PARSERS)}"
+        )
+
+    if backend == "lxml" and lxml is None:
+        warnings.warn("lxml is not installed, falling back to html.parser")
+        backend = "html.parser"
+
+    return PARSERS[backend]
+
+
+def parse_html(markup: str, backend: str = HTML_PARSER) -> str:
+    """
+    Parses HTML with the selected backend
+
+    Parameters
+    ----------
+    markup : str
+        HTML document
+
+    backend : str
+        parser backend name (html.parser|lxml|text)
+
+    Returns
+    -------
+    _ : str
+        text to scan for hanzi
+    """
+    return get_parser(backend)(markup)
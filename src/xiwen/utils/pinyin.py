@@ -1,9 +1,27 @@
+from typing import Mapping
+from .cache import cached
 from .config import ENCODING, PINYIN_PATH
+from .shared import get_reference_tables
 
 
-def map_pinyin() -> dict:
+def map_pinyin() -> Mapping[str, str]:
     """
     Returns a dictionary mapping Chinese characters to pinyin
+    If reference tables are attached (attach_reference_tables), returns
+    their shared read-only table instead of loading a private dict
+    """
+    tables = get_reference_tables()
+    if tables is not None:
+        return tables.pinyin
+
+    return read_pinyin()
+
+
+@cached
+def read_pinyin() -> dict[str, str]:
+    """
+    Loads the pinyin file once per process into a dictionary
+    mapping Chinese characters to pinyin
     """
     hanzi_pinyin_dict = dict()
 
@@ -0,0 +1,488 @@
+import asyncio
+import contextvars
+import random
+import requests
+import threading
+import time
+from concurrent.futures import Executor
+from email.utils import parsedate_to_datetime
+from masquer import masq
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+from .config import (
+    BREAKER_COOLDOWN,
+    BREAKER_THRESHOLD,
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_CAP,
+    FETCH_BURST,
+    FETCH_MAX_RETRIES,
+    FETCH_MAX_RETRY_AFTER,
+    FETCH_RATE,
+    FETCH_TIMEOUT,
+)
+from .decode import decode_html
+from .metrics import inc, timed
+from .tracing import span
+
+
+# Statuses worth retrying: rate limited, or a transient server error
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """
+    Raised when a URL cannot be fetched
+
+    Attributes
+    ----------
+    url : str
+        URL requested
+
+    reason : str
+        invalid_url|circuit_open|http_status|rate_limited|timeout|connection|request
+
+    status : int | None
+        HTTP status of the last response, if any
+
+    attempts : int
+        number of requests made
+    """
+
+    def __init__(
+        self,
+        url: str,
+        reason: str,
+        detail: str = "",
+        status: Optional[int] = None,
+        attempts: int = 0,
+    ):
+        self.url = url
+        self.reason = reason
+        self.status = status
+        self.attempts = attempts
+        message = f"{reason}: {url}"
+        if detail:
+            message += f" ({detail})"
+        super().__init__(message)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+    reserve() books the next slot and returns the wait for it, so
+    callers can sleep (or await) without holding the bucket
+
+    Attributes
+    ----------
+    rate : float
+        tokens added per second
+
+    capacity : float
+        maximum tokens, i.e. the largest burst
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """Takes a token, returning the seconds to wait before using it"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        # A negative balance is a queue of reservations
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float, now: Optional[float] = None) -> None:
+        """Holds back every reservation for seconds, e.g. for Retry-After"""
+        now = time.monotonic() if now is None else now
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+class CircuitBreaker:
+    """
+    Fails fast for a host after repeated errors
+        - closed: requests allowed, consecutive failures counted
+        - open: requests refused until cooldown has passed
+        - half-open: a single trial request, which closes or reopens it
+
+    Attributes
+    ----------
+    threshold : int
+        consecutive failures that open the circuit
+
+    cooldown : float
+        seconds to stay open before a trial request
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.trial or now - self.opened_at < self.cooldown:
+            return False
+        self.trial = True
+
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        self.failures += 1
+        if self.trial or self.failures >= self.threshold:
+            self.opened_at = time.monotonic() if now is None else now
+            self.trial = False
+
+    def end_trial(self) -> None:
+        """
+        Frees the trial slot of a request that ended without a verdict,
+        e.g. when cancelled, so the next request after it can try again
+        """
+        self.trial = False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header
+
+    Parameters
+    ----------
+    value : str | None
+        delay in seconds, or an HTTP date
+
+    Returns
+    -------
+    _ : float | None
+        seconds to wait, or None if absent or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None or retry_at.tzinfo is None:
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def send_request(url: str) -> requests.Response:
+    """
+    Sends a single GET request with browser-like headers
+
+    Parameters
+    ----------
+    url : str
+        URL to request
+
+    Returns
+    -------
+    _ : requests.Response
+        response, of any status
+    """
+    header = masq(ua=True, rf=True)  # Get weighted-random user-agent and referer
+    header["Accept-Language"] = "en-US,en;q=0.9;q=0.7,zh-CN;q=0.6,zh;q=0.5"
+
+    return requests.get(url, headers=header, timeout=FETCH_TIMEOUT)
+
+
+def set_attempt_attributes(
+    attempt_span,
+    response: Optional[requests.Response],
+    error: Optional[requests.RequestException],
+) -> None:
+    """Records the outcome of a request on its trace span"""
+    if response is not None:
+        attempt_span.set_attribute("http.status_code", response.status_code)
+        attempt_span.set_attribute("bytes", len(response.content))
+    else:
+        attempt_span.set_attribute("error", type(error).__name__)
+
+
+class FetchScheduler:
+    """
+    Retry and politeness policy for fetching HTML
+        - per-host token bucket rate limits
+        - jittered exponential backoff between attempts, never after the last
+        - Retry-After honoured, pausing the whole host
+        - per-host circuit breaker
+    fetch() sleeps between attempts; afetch() awaits instead, freeing the
+    event loop (and its workers) while it waits
+    Failures raise FetchError with a reason
+
+    Attributes
+    ----------
+    send : Callable[[str], requests.Response]
+        function making a single request
+    """
+
+    def __init__(
+        self,
+        rate: float = FETCH_RATE,
+        burst: float = FETCH_BURST,
+        max_retries: int = FETCH_MAX_RETRIES,
+        backoff_base: float = FETCH_BACKOFF_BASE,
+        backoff_cap: float = FETCH_BACKOFF_CAP,
+        max_retry_after: float = FETCH_MAX_RETRY_AFTER,
+        breaker_threshold: int = BREAKER_THRESHOLD,
+        breaker_cooldown: float = BREAKER_COOLDOWN,
+        send: Callable[[str], requests.Response] = send_request,
+    ):
+        if max_retries < 1:
+            raise ValueError(f"max_retries must be at least 1, got {max_retries}")
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.send = send
+        self.buckets = dict()
+        self.breakers = dict()
+        self.lock = threading.Lock()
+
+    def _get_host(self, url: str) -> str:
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            parts = None
+        if not parts or parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError(url, "invalid_url")
+
+        return parts.hostname
+
+    def _reserve(self, url: str, host: str, attempts: int) -> tuple[float, bool]:
+        """
+        Checks the host's circuit and books a request slot
+
+        Returns
+        -------
+        wait : float
+            seconds to wait before sending
+
+        trial : bool
+            True if this is the half-open circuit's trial request
+        """
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+                self.breakers[host] = CircuitBreaker(
+                    self.breaker_threshold, self.breaker_cooldown
+                )
+            breaker = self.breakers[host]
+            if not breaker.allow():
+                raise FetchError(url, "circuit_open", host, attempts=attempts)
+
+            return self.buckets[host].reserve(), breaker.trial
+
+    def _end_trial(self, host: str) -> None:
+        with self.lock:
+            self.breakers[host].end_trial()
+
+    def _resolve(
+        self,
+        url: str,
+        host: str,
+        attempt: int,
+        response: Optional[requests.Response],
+        error: Optional[requests.RequestException],
+    ) -> tuple[Optional[str], float]:
+        """
+        Interprets the outcome of an attempt
+
+        Returns
+        -------
+        markup : str | None
+            decoded HTML on success, else None
+
+        delay : float
+            seconds to wait before retrying
+
+        Raises FetchError if the failure is final
+        """
+        attempts = attempt + 1
+        status = response.status_code if response is not None else None
+        if error is None and status < 400:
+            with self.lock:
+                self.breakers[host].record_success()
+            inc("xiwen_fetch_requests_total", outcome="ok")
+            inc("xiwen_fetch_bytes_total", len(response.content))
+            return decode_html(response.content, response.headers), 0.0
+
+        if error is not None:
+            if isinstance(error, requests.Timeout):
+                reason = "timeout"
+            elif isinstance(error, requests.ConnectionError):
+                reason = "connection"
+            else:
+                # Malformed requests will not succeed on retry
+                with self.lock:
+                    self.breakers[host].record_failure()
+                raise FetchError(url, "request", str(error), attempts=attempts)
+            detail = str(error)
+            inc("xiwen_fetch_requests_total", outcome="error")
+        else:
+            reason = "rate_limited" if status == 429 else "http_status"
+            detail = f"HTTP {status}"
+            inc("xiwen_fetch_requests_total", outcome="error")
+            if status not in RETRYABLE_STATUSES:
+                # The host answered, so its circuit can close
+                with self.lock:
+                    self.breakers[host].record_success()
+                raise FetchError(url, reason, detail, status, attempts)
+
+        # Only host-level trouble counts towards the circuit breaker
+        retry_after = None
+        with self.lock:
+            self.breakers[host].record_failure()
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    self.buckets[host].pause(min(retry_after, self.max_retry_after))
+
+        if attempts >= self.max_retries:
+            raise FetchError(url, reason, detail, status, attempts)
+        if retry_after is not None and retry_after > self.max_retry_after:
+            detail += f", Retry-After {retry_after:.0f}s"
+            raise FetchError(url, reason, detail, status, attempts)
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+        inc("xiwen_fetch_retries_total", reason=reason)
+
+        return None, max(delay, retry_after or 0.0)
+
+    def _send(
+        self, url: str, attempt: int
+    ) -> tuple[Optional[requests.Response], Optional[requests.RequestException]]:
+        """Makes a single request, returning the response or the error"""
+        response, error = None, None
+        with span("fetch.attempt", attempt=attempt + 1) as attempt_span:
+            try:
+                with timed("xiwen_fetch_seconds"):
+                    response = self.send(url)
+            except requests.RequestException as e:
+                error = e
+            set_attempt_attributes(attempt_span, response, error)
+
+        return response, error
+
+    def fetch(self, url: str) -> str:
+        """
+        Fetches and decodes HTML, blocking the calling thread while it waits
+
+        Parameters
+        ----------
+        url : str
+            URL to fetch
+
+        Returns
+        -------
+        _ : str
+            HTML document extracted from URL
+        """
+        with span("fetch", url=url):
+            try:
+                host = self._get_host(url)
+                for attempt in range(self.max_retries):
+                    wait, trial = self._reserve(url, host, attempt)
+                    try:
+                        time.sleep(wait)
+                        response, error = self._send(url, attempt)
+                        markup, delay = self._resolve(
+                            url, host, attempt, response, error
+                        )
+                    finally:
+                        if trial:
+                            self._end_trial(host)
+                    if markup is not None:
+                        return markup
+                    time.sleep(delay)
+            except FetchError as e:
+                inc("xiwen_fetch_errors_total", reason=e.reason)
+                raise
+
+    async def afetch(self, url: str, executor: Optional[Executor] = None) -> str:
+        """
+        Fetches and decodes HTML without blocking the event loop
+
+        Parameters
+        ----------
+        url : str
+            URL to fetch
+
+        executor : Executor | None
+            executor the request runs in (None: the loop's default)
+
+        Returns
+        -------
+        _ : str
+            HTML document extracted from URL
+        """
+        loop = asyncio.get_running_loop()
+        with span("fetch", url=url):
+            try:
+                host = self._get_host(url)
+                for attempt in range(self.max_retries):
+                    wait, trial = self._reserve(url, host, attempt)
+                    try:
+                        await asyncio.sleep(wait)
+                        # The attempt span nests in this task's fetch span
+                        context = contextvars.copy_context()
+                        response, error = await loop.run_in_executor(
+                            executor, context.run, self._send, url, attempt
+                        )
+                        markup, delay = self._resolve(
+                            url, host, attempt, response, error
+                        )
+                    finally:
+                        if trial:
+                            self._end_trial(host)
+                    if markup is not None:
+                        return markup
+                    await asyncio.sleep(delay)
+            except FetchError as e:
+                inc("xiwen_fetch_errors_total", reason=e.reason)
+                raise
+
+
+_scheduler = None
+
+
+def get_scheduler() -> FetchScheduler:
+    """
+    Gets the shared FetchScheduler, so rate limits and circuit
+    breakers apply across all callers in the process
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FetchScheduler()
+
+    return _scheduler
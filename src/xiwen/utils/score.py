@@ -0,0 +1,167 @@
+import math
+import polars as pl
+from typing import Mapping, Optional, Sequence, Union
+from .cache import cached
+from .config import COVERAGE_THRESHOLDS, HSK_GRADES
+from .count import counts_by_hanzi
+from .hsk_hanzi import get_hsk_grade_map, load_hsk_hanzi
+from .ngrams import OUTLIER_GRADE
+
+
+# Reference values for hanzi missing from the HSK dataset:
+# rarer than any listed hanzi, seen once in the JD corpus
+UNKNOWN_PERCENTILE = 100.0
+UNKNOWN_FREQUENCY = 1
+
+
+@cached
+def get_reference_scores() -> pl.DataFrame:
+    """
+    Per-hanzi HSK grade and JD frequency figures for scoring
+    Simplified and Traditional forms share one table; a hanzi listed
+    more than once keeps its first row, Simplified forms first
+
+    Returns
+    -------
+    _ : pl.DataFrame
+        hanzi, grade, JD Percentile, log10 of JD Frequency
+    """
+    hsk = load_hsk_hanzi()
+    columns = [
+        pl.col("HSK Grade").cast(pl.Int8).alias("grade"),
+        pl.col("JD Percentile").cast(pl.Float64),
+        pl.col("JD Frequency").cast(pl.Float64).log10().alias("log_frequency"),
+    ]
+
+    return pl.concat(
+        [
+            hsk.select(pl.col(variant).alias("hanzi"), *columns)
+            for variant in ("Simplified", "Traditional")
+        ]
+    ).unique(subset="hanzi", keep="first", maintain_order=True)
+
+
+def score_documents(
+    counts: Union[pl.DataFrame, pl.LazyFrame],
+    id_columns: Union[str, Sequence[str]] = "url",
+    thresholds: Sequence[float] = COVERAGE_THRESHOLDS,
+) -> pl.LazyFrame:
+    """
+    Scores many documents in one grouped pass over their hanzi counts
+        - coverage_hsk<g>: share of hanzi (by count) at HSK grade g or below
+        - min_grade_<t>: lowest grade covering t% of the text
+          (OUTLIER_GRADE if HSK 7 falls short)
+        - difficulty: count-weighted mean JD Percentile, from 0 (only the
+          commonest hanzi) to 100 (only hanzi missing from the dataset)
+        - mean_log_frequency: count-weighted mean log10 JD Frequency,
+          higher for texts made of everyday hanzi
+        - unknown_share: share of hanzi beyond HSK
+
+    Parameters
+    ----------
+    counts : pl.DataFrame | pl.LazyFrame
+        one row per hanzi per document: id_columns, hanzi, count, and
+        optionally grade (e.g. scan_counts of a ResultStore); without a
+        grade column, grades are looked up in the reference table
+
+    id_columns : str | Sequence[str]
+        column(s) identifying a document
+
+    thresholds : Sequence[float]
+        coverage shares (0 to 1) to find the minimum grade for
+
+    Returns
+    -------
+    _ : pl.LazyFrame
+        one row of scores per document
+    """
+    counts = counts.lazy()
+    id_columns = [id_columns] if isinstance(id_columns, str) else list(id_columns)
+    reference = get_reference_scores().lazy()
+    if "grade" in counts.columns:
+        reference = reference.drop("grade")
+
+    grades = range(1, HSK_GRADES + 1)
+    count = pl.col("count").cast(pl.Int64)
+    totals = (
+        counts.join(reference, on="hanzi", how="left", coalesce=True)
+        .with_columns(
+            pl.col("grade").fill_null(OUTLIER_GRADE),
+            pl.col("JD Percentile").fill_null(UNKNOWN_PERCENTILE),
+            pl.col("log_frequency").fill_null(math.log10(UNKNOWN_FREQUENCY)),
+        )
+        .group_by(id_columns)
+        .agg(
+            count.sum().alias("total_count"),
+            *[
+                count.filter(pl.col("grade") <= g).sum().alias(f"coverage_hsk{g}")
+                for g in grades
+            ],
+            (count * pl.col("JD Percentile")).sum().alias("difficulty"),
+            (count * pl.col("log_frequency")).sum().alias("mean_log_frequency"),
+            count.filter(pl.col("grade") == OUTLIER_GRADE).sum().alias("unknown_share"),
+        )
+    )
+    # Turn the sums into shares and means of each document's total
+    per_hanzi = [f"coverage_hsk{g}" for g in grades] + [
+        "difficulty",
+        "mean_log_frequency",
+        "unknown_share",
+    ]
+    scores = totals.with_columns(pl.col(per_hanzi) / pl.col("total_count"))
+
+    return scores.with_columns(
+        pl.coalesce(
+            *[
+                pl.when(pl.col(f"coverage_hsk{g}") >= t).then(pl.lit(g, pl.Int8))
+                for g in grades
+            ],
+            pl.lit(OUTLIER_GRADE, pl.Int8),
+        ).alias(f"min_grade_{round(t * 100)}")
+        for t in thresholds
+    )
+
+
+def score_hanzi_lists(
+    hanzi_lists: Mapping[str, Sequence[str]],
+    variants: Optional[Mapping[str, str]] = None,
+    thresholds: Sequence[float] = COVERAGE_THRESHOLDS,
+) -> pl.DataFrame:
+    """
+    Scores in-memory documents, e.g. hanzi_list outputs of coordinator
+
+    Parameters
+    ----------
+    hanzi_lists : Mapping[str, Sequence[str]]
+        all characters (with duplicates), or codepoint arrays, per document ID
+
+    variants : Mapping[str, str] | None
+        hanzi variant per document ID, so grades match the stats tables
+        (default: grades from the shared reference table)
+
+    thresholds : Sequence[float]
+        coverage shares (0 to 1) to find the minimum grade for
+
+    Returns
+    -------
+    _ : pl.DataFrame
+        one row of scores per document (see score_documents)
+    """
+    columns = {"id": [], "hanzi": [], "count": []}
+    grades = []
+    for doc_id, hanzi_list in hanzi_lists.items():
+        hanzi_counts = counts_by_hanzi(hanzi_list)
+        columns["id"].extend([doc_id] * len(hanzi_counts))
+        columns["hanzi"].extend(hanzi_counts)
+        columns["count"].extend(hanzi_counts.values())
+        if variants is not None:
+            grade_map = get_hsk_grade_map(variants[doc_id])
+            grades.extend(grade_map.get(zi, OUTLIER_GRADE) for zi in hanzi_counts)
+
+    schema = {"id": pl.Utf8, "hanzi": pl.Utf8, "count": pl.Int32}
+    if variants is not None:
+        columns["grade"] = grades
+        schema["grade"] = pl.Int8
+    counts = pl.DataFrame(columns, schema=schema)
+
+    return score_documents(counts, "id", thresholds).sort("id").collect()
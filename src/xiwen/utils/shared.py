@@ -0,0 +1,273 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Iterator, Optional
+from .config import CACHE_DIR, ENCODING, PINYIN_PATH
+from .hsk_hanzi import HSK30_PARQUET_PATH, load_hsk_hanzi
+
+
+REFERENCE_TABLES_PATH = os.path.join(CACHE_DIR, "reference_tables.bin")
+# Assets the tables are built from
+REFERENCE_SOURCES = (HSK30_PARQUET_PATH, PINYIN_PATH)
+# Packed layout: header, then one byte per Unicode codepoint for each
+# grade table, then the pinyin table as sorted codepoints, end offsets
+# into a UTF-8 blob, and the blob
+# The header holds the layout version and a fingerprint of the sources,
+# so files written by other versions or from other assets are rebuilt
+MAGIC = b"XWREF\x00\x00\x00"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sIIII16s")
+HEADER_SIZE = 64
+UNICODE_SIZE = 0x110000
+# Grade tables: HSK grade of each codepoint (0 if not HSK) by variant;
+# HSK marks hanzi of either variant
+GRADE_TABLES = ("Simplified", "Traditional", "HSK")
+
+# Tables attached in this process, see attach_reference_tables
+_attached = None
+
+
+class PinyinTable(Mapping):
+    """
+    Read-only hanzi -> pinyin mapping over a packed table
+    A drop-in replacement for the map_pinyin dict that allocates
+    nothing until a hanzi is looked up
+    """
+
+    def __init__(self, codes: memoryview, ends: memoryview, blob: memoryview):
+        self.codes = codes
+        self.ends = ends
+        self.blob = blob
+
+    def __getitem__(self, zi: str) -> str:
+        if not isinstance(zi, str) or len(zi) != 1:
+            raise KeyError(zi)
+        code = ord(zi)
+        i = bisect_left(self.codes, code)
+        if i == len(self.codes) or self.codes[i] != code:
+            raise KeyError(zi)
+        start = self.ends[i - 1] if i else 0
+
+        return str(self.blob[start : self.ends[i]], ENCODING)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[str]:
+        return map(chr, self.codes)
+
+
+class ReferenceTables:
+    """
+    Read-only views of packed reference tables in a buffer
+    Nothing is copied, so a memory-mapped buffer is shared by
+    every process mapping it
+
+    Attributes
+    ----------
+    grade_tables : dict[str, memoryview]
+        HSK grade of each codepoint, indexed by codepoint, per table
+        (Simplified|Traditional|HSK)
+
+    pinyin : PinyinTable
+        hanzi -> pinyin mapping
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, version, table_size, num_pinyin, blob_size, _ = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a packed reference table buffer")
+
+        offset = HEADER_SIZE
+        self.grade_tables = dict()
+        for name in GRADE_TABLES:
+            self.grade_tables[name] = view[offset : offset + table_size]
+            offset += table_size
+        codes = view[offset : offset + 4 * num_pinyin].cast("I")
+        offset += 4 * num_pinyin
+        ends = view[offset : offset + 4 * num_pinyin].cast("I")
+        offset += 4 * num_pinyin
+        self.pinyin = PinyinTable(codes, ends, view[offset : offset + blob_size])
+
+    def grade_table(self, variant: str) -> memoryview:
+        """Grade table of a variant; Unknown uses Traditional"""
+        return self.grade_tables["Traditional" if variant == "Unknown" else variant]
+
+
+def get_sources_fingerprint() -> bytes:
+    """
+    Fingerprint of the assets the tables are built from, from their
+    sizes and modification times, so checking it reads no asset
+
+    Returns
+    -------
+    _ : bytes
+        16-byte digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in REFERENCE_SOURCES:
+        stat = os.stat(path)
+        digest.update(
+            f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+        )
+
+    return digest.digest()
+
+
+def _is_current(path: str) -> bool:
+    """
+    Whether a tables file exists, in this layout version, built from
+    the current assets
+
+    Parameters
+    ----------
+    path : str
+        location of the file
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, version, *_, fingerprint = HEADER.unpack(header)
+
+    return (
+        magic == MAGIC
+        and version == FORMAT_VERSION
+        and fingerprint == get_sources_fingerprint()
+    )
+
+
+def pack_reference_tables() -> bytes:
+    """
+    Packs the HSK grade tables and the pinyin table into one buffer
+
+    Returns
+    -------
+    _ : bytes
+        tables in the layout read by ReferenceTables
+    """
+    hsk = load_hsk_hanzi()
+    tables = {name: bytearray(UNICODE_SIZE) for name in GRADE_TABLES}
+    for variant in ("Simplified", "Traditional"):
+        for zi, grade in hsk.select(variant, "HSK Grade").iter_rows():
+            code = ord(zi)
+            # First row wins, as in HSKHanzi.get_HSK_grade_map
+            if not tables[variant][code]:
+                tables[variant][code] = grade
+            if not tables["HSK"][code]:
+                tables["HSK"][code] = grade
+
+    pinyin = dict()
+    with open(PINYIN_PATH, "r", encoding=ENCODING) as f:
+        for line in f:
+            key, value = line.strip().split()
+            pinyin[ord(key)] = value.encode(ENCODING)
+    codes = array("I", sorted(pinyin))
+    ends, total = array("I"), 0
+    for code in codes:
+        total += len(pinyin[code])
+        ends.append(total)
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        UNICODE_SIZE,
+        len(codes),
+        total,
+        get_sources_fingerprint(),
+    )
+
+    return b"".join(
+        [
+            header.ljust(HEADER_SIZE, b"\x00"),
+            *(bytes(tables[name]) for name in GRADE_TABLES),
+            codes.tobytes(),
+            ends.tobytes(),
+            *(pinyin[code] for code in codes),
+        ]
+    )
+
+
+def write_reference_tables(path: str = REFERENCE_TABLES_PATH) -> None:
+    """
+    Writes the packed reference tables to a file for memory-mapping
+    The file is replaced atomically so existing mappings stay valid
+
+    Parameters
+    ----------
+    path : str
+        destination of the file
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pack_reference_tables())
+    os.replace(tmp_path, path)
+
+
+def read_reference_tables(path: str = REFERENCE_TABLES_PATH) -> ReferenceTables:
+    """
+    Memory-maps packed reference tables read-only
+    Generates the file first if it is missing, or rebuilds it if it
+    was written by another layout version or from other assets
+
+    Parameters
+    ----------
+    path : str
+        location of the file
+
+    Returns
+    -------
+    _ : ReferenceTables
+        tables backed by the mapping
+    """
+    if not _is_current(path):
+        write_reference_tables(path)
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return ReferenceTables(buffer)
+
+
+def attach_reference_tables(path: str = REFERENCE_TABLES_PATH) -> ReferenceTables:
+    """
+    Makes lookups in this process use memory-mapped reference tables
+    partition_hanzi (for codepoint arrays) and map_pinyin then read the
+    mapped pages, which the OS shares between every process mapping the
+    file, instead of building private sets and dicts
+    Suitable as a process pool initializer: attaching only maps the
+    file, so worker start-up cost does not grow with the tables
+
+    Parameters
+    ----------
+    path : str
+        location of the file, generated if missing or stale
+
+    Returns
+    -------
+    _ : ReferenceTables
+        the attached tables
+    """
+    global _attached
+    _attached = read_reference_tables(path)
+
+    return _attached
+
+
+def detach_reference_tables() -> None:
+    """Reverts this process to private lookups"""
+    global _attached
+    _attached = None
+
+
+def get_reference_tables() -> Optional[ReferenceTables]:
+    """Tables attached in this process, or None"""
+    return _attached
@@ -0,0 +1,342 @@
+import hashlib
+import math
+from array import array
+from typing import Iterable, Optional, Union
+from .analyse import compute_stats, variant_from_counts
+from .config import (
+    HSK_GRADES,
+    SKETCH_CONFIDENCE,
+    SKETCH_COUNT_ERROR,
+    SKETCH_UNIQUE_ERROR,
+)
+from .count import get_cumulative_counts_per_hsk_grade, unit_counts_per_hanzi
+from .hsk_hanzi import get_exclusive_hanzi, get_hsk_grade_map
+
+
+MASK64 = (1 << 64) - 1
+
+
+def hash64(item: Union[str, int], seed: int = 0) -> int:
+    """
+    Deterministic 64-bit hash of a hanzi, string or codepoint
+    Unlike hash(), stable across processes so sketches can be merged
+
+    Parameters
+    ----------
+    item : str | int
+        hanzi (or other string) or integer codepoint
+
+    seed : int
+        hash seed
+
+    Returns
+    -------
+    x : int
+        64-bit hash
+    """
+    if isinstance(item, str):
+        if len(item) == 1:
+            item = ord(item)
+        else:
+            digest = hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest()
+            item = int.from_bytes(digest, "little")
+    # SplitMix64 finaliser
+    x = ((item ^ seed) + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+
+    return x ^ (x >> 31)
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch for approximate frequencies in fixed memory
+    Estimates never undercount, and overcount by at most
+    epsilon * total with probability 1 - delta
+
+    Attributes
+    ----------
+    epsilon : float
+        error bound as a fraction of the total count
+
+    delta : float
+        probability of exceeding the error bound
+
+    width : int
+        counters per row, ceil(e / epsilon)
+
+    depth : int
+        number of rows, ceil(ln(1 / delta))
+
+    seed : int
+        hash seed (sketches must share it to be merged)
+
+    total : int
+        sum of all counts added
+    """
+
+    def __init__(self, epsilon: float, delta: float, seed: int = 0):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be between 0 and 1")
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.seed = seed
+        self.total = 0
+        self.rows = [array("q", bytes(8 * self.width)) for _ in range(self.depth)]
+
+    def _indices(self, item: Union[str, int]):
+        # Kirsch-Mitzenmacher double hashing: row i uses h1 + i * h2
+        h = hash64(item, self.seed)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item: Union[str, int], count: int = 1) -> None:
+        for row, i in zip(self.rows, self._indices(item)):
+            row[i] += count
+        self.total += count
+
+    def estimate(self, item: Union[str, int]) -> int:
+        return min(row[i] for row, i in zip(self.rows, self._indices(item)))
+
+    def error_bound(self) -> float:
+        """Maximum overcount of any estimate with probability 1 - delta"""
+        return self.epsilon * self.total
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """Adds the counts of a sketch with identical parameters"""
+        if (self.width, self.depth, self.seed) != (
+            other.width,
+            other.depth,
+            other.seed,
+        ):
+            raise ValueError("Cannot merge Count-Min sketches with different shapes")
+        for row, other_row in zip(self.rows, other.rows):
+            for i, count in enumerate(other_row):
+                if count:
+                    row[i] += count
+        self.total += other.total
+
+
+class HyperLogLog:
+    """
+    HyperLogLog for approximate distinct counts in fixed memory
+
+    Attributes
+    ----------
+    precision : int
+        log2 of the number of registers (4 to 18)
+
+    seed : int
+        hash seed (sketches must share it to be merged)
+
+    registers : bytearray
+        highest leading-zero rank seen per register
+    """
+
+    def __init__(self, precision: int, seed: int = 0):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.seed = seed
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def from_error(cls, relative_error: float, seed: int = 0) -> "HyperLogLog":
+        """Sizes a HyperLogLog for a target relative standard error"""
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        return cls(min(max(precision, 4), 18), seed)
+
+    def add(self, item: Union[str, int]) -> None:
+        h = hash64(item, self.seed)
+        index = h >> (64 - self.precision)
+        remainder = (h << self.precision) & MASK64
+        # Position of the first set bit after the index bits
+        rank = 65 - remainder.bit_length() if remainder else 65 - self.precision
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> float:
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small range correction: linear counting
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return estimate
+
+    def relative_error(self) -> float:
+        """Relative standard error of count()"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Takes the union with a sketch of identical parameters"""
+        if (self.precision, self.seed) != (other.precision, other.seed):
+            raise ValueError("Cannot merge HyperLogLogs with different parameters")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+
+class HanziSketch:
+    """
+    Approximate, mergeable counting state for the pipeline
+        - Count-Min sketch of per-hanzi frequencies
+        - HyperLogLogs of unique hanzi overall and per HSK grade
+        - HyperLogLogs of variant-exclusive hanzi for identify_variant
+        - exact totals per HSK grade (plain sums, cheap to merge)
+    Grades are tracked for both variants so shards can be merged
+    before the variant is known; Unknown uses Traditional grades
+    Reference lookups are shared per process rather than held by each
+    sketch, so pickled sketches only carry their counting state
+
+    Attributes
+    ----------
+    total : int
+        number of hanzi added
+    """
+
+    VARIANTS = ("Simplified", "Traditional")
+
+    def __init__(
+        self,
+        count_error: float = SKETCH_COUNT_ERROR,
+        confidence: float = SKETCH_CONFIDENCE,
+        unique_error: float = SKETCH_UNIQUE_ERROR,
+        seed: int = 0,
+    ):
+        self.frequencies = CountMinSketch(count_error, 1 - confidence, seed)
+        self.unique = HyperLogLog.from_error(unique_error, seed)
+        self.exclusive = {
+            v: HyperLogLog.from_error(unique_error, seed) for v in self.VARIANTS
+        }
+        self.grade_unique = {
+            v: {
+                g: HyperLogLog.from_error(unique_error, seed)
+                for g in range(1, HSK_GRADES + 1)
+            }
+            for v in self.VARIANTS
+        }
+        self.grade_totals = {v: [0] * (HSK_GRADES + 1) for v in self.VARIANTS}
+        self.total = 0
+
+    def update(self, hanzi: Iterable[str]) -> None:
+        """
+        Adds hanzi (duplicates included) to the sketch
+        Occurrences are tallied first so each sketch is touched once per hanzi
+        """
+        exclusive_sets = get_exclusive_hanzi()
+        grade_maps = {v: get_hsk_grade_map(v) for v in self.VARIANTS}
+        for zi, count in unit_counts_per_hanzi(hanzi).items():
+            self.total += count
+            self.frequencies.add(zi, count)
+            self.unique.add(zi)
+            for variant in self.VARIANTS:
+                if zi in exclusive_sets[variant]:
+                    self.exclusive[variant].add(zi)
+                grade = grade_maps[variant].get(zi)
+                if grade is not None:
+                    self.grade_unique[variant][grade].add(zi)
+                    self.grade_totals[variant][grade] += count
+
+    def merge(self, other: "HanziSketch") -> None:
+        """Folds another shard's sketch into this one"""
+        self.frequencies.merge(other.frequencies)
+        self.unique.merge(other.unique)
+        for variant in self.VARIANTS:
+            self.exclusive[variant].merge(other.exclusive[variant])
+            for grade, hll in self.grade_unique[variant].items():
+                hll.merge(other.grade_unique[variant][grade])
+            self.grade_totals[variant] = [
+                a + b
+                for a, b in zip(self.grade_totals[variant], other.grade_totals[variant])
+            ]
+        self.total += other.total
+
+    def estimate(self, zi: str) -> int:
+        """Estimated occurrences of a hanzi (never an undercount)"""
+        return self.frequencies.estimate(zi)
+
+    def get_variant(self) -> str:
+        return variant_from_counts(
+            self.exclusive["Simplified"].count(), self.exclusive["Traditional"].count()
+        )
+
+    def get_counts_per_hsk_grade(self, variant: str) -> dict:
+        """
+        Estimated equivalent of get_counts_per_hanzi_per_hsk_grade
+        The overall unique count is raised to at least the sum of the
+        grade estimates so the beyond-HSK figure is never negative
+        """
+        if variant == "Unknown":
+            variant = "Traditional"
+        grade_stats = dict()
+        for grade in range(1, HSK_GRADES + 1):
+            grade_stats[grade] = [
+                round(self.grade_unique[variant][grade].count()),
+                self.grade_totals[variant][grade],
+            ]
+        unique = max(
+            round(self.unique.count()), sum(v[0] for v in grade_stats.values())
+        )
+        grade_stats[0] = unique, self.total
+
+        return grade_stats
+
+    def get_errors(self) -> dict:
+        """
+        Error bounds for the estimates
+            - unique: relative standard error of "No. Hanzi (Unique)" figures
+            - count: maximum overcount of estimate() at the stated confidence
+            - confidence: probability the count bound holds
+        Totals per grade ("No. Hanzi (Count)") are exact
+        """
+        return {
+            "unique": self.unique.relative_error(),
+            "count": self.frequencies.error_bound(),
+            "confidence": 1 - self.frequencies.delta,
+        }
+
+
+def analyse_hanzi_approx(
+    hanzi_list: Iterable[str], sketch: Optional[HanziSketch] = None
+):
+    """
+    Approximate equivalent of analyse_hanzi for very large inputs
+
+    Parameters
+    ----------
+    hanzi_list : Iterable[str]
+        all characters (with duplicates) found in target content
+
+    sketch : HanziSketch
+        sketch to add to, e.g. merged from other shards (default: new sketch)
+
+    Returns
+    -------
+    stats_df : pl.DataFrame
+        estimated stats for the content, in the compute_stats format
+
+    variant : str
+        hanzi variant of the content
+
+    errors : dict
+        error bounds of the estimates (see HanziSketch.get_errors)
+    """
+    if sketch is None:
+        sketch = HanziSketch()
+    sketch.update(hanzi_list)
+
+    if not sketch.total:
+        raise ValueError("No hanzi to analyse")
+
+    variant = sketch.get_variant()
+    grade_counts = sketch.get_counts_per_hsk_grade(variant)
+    cumul_counts = get_cumulative_counts_per_hsk_grade(grade_counts)
+    stats_df = compute_stats(grade_counts, cumul_counts)
+
+    return stats_df, variant, sketch.get_errors()
@@ -0,0 +1,245 @@
+import os
+import uuid
+import polars as pl
+from array import array
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Sequence, Union
+from urllib.parse import urlsplit
+from .config import HSK_GRADES, STORE_BATCH_DOCUMENTS, STORE_MAX_BUFFERED_ROWS
+from .count import counts_by_hanzi
+from .hsk_hanzi import get_hsk_grade_map
+from .ngrams import OUTLIER_GRADE
+
+
+# Stats rows are stored per document as hsk<g>_unique/hsk<g>_count columns,
+# with hanzi beyond HSK as beyond_unique/beyond_count
+GRADE_PREFIXES = {g: f"hsk{g}" for g in range(1, HSK_GRADES + 1)}
+GRADE_PREFIXES[OUTLIER_GRADE] = "beyond"
+
+DOCUMENT_SCHEMA = {
+    "url": pl.Utf8,
+    "timestamp": pl.Datetime("us", "UTC"),
+    "variant": pl.Utf8,
+    "total_unique": pl.Int32,
+    "total_count": pl.Int32,
+}
+for prefix in GRADE_PREFIXES.values():
+    DOCUMENT_SCHEMA[f"{prefix}_unique"] = pl.Int32
+    DOCUMENT_SCHEMA[f"{prefix}_count"] = pl.Int32
+
+COUNTS_SCHEMA = {
+    "url": pl.Utf8,
+    "hanzi": pl.Utf8,
+    "grade": pl.Int8,
+    "count": pl.Int32,
+}
+# Hive partition columns, added when a dataset is scanned
+PARTITION_SCHEMA = {"date": pl.Utf8, "domain": pl.Utf8}
+
+
+def get_domain(url: str) -> str:
+    """Host name of a URL, or "local" for file paths"""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        host = None
+
+    return host or "local"
+
+
+class ResultStore:
+    """
+    Appends pipeline results to Parquet datasets under root
+        - documents/: one row per document (metadata, variant, stats)
+        - counts/: one row per unique hanzi per document (count, grade)
+    Both are hive-partitioned by date=YYYY-MM-DD/domain=<host>
+    Rows are buffered and written once batch_size documents or
+    max_rows count rows are pending, one file per partition per batch;
+    files are written under a temporary name, then renamed into place
+
+    Attributes
+    ----------
+    root : str
+        dataset directory
+
+    batch_size : int
+        buffered documents that trigger a write
+
+    max_rows : int
+        buffered count rows that trigger a write
+    """
+
+    def __init__(
+        self,
+        root: str,
+        batch_size: int = STORE_BATCH_DOCUMENTS,
+        max_rows: int = STORE_MAX_BUFFERED_ROWS,
+    ):
+        self.root = root
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.documents = dict()
+        self.counts = dict()
+        self.buffered_documents = 0
+        self.buffered_rows = 0
+
+    def add(
+        self,
+        url: str,
+        hanzi_list: Union[list[str], array],
+        stats_df: pl.DataFrame,
+        variant: str,
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        """
+        Buffers the results for a document
+
+        Parameters
+        ----------
+        url : str
+            URL or file path of the document
+
+        hanzi_list : list[str] | array
+            all characters (with duplicates) found in the document,
+            or their codepoints
+
+        stats_df : pl.DataFrame
+            stats for the document
+
+        variant : str
+            hanzi variant of the document
+
+        timestamp : datetime | None
+            time of analysis (default: now, UTC)
+        """
+        timestamp = timestamp or datetime.now(timezone.utc)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        key = (timestamp.astimezone(timezone.utc).date().isoformat(), get_domain(url))
+
+        document = dict.fromkeys(DOCUMENT_SCHEMA, 0)
+        document.update(url=url, timestamp=timestamp, variant=variant)
+        for grade, unique, count in stats_df.select(
+            "HSK\nGrade", "No. Hanzi\n(Unique)", "No. Hanzi\n(Count)"
+        ).iter_rows():
+            document[f"{GRADE_PREFIXES[grade]}_unique"] = unique
+            document[f"{GRADE_PREFIXES[grade]}_count"] = count
+            document["total_unique"] += unique
+            document["total_count"] += count
+        self.documents.setdefault(key, []).append(document)
+
+        grade_map = get_hsk_grade_map(variant)
+        columns = self.counts.setdefault(key, {k: [] for k in COUNTS_SCHEMA})
+        hanzi_counts = counts_by_hanzi(hanzi_list)
+        columns["url"].extend([url] * len(hanzi_counts))
+        columns["hanzi"].extend(hanzi_counts)
+        columns["grade"].extend(grade_map.get(zi, OUTLIER_GRADE) for zi in hanzi_counts)
+        columns["count"].extend(hanzi_counts.values())
+
+        self.buffered_documents += 1
+        self.buffered_rows += len(hanzi_counts)
+        if (
+            self.buffered_documents >= self.batch_size
+            or self.buffered_rows >= self.max_rows
+        ):
+            self.flush()
+
+    def _write(self, dataset: str, key: tuple, df: pl.DataFrame) -> None:
+        date, domain = key
+        directory = os.path.join(self.root, dataset, f"date={date}", f"domain={domain}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+        df.write_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def flush(self) -> None:
+        """Writes all buffered rows"""
+        for key, rows in self.documents.items():
+            self._write("documents", key, pl.DataFrame(rows, schema=DOCUMENT_SCHEMA))
+        for key, columns in self.counts.items():
+            self._write("counts", key, pl.DataFrame(columns, schema=COUNTS_SCHEMA))
+        self.documents, self.counts = dict(), dict()
+        self.buffered_documents, self.buffered_rows = 0, 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_partition_files(
+    root: str,
+    dataset: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    domains: Optional[Sequence[str]] = None,
+) -> Iterator[str]:
+    """
+    Lists the Parquet files of a dataset's matching partitions
+    Only directory names are compared, so pruned partitions cost nothing
+    """
+    directory = os.path.join(root, dataset)
+    if not os.path.isdir(directory):
+        return
+    for date_dir in sorted(os.scandir(directory), key=lambda e: e.name):
+        date = date_dir.name.partition("date=")[2]
+        if not date or (date_from and date < date_from) or (date_to and date > date_to):
+            continue
+        for domain_dir in os.scandir(date_dir.path):
+            domain = domain_dir.name.partition("domain=")[2]
+            if not domain or (domains and domain not in domains):
+                continue
+            for entry in os.scandir(domain_dir.path):
+                if entry.name.endswith(".parquet"):
+                    yield entry.path
+
+
+def scan_dataset(
+    root: str,
+    dataset: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    domains: Optional[Sequence[str]] = None,
+) -> pl.LazyFrame:
+    """
+    Lazily scans a stored dataset with its date and domain columns
+
+    Parameters
+    ----------
+    root : str
+        ResultStore directory
+
+    dataset : str
+        documents|counts
+
+    date_from, date_to : str | None
+        inclusive date bounds, YYYY-MM-DD
+
+    domains : Sequence[str] | None
+        host names to keep
+
+    Returns
+    -------
+    _ : pl.LazyFrame
+        rows of the matching partitions (empty if there are none)
+    """
+    schema = {"documents": DOCUMENT_SCHEMA, "counts": COUNTS_SCHEMA}[dataset]
+    files = list(iter_partition_files(root, dataset, date_from, date_to, domains))
+    if not files:
+        return pl.LazyFrame(schema={**schema, **PARTITION_SCHEMA})
+
+    return pl.scan_parquet(files, hive_partitioning=True)
+
+
+def scan_documents(root: str, **filters) -> pl.LazyFrame:
+    """Documents dataset, see scan_dataset for filters"""
+    return scan_dataset(root, "documents", **filters)
+
+
+def scan_counts(root: str, **filters) -> pl.LazyFrame:
+    """Counts dataset, see scan_dataset for filters"""
+    return scan_dataset(root, "counts", **filters)
@@ -0,0 +1,210 @@
+import bz2
+import codecs
+import gzip
+import io
+import lzma
+import zlib
+from contextlib import contextmanager
+from functools import partial
+from html import unescape
+from typing import BinaryIO, Iterable, Iterator, Optional
+from .config import SNIFF_BYTES, STREAM_CHUNK_SIZE
+from .decode import detect_stream_encoding
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+
+# Leading bytes of each supported compression format
+MAGIC_NUMBERS = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\xfd7zXZ\x00", "xz"),
+]
+MAGIC_SIZE = max(len(magic) for magic, _ in MAGIC_NUMBERS)
+# Errors raised by truncated or corrupt compressed data (bz2 raises
+# OSError, gzip BadGzipFile, an OSError, for bad headers)
+DECOMPRESSION_ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+# Longest named character reference (&CounterClockwiseContourIntegral;)
+# held back at the end of a chunk in case the next chunk completes it
+MAX_REFERENCE_LENGTH = 33
+
+
+class DecompressionError(OSError):
+    """
+    Raised when a compressed file is truncated or corrupt, or its format
+    needs an optional dependency that is not installed
+    An OSError, so callers handling unreadable files handle these too
+    """
+
+
+class CheckedStream(io.BufferedIOBase):
+    """
+    Wraps a decompressing stream so that its errors, whatever the
+    format, are raised as DecompressionError
+
+    Attributes
+    ----------
+    stream : BinaryIO
+        decompressing stream
+
+    path : str
+        file path, for error messages
+    """
+
+    def __init__(self, stream: BinaryIO, path: str):
+        self.stream = stream
+        self.path = path
+
+    @contextmanager
+    def _checked(self):
+        try:
+            yield
+        except DecompressionError:
+            raise
+        except DECOMPRESSION_ERRORS as e:
+            raise DecompressionError(f"cannot decompress {self.path}: {e}") from e
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        with self._checked():
+            return self.stream.read(size)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        with self._checked():
+            return self.stream.readline(size)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """
+    Identifies a compression format by its magic bytes
+
+    Parameters
+    ----------
+    head : bytes
+        first bytes of a file (at least MAGIC_SIZE)
+
+    Returns
+    -------
+    _ : str | None
+        gzip|bz2|zstd|xz, or None if the data is not compressed
+    """
+    for magic, compression in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+
+    return None
+
+
+def open_stream(path: str) -> BinaryIO:
+    """
+    Opens a file for reading, decompressing it on the fly if it is
+    gzip, bz2, Zstandard (needs zstandard) or xz compressed
+    Concatenated (multi-member) archives are read through; truncated or
+    corrupt ones raise DecompressionError when read
+
+    Parameters
+    ----------
+    path : str
+        file path
+
+    Returns
+    -------
+    _ : BinaryIO
+        binary stream of the decompressed content
+    """
+    with open(path, "rb") as f:
+        compression = detect_compression(f.read(MAGIC_SIZE))
+
+    if compression is None:
+        return open(path, "rb")
+
+    if compression == "gzip":
+        stream = gzip.open(path, "rb")
+    elif compression == "bz2":
+        stream = bz2.open(path, "rb")
+    elif compression == "xz":
+        stream = lzma.open(path, "rb")
+    else:
+        if zstandard is None:
+            raise DecompressionError(f"zstandard is needed to read {path}")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+        stream = io.BufferedReader(reader)  # Adds readline, as for the others
+
+    return CheckedStream(stream, path)
+
+
+def iter_text(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Decodes a (possibly compressed) file chunk by chunk
+    The encoding is chosen from the first chunk, as for decode_html;
+    undecodable bytes further on are replaced
+
+    Parameters
+    ----------
+    path : str
+        file path
+
+    chunk_size : int
+        decompressed bytes decoded at a time
+
+    Yields
+    ------
+    _ : str
+        decoded text, split at arbitrary points
+    """
+    with open_stream(path) as stream:
+        head = stream.read(max(chunk_size, SNIFF_BYTES))
+        decoder = codecs.getincrementaldecoder(detect_stream_encoding(head))(
+            errors="replace"
+        )
+        yield decoder.decode(head)
+        for chunk in iter(partial(stream.read, chunk_size), b""):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+
+def iter_unescaped(texts: Iterable[str]) -> Iterator[str]:
+    """
+    Decodes character references in text split at arbitrary points
+    A trailing & and what follows it is held back until the next
+    chunk, so a reference cut in two is still decoded
+
+    Parameters
+    ----------
+    texts : Iterable[str]
+        consecutive chunks of text
+
+    Yields
+    ------
+    _ : str
+        chunks with character references decoded
+    """
+    carry = ""
+    for text in texts:
+        text = carry + text
+        cut = text.find("&", max(0, len(text) - MAX_REFERENCE_LENGTH))
+        if cut == -1:
+            carry = ""
+        else:
+            text, carry = text[:cut], text[cut:]
+        yield unescape(text)
+
+    yield unescape(carry)
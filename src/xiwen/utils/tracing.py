@@ -0,0 +1,363 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+from .config import ENCODING, TRACE_SAMPLE_RATE, TRACE_SLOW_THRESHOLD
+
+
+class Span:
+    """
+    A timed operation within a trace
+
+    Attributes
+    ----------
+    name : str
+        operation, e.g. parse
+
+    attributes : dict
+        details such as url, bytes, hanzi or variant
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "attributes",
+        "error",
+        "trace",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.span_id = random.getrandbits(64) or 1
+        if parent is None:
+            self.trace_id = random.getrandbits(128) or 1
+            self.parent_id = None
+            # Finished spans of the whole trace, written when the root ends
+            self.trace = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.trace = parent.trace
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        """Span in the OTLP/JSON encoding"""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": key, "value": _to_any_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 0},  # STATUS_CODE_UNSET
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.error is not None:
+            span["status"] = {"code": 2, "message": self.error}  # STATUS_CODE_ERROR
+
+        return span
+
+
+class RemoteParent:
+    """
+    Stands in, in an executor worker, for the span that sent it a job,
+    so the job's spans join the sender's trace
+    """
+
+    __slots__ = ("trace_id", "span_id", "trace")
+
+    def __init__(self, trace_id: int, span_id: int):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.trace = []
+
+    def set_attribute(self, key: str, value) -> None:
+        pass  # Belongs to the sender's span
+
+
+class NoopSpan:
+    """Stands in for Span while tracing is off"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+
+_NOT_TRACED = nullcontext(NoopSpan())
+_current = contextvars.ContextVar("xiwen_span", default=None)
+_lock = threading.Lock()
+# Tracing settings, see configure_tracing; None while tracing is off
+_config = None
+
+
+def _to_any_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+
+    return {"stringValue": str(value)}
+
+
+def configure_tracing(
+    path: str,
+    sample_rate: float = TRACE_SAMPLE_RATE,
+    slow_threshold: Optional[float] = TRACE_SLOW_THRESHOLD,
+) -> None:
+    """
+    Starts writing traces to a local file as OpenTelemetry (OTLP/JSON)
+    lines, one ExportTraceServiceRequest per trace, as written by the
+    OpenTelemetry Collector file exporter
+    Whether a trace is kept is decided when its root span ends, so slow
+    traces can be kept even when they were not sampled
+
+    Parameters
+    ----------
+    path : str
+        file to append traces to
+
+    sample_rate : float
+        share of traces to keep (0 to 1)
+
+    slow_threshold : float | None
+        traces taking at least this many seconds are always kept
+        (None: sampling alone decides)
+    """
+    if not 0 <= sample_rate <= 1:
+        raise ValueError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+    global _config
+    _config = (path, sample_rate, slow_threshold)
+
+
+def disable_tracing() -> None:
+    """Stops tracing; spans then cost a single check"""
+    global _config
+    _config = None
+
+
+def current_span():
+    """Innermost open span of this thread or task, or a NoopSpan"""
+    return _current.get() or _NOT_TRACED.enter_result
+
+
+def _export(spans: list, path: str) -> None:
+    line = {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "xiwen"}},
+                        {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "xiwen"},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+    data = json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n"
+    # One append per trace keeps lines whole across threads and processes
+    with _lock, open(path, "a", encoding=ENCODING) as f:
+        f.write(data)
+
+
+def _finish(current: Span, config: tuple) -> None:
+    """Ends a span; a root span's trace is then kept or dropped"""
+    current.end = time.time_ns()
+    current.trace.append(current)
+    if current.parent_id is None:
+        path, sample_rate, slow_threshold = config
+        slow = (
+            slow_threshold is not None
+            and current.end - current.start >= slow_threshold * 1e9
+        )
+        if slow or random.random() < sample_rate:
+            _export(current.trace, path)
+
+
+@contextmanager
+def _traced(name: str, attributes: dict, config: tuple):
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current, config)
+
+
+def span(name: str, **attributes):
+    """
+    Context manager tracing its block as a span, nested in the
+    enclosing span of the same thread or task
+    While tracing is off, yields a shared NoopSpan
+
+    Parameters
+    ----------
+    name : str
+        operation, e.g. parse
+
+    attributes
+        details, e.g. url="https://..."; more can be added with
+        set_attribute on the yielded span
+    """
+    config = _config
+    if config is None:
+        return _NOT_TRACED
+
+    return _traced(name, attributes, config)
+
+
+def start_span(name: str, **attributes):
+    """
+    Starts a span that is not tied to a block, e.g. one covering a
+    document passed between tasks; end it with end_span, and nest
+    spans in it with use_span
+    While tracing is off, returns a shared NoopSpan
+
+    Parameters
+    ----------
+    name : str
+        operation, e.g. document
+
+    attributes
+        details, e.g. url="https://..."
+    """
+    if _config is None:
+        return _NOT_TRACED.enter_result
+
+    return Span(name, _current.get(), attributes)
+
+
+def end_span(started, error: Optional[BaseException] = None) -> None:
+    """
+    Ends a span from start_span
+
+    Parameters
+    ----------
+    started : Span | NoopSpan
+        span to end
+
+    error : BaseException | None
+        error the operation ended with, if any
+    """
+    config = _config
+    if isinstance(started, NoopSpan) or config is None:
+        return
+    if error is not None:
+        started.error = f"{type(error).__name__}: {error}"
+    _finish(started, config)
+
+
+@contextmanager
+def use_span(started):
+    """
+    Makes a span from start_span the enclosing span of a block, without
+    ending it
+
+    Parameters
+    ----------
+    started : Span | NoopSpan
+        span to nest the block's spans in
+    """
+    if isinstance(started, NoopSpan):
+        yield started
+        return
+    token = _current.set(started)
+    try:
+        yield started
+    finally:
+        _current.reset(token)
+
+
+def get_trace_context() -> Optional[tuple[int, int]]:
+    """
+    Trace and span IDs of the current span, to send with a job to an
+    executor (see collect_spans), or None if there is no open span
+    """
+    current = _current.get()
+    if current is None:
+        return None
+
+    return current.trace_id, current.span_id
+
+
+@contextmanager
+def collect_spans(trace_context: Optional[tuple[int, int]]):
+    """
+    Traces a job in an executor worker as part of the trace that sent
+    it; in a worker process tracing is switched on for the job, but its
+    spans are not written there: they are sent back for add_spans, so
+    the sender's root span decides whether the whole trace is kept
+
+    Parameters
+    ----------
+    trace_context : tuple[int, int] | None
+        from get_trace_context in the sender (None: nothing is traced)
+
+    Yields
+    ------
+    spans : list[Span]
+        filled with the job's finished spans
+    """
+    if trace_context is None:
+        yield []
+        return
+    global _config
+    config = _config
+    if config is None:
+        # Root spans are never opened here, so nothing is exported
+        _config = ("", 1.0, None)
+    parent = RemoteParent(*trace_context)
+    token = _current.set(parent)
+    try:
+        yield parent.trace
+    finally:
+        _current.reset(token)
+        if config is None:
+            _config = None
+        for finished in parent.trace:
+            finished.trace = None  # Sent back on their own, not as a cycle
+
+
+def add_spans(spans: list) -> None:
+    """
+    Adds spans returned by collect_spans to the current span's trace,
+    to be written with it
+    """
+    current = _current.get()
+    if current is None or not spans:
+        return
+    for finished in spans:
+        finished.trace = current.trace
+    current.trace.extend(spans)
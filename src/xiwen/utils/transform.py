@@ -1,5 +1,11 @@
 import polars as pl
-from .hsk_hanzi import HSKHanzi
+from array import array
+from functools import partial
+from itertools import filterfalse
+from typing import Optional, Union
+from .heavy_hitters import SpaceSaving
+from .hsk_hanzi import get_hsk_lookup
+from .shared import get_reference_tables
 
 
 def filter_dataframe_by_hanzi_variant(df: pl.DataFrame, variant: str):
@@ -41,7 +47,11 @@ def filter_dataframe_by_hanzi_variant(df: pl.DataFrame, variant: str):
     return filtered_df
 
 
-def partition_hanzi(hanzi_list: list) -> tuple[list]:
+def partition_hanzi(
+    hanzi_list: Union[list, array],
+    outliers_top_k: Optional[int] = None,
+    variant: Optional[str] = None,
+) -> tuple[list]:
     """
     Separates hanzi list into sublists based on whether
     they are HSK simplified characters or traditional character equivalents
@@ -49,27 +59,56 @@ def partition_hanzi(hanzi_list: list) -> tuple[list]:
 
     Parameters
     ----------
-    hanzi_list : list
-        characters to partition
+    hanzi_list : list | array
+        characters to partition, or their codepoints in an array("I");
+        codepoint arrays are partitioned into codepoint arrays, using
+        the shared reference tables if attached
+
+    outliers_top_k : int | None
+        if set, track only the most frequent outliers in a SpaceSaving
+        summary of this capacity instead of listing every occurrence
+
+    variant : str | None
+        if the variant is already known, e.g. from estimate_variant,
+        the list analyse_hanzi will not use is left empty:
+        traditional for Simplified, simplified for Traditional|Unknown
 
     Returns
     -------
-    simplified : list
+    simplified : list | array
         simplified HSK characters in hanzi_list
 
-    traditional : list
+    traditional : list | array
         traditional HSK equivalents in hanzi_list
 
-    outliers : list
+    outliers : list | array | SpaceSaving
         characters not in above lists
     """
-    hsk_simplified = HSKHanzi("Simplified").get_HSK_hanzi_sublist()
-    hsk_traditional = HSKHanzi("Traditional").get_HSK_hanzi_sublist()
+    # Codepoint arrays stay arrays, so no str object is made per hanzi
+    compact = isinstance(hanzi_list, array)
+    tables = get_reference_tables() if compact else None
+    if tables is not None:
+        # Shared grade tables are indexed by codepoint, non-zero for HSK hanzi
+        in_simplified = tables.grade_table("Simplified").__getitem__
+        in_traditional = tables.grade_table("Traditional").__getitem__
+        in_hsk = tables.grade_table("HSK").__getitem__
+    else:
+        hsk_simplified, hsk_traditional, hsk_all = get_hsk_lookup(compact)
+        in_simplified = hsk_simplified.__contains__
+        in_traditional = hsk_traditional.__contains__
+        in_hsk = hsk_all.__contains__
+    sequence = partial(array, "I") if compact else list
 
-    simplified = [zi for zi in hanzi_list if zi in hsk_simplified]
-    traditional = [zi for zi in hanzi_list if zi in hsk_traditional]
-    outliers = [
-        zi for zi in hanzi_list if zi not in simplified and zi not in traditional
-    ]
+    simplified, traditional = sequence(()), sequence(())
+    if variant != "Traditional" and variant != "Unknown":
+        simplified = sequence(filter(in_simplified, hanzi_list))
+    if variant != "Simplified":
+        traditional = sequence(filter(in_traditional, hanzi_list))
+    non_hsk = filterfalse(in_hsk, hanzi_list)
+    if outliers_top_k is None:
+        outliers = sequence(non_hsk)
+    else:
+        outliers = SpaceSaving(outliers_top_k)
+        outliers.update(non_hsk)
 
     return simplified, traditional, outliers
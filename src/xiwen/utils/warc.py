@@ -0,0 +1,237 @@
+import zlib
+from typing import BinaryIO, Iterator, Optional
+from .config import STREAM_CHUNK_SIZE, WARC_MAX_HEADER, WARC_MAX_PAYLOAD
+from .stream import open_stream
+
+
+# Payload types worth scanning for hanzi (a missing type is scanned too)
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+class WarcFormatError(ValueError):
+    """Raised when a file is not a well-formed WARC archive"""
+
+
+def read_line(stream: BinaryIO, limit: int) -> bytes:
+    """Reads a line of at most limit bytes; a longer one is malformed"""
+    if limit > 0:
+        line = stream.readline(limit)
+        if len(line) < limit or line.endswith(b"\n"):
+            return line
+
+    raise WarcFormatError("WARC header block too long")
+
+
+def read_header_block(
+    stream: BinaryIO, max_size: int = WARC_MAX_HEADER
+) -> Optional[tuple[str, dict[str, str]]]:
+    """
+    Reads a block of header lines up to the blank line ending it
+    Blank lines before the block (e.g. ending the previous record) are skipped
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        stream positioned before the block
+
+    max_size : int
+        longest block in bytes; a longer one raises WarcFormatError
+        instead of being read into memory, e.g. from a file without
+        line breaks
+
+    Returns
+    -------
+    _ : tuple[str, dict[str, str]] | None
+        first line, and headers keyed by lowercase name;
+        None at the end of the stream
+    """
+    line = b"\r\n"
+    while line.strip() == b"":
+        line = read_line(stream, max_size)
+        if not line:
+            return None
+    remaining = max_size - len(line)
+    first_line = line.decode("latin-1").strip()
+
+    headers, name = dict(), None
+    while True:
+        line = read_line(stream, remaining)
+        remaining -= len(line)
+        if not line.strip():
+            break
+        text = line.decode("utf-8", errors="replace")
+        if text[0] in " \t" and name is not None:
+            headers[name] += " " + text.strip()  # Folded continuation line
+            continue
+        name, _, value = text.partition(":")
+        name = name.strip().lower()
+        headers[name] = value.strip()
+
+    return first_line, headers
+
+
+def skip(stream: BinaryIO, length: int) -> None:
+    """Reads past length bytes in chunks, holding none of them"""
+    while length > 0:
+        chunk = stream.read(min(length, STREAM_CHUNK_SIZE))
+        if not chunk:
+            raise WarcFormatError("truncated WARC record")
+        length -= len(chunk)
+
+
+def dechunk(body: bytes) -> bytes:
+    """Decodes an HTTP body sent with Transfer-Encoding: chunked"""
+    chunks, position = [], 0
+    while True:
+        end = body.find(b"\r\n", position)
+        if end == -1:
+            break
+        try:
+            size = int(body[position:end].split(b";")[0], 16)
+        except ValueError:
+            break  # Malformed: keep what was decoded
+        if size == 0:
+            break
+        chunks.append(body[end + 2 : end + 2 + size])
+        position = end + 2 + size + 2
+
+    return b"".join(chunks)
+
+
+def inflate(body: bytes, wbits: int, max_size: int) -> Optional[bytes]:
+    """
+    Decompresses a gzip or deflate body, stopping past max_size bytes
+
+    Returns
+    -------
+    _ : bytes | None
+        decompressed body, or None if it would exceed max_size or is
+        truncated
+    """
+    decompressor = zlib.decompressobj(wbits=wbits)
+    inflated = decompressor.decompress(body, max_size + 1)
+    # Too large, or stopped short of the end of a cut-off stream
+    if len(inflated) > max_size or not decompressor.eof:
+        return None
+
+    return inflated
+
+
+def parse_http_response(
+    block: bytes, max_payload: int = WARC_MAX_PAYLOAD
+) -> Optional[tuple[dict[str, str], bytes]]:
+    """
+    Splits a WARC response block into HTTP headers and decoded payload
+    Chunked transfer encoding and gzip/deflate content encoding are undone
+
+    Parameters
+    ----------
+    block : bytes
+        HTTP response as recorded: status line, headers, body
+
+    max_payload : int
+        compressed payloads are skipped once they inflate beyond this
+        many bytes, so a small record cannot expand without limit
+
+    Returns
+    -------
+    _ : tuple[dict[str, str], bytes] | None
+        headers keyed by lowercase name, and payload; None if the
+        response failed, or its payload cannot be decoded or is too large
+    """
+    head, separator, body = block.partition(b"\r\n\r\n")
+    if not separator:
+        head, separator, body = block.partition(b"\n\n")
+    lines = head.decode("latin-1").splitlines()
+    if not lines:
+        return None
+    status = lines[0].split()
+    if len(status) < 2 or not status[1].isdigit() or not 200 <= int(status[1]) < 300:
+        return None
+
+    headers = dict()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        body = dechunk(body)
+    encoding = headers.get("content-encoding", "identity").lower()
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            body = inflate(body, 16 + zlib.MAX_WBITS, max_payload)
+        elif encoding == "deflate":
+            body = inflate(body, zlib.MAX_WBITS, max_payload)
+        elif encoding != "identity":
+            return None  # e.g. br, which needs a further dependency
+    except zlib.error:
+        return None
+    if body is None:
+        return None
+
+    return headers, body
+
+
+def is_text(headers: dict[str, str]) -> bool:
+    """Checks whether a payload's Content-Type may hold hanzi text"""
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+
+    return not content_type or content_type in TEXT_TYPES
+
+
+def iter_warc_responses(
+    path: str, max_payload: int = WARC_MAX_PAYLOAD
+) -> Iterator[tuple[str, bytes, dict[str, str]]]:
+    """
+    Streams the HTML and text responses of a WARC archive
+    Records are read one at a time from the (possibly gzip, bz2, zstd
+    or xz compressed) file, and others are skipped without being held,
+    so memory does not grow with the size of the archive
+
+    Parameters
+    ----------
+    path : str
+        WARC file, e.g. a Common Crawl .warc.gz
+
+    max_payload : int
+        response records, or decompressed payloads, larger than this
+        many bytes are skipped
+
+    Yields
+    ------
+    target_uri : str
+        URI the response was fetched from
+
+    payload : bytes
+        decoded (de-chunked, decompressed) HTTP body
+
+    headers : dict[str, str]
+        HTTP response headers, keyed by lowercase name
+    """
+    with open_stream(path) as stream:
+        while (record := read_header_block(stream)) is not None:
+            version, warc_headers = record
+            if not version.startswith("WARC/"):
+                raise WarcFormatError(f"expected a WARC record in {path}")
+            try:
+                length = int(warc_headers["content-length"])
+            except (KeyError, ValueError):
+                raise WarcFormatError(f"WARC record without length in {path}")
+            if length < 0:
+                raise WarcFormatError(f"WARC record with negative length in {path}")
+
+            if (
+                warc_headers.get("warc-type") != "response"
+                or "application/http" not in warc_headers.get("content-type", "")
+                or length > max_payload
+            ):
+                skip(stream, length)
+                continue
+
+            block = stream.read(length)
+            if len(block) < length:
+                raise WarcFormatError(f"truncated WARC record in {path}")
+            response = parse_http_response(block, max_payload)
+            if response is not None and is_text(response[0]):
+                headers, payload = response
+                yield warc_headers.get("warc-target-uri", ""), payload, headers
@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import pickle
+import struct
+from ..__about__ import __version__
+from .cache import get_cached, update_cached
+from .hsk_hanzi import (
+    get_exclusive_hanzi,
+    get_hsk_grade_map,
+    get_hsk_lookup,
+    get_hsk_rows,
+    load_hsk_hanzi,
+)
+from .pinyin import read_pinyin
+from .score import get_reference_scores
+from .shared import attach_reference_tables, get_sources_fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+# Left out of snapshots, as workers map their data instead of unpickling
+# a copy: load_hsk_hanzi maps the HSK IPC file, and attached reference
+# tables serve pinyin in place of read_pinyin
+NOT_SNAPSHOTTED = (load_hsk_hanzi, read_pinyin)
+# Snapshot header: magic and a fingerprint of the package version and
+# assets, so snapshots written by other versions or from other assets
+# are ignored rather than restored
+SNAPSHOT_MAGIC = b"XWSNAP\x00\x00"
+SNAPSHOT_HEADER = struct.Struct("<8s16s")
+
+
+def get_snapshot_fingerprint() -> bytes:
+    """
+    Fingerprint of the package version and the assets cached data is
+    built from
+
+    Returns
+    -------
+    _ : bytes
+        16-byte digest
+    """
+    digest = hashlib.blake2b(__version__.encode(), digest_size=16)
+    digest.update(get_sources_fingerprint())
+
+    return digest.digest()
+
+
+def warm_up() -> None:
+    """
+    Builds all cached reference data in this process up front:
+    the HSK dataset, lookup sets, grade maps, stats row index, pinyin
+    map and scoring table
+    This does polars work, and forking a process after polars has
+    started its thread pool can deadlock, so never fork workers after
+    warming up. The safe ways to start workers warm are:
+    - fork them before any polars work, and call warm_up in each one
+      (e.g. as a process pool initializer)
+    - save_snapshot once, and start spawned workers with load_snapshot
+    """
+    load_hsk_hanzi()
+    get_exclusive_hanzi()
+    for codepoints in (False, True):
+        get_hsk_lookup(codepoints)
+    for variant in ("Simplified", "Traditional", "Unknown"):
+        get_hsk_grade_map(variant)
+        get_hsk_rows(variant)
+    read_pinyin()
+    get_reference_scores()
+
+
+def save_snapshot(path: str) -> None:
+    """
+    Warms up, then writes cached reference data to one file, except
+    NOT_SNAPSHOTTED, behind a header with get_snapshot_fingerprint
+    The file is replaced atomically so workers never read a partial one
+
+    Parameters
+    ----------
+    path : str
+        destination of the snapshot
+    """
+    warm_up()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, get_snapshot_fingerprint()))
+        pickle.dump(
+            get_cached(exclude=NOT_SNAPSHOTTED), f, protocol=pickle.HIGHEST_PROTOCOL
+        )
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> bool:
+    """
+    Restores cached reference data from a snapshot in one read, and
+    attaches the shared reference tables for pinyin (if the tables file
+    cannot be written, pinyin is loaded privately when first needed)
+    A snapshot written by another package version or from other assets
+    is stale: it is ignored with a warning, and data is built when first
+    needed
+    Suitable as a process pool initializer, e.g.
+    ProcessPoolExecutor(initializer=load_snapshot, initargs=(path,))
+    Snapshots are pickles: only load files written by save_snapshot
+
+    Parameters
+    ----------
+    path : str
+        location of the snapshot
+
+    Returns
+    -------
+    _ : bool
+        True if the snapshot was restored, False if it was stale
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, get_snapshot_fingerprint())
+    restored = data.startswith(header)
+    if restored:
+        update_cached(pickle.loads(data[len(header) :]))
+    else:
+        logger.warning("Ignoring stale reference data snapshot %s", path)
+    try:
+        attach_reference_tables()
+    except OSError:
+        pass
+
+    return restored
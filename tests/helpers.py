@@ -0,0 +1,7 @@
+class FakeResponse:
+    """Stands in for a requests.Response returned by a scheduler's send"""
+
+    def __init__(self, status_code=200, markup="<p>中文</p>", headers=None):
+        self.status_code = status_code
+        self.content = markup.encode("utf-8") if markup else b""
+        self.headers = headers or {}
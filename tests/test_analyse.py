@@ -1,9 +1,19 @@
 import os
 import polars as pl
 import unittest
-from src.xiwen.utils.analyse import identify_variant
+from polars.testing import assert_frame_equal
+from src.xiwen.utils.analyse import (
+    analyse_counts,
+    analyse_hanzi,
+    estimate_variant,
+    get_stats_df_from_counts,
+    get_variant_confidence,
+    identify_variant,
+)
 from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.count import unit_counts_per_hanzi
 from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.hsk_hanzi import get_exclusive_hanzi
 from src.xiwen.utils.transform import partition_hanzi
 
 
@@ -356,5 +366,97 @@ class TestIdentify_variant(unittest.TestCase):
             self.assertEqual(identify_variant(simp, trad), TEST_CASES[test_case][0])
 
 
+class TestEstimateVariant(unittest.TestCase):
+    def test_known_figures(self):
+        """Test sampled variant matches the full computation"""
+        for test_case in TEST_CASES.keys():
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                hanzi = filter_hanzi_from_html(f.read())
+            variant, confidence = estimate_variant(hanzi)
+            self.assertEqual(variant, TEST_CASES[test_case][0])
+            self.assertGreaterEqual(confidence, 0.99)
+
+    def test_decides_from_prefix(self):
+        """Test a clear prefix decides without reading the rest"""
+        simplified = sorted(get_exclusive_hanzi()["Simplified"])[:60]
+
+        def stream():
+            yield from simplified * 3
+            raise AssertionError("read beyond sample")
+
+        variant, confidence = estimate_variant(stream(), sample_size=60)
+        self.assertEqual(variant, "Simplified")
+        self.assertGreater(confidence, 0.99)
+        self.assertLess(confidence, 1.0)
+
+    def test_ambiguous_sample_falls_back(self):
+        """Test an inconclusive sample falls back to every unique hanzi"""
+        # Sample of 2 is too small to decide, full text is Traditional
+        hanzi = ["愛", "氣"] + ["車", "電", "話", "點", "腦", "視", "東", "讀"] * 2
+        self.assertEqual(estimate_variant(hanzi, sample_size=2), ("Traditional", 1.0))
+        self.assertEqual(estimate_variant([]), ("Unknown", 1.0))
+
+    def test_variant_confidence(self):
+        """Test confidences favour the variant of the sample ratio"""
+        confidences = get_variant_confidence(100, 0)
+        self.assertEqual(max(confidences, key=confidences.get), "Simplified")
+        confidences = get_variant_confidence(50, 50)
+        self.assertEqual(max(confidences, key=confidences.get), "Unknown")
+        self.assertEqual(get_variant_confidence(0, 0)["Unknown"], 0.0)
+
+    def test_pruned_analysis_matches(self):
+        """Test analysis with a known variant and one partition matches"""
+        for test_case in ["bjzd.txt", "ttc.txt", "mix50.txt"]:
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                hanzi = filter_hanzi_from_html(f.read())
+            full = analyse_hanzi(hanzi, *partition_hanzi(hanzi)[:2])
+            variant, _ = estimate_variant(hanzi)
+            simp, trad, _ = partition_hanzi(hanzi, variant=variant)
+            self.assertFalse(simp if variant != "Simplified" else trad)
+            pruned = analyse_hanzi(hanzi, simp, trad, variant)
+            self.assertIsNone(assert_frame_equal(pruned[0], full[0]))
+            self.assertIsNone(assert_frame_equal(pruned[1], full[1]))
+            self.assertEqual(pruned[2], full[2])
+
+
+class TestStatsOnly(unittest.TestCase):
+    def test_matches_full_analysis(self):
+        """Test stats computed without hanzi_df are identical"""
+        for test_case in ["bjzd.txt", "ttc.txt", "ping50.txt", "mix50.txt"]:
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                hanzi = filter_hanzi_from_html(f.read())
+            simp, trad, _ = partition_hanzi(hanzi)
+            full = analyse_hanzi(hanzi, simp, trad)
+            hanzi_df, stats_df, variant = analyse_hanzi(
+                hanzi, simp, trad, stats_only=True
+            )
+            self.assertIsNone(hanzi_df)
+            self.assertIsNone(assert_frame_equal(stats_df, full[1]))
+            self.assertEqual(variant, full[2])
+            stats_df = get_stats_df_from_counts(unit_counts_per_hanzi(hanzi), variant)
+            self.assertIsNone(assert_frame_equal(stats_df, full[1]))
+
+    def test_analyse_counts(self):
+        """Test stats from counts alone match the full analysis"""
+        for test_case in ["bjzd.txt", "ttc.txt", "mix90.txt"]:
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                hanzi = filter_hanzi_from_html(f.read())
+            simp, trad, _ = partition_hanzi(hanzi)
+            _, expected, variant = analyse_hanzi(hanzi, simp, trad, stats_only=True)
+            stats_df, counted_variant = analyse_counts(unit_counts_per_hanzi(hanzi))
+            self.assertEqual(counted_variant, variant)
+            self.assertIsNone(assert_frame_equal(stats_df, expected))
+        self.assertIsNone(analyse_counts(dict()))
+        self.assertIsNone(analyse_counts({"a": 1}))
+
+
 if __name__ == "__main__":
     unittest.main()
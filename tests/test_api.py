@@ -0,0 +1,97 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from polars.testing import assert_frame_equal
+from src.xiwen import Analysis, analyse_file, analyse_text, analyse_url
+from src.xiwen.app import analyse_html
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.heavy_hitters import SpaceSaving
+from src.xiwen.utils.scheduler import FetchError
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+TEST_CASES = ["bjzd.txt", "ttc.txt", "ping50.txt", "mix50.txt", "mix90.txt"]
+
+TEXTS = dict()
+for test_case in TEST_CASES:
+    with open(os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING) as f:
+        TEXTS[test_case] = f.read()
+
+
+class TestAnalyseText(unittest.TestCase):
+    def test_matches_coordinator(self):
+        """Test results match the coordinator pipeline"""
+        for test_case, text in TEXTS.items():
+            hanzi_df, stats_df, hanzi_list, outliers, variant = analyse_html(
+                text, parser="text"
+            )
+            result = analyse_text(text)
+            self.assertEqual(result.variant, variant)
+            self.assertEqual(result.hanzi_list, hanzi_list)
+            self.assertEqual(result.total_count, len(hanzi_list))
+            self.assertEqual(result.unique_count, len(set(hanzi_list)))
+            self.assertEqual(len(result.outliers), len(outliers))
+            assert_frame_equal(result.hanzi_df, hanzi_df)
+            assert_frame_equal(result.stats_df, stats_df)
+
+    def test_lazy_tables(self):
+        """Test counts, variant and stats are read without building hanzi_df"""
+        with patch("src.xiwen.api.get_counts_per_hanzi") as get_counts:
+            result = analyse_text(TEXTS["bjzd.txt"])
+            self.assertEqual(result.variant, "Simplified")
+            self.assertEqual(result.counts["京"], result.hanzi_list.count("京"))
+            self.assertEqual(result.stats_df.height, 8)
+            get_counts.assert_not_called()
+        self.assertIs(result.stats_df, result.stats_df)
+
+    def test_slots(self):
+        """Test results carry no per-instance dict"""
+        result = analyse_text(TEXTS["ttc.txt"])
+        self.assertIsInstance(result, Analysis)
+        self.assertFalse(hasattr(result, "__dict__"))
+
+    def test_options(self):
+        """Test outlier summaries and early variant detection"""
+        result = analyse_text(TEXTS["bjzd.txt"], outliers_top_k=5, early_variant=True)
+        self.assertIsInstance(result.outliers, SpaceSaving)
+        self.assertEqual(result.variant, "Simplified")
+
+    def test_no_hsk_hanzi(self):
+        """Test texts without HSK hanzi give None"""
+        self.assertIsNone(analyse_text("no hanzi here"))
+        self.assertIsNone(analyse_text("朕"))
+
+
+class TestAnalyseFile(unittest.TestCase):
+    def test_compressed_file(self):
+        """Test compressed files are streamed and analysed like their text"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ttc.txt.gz")
+            with open(path, "wb") as f:
+                f.write(gzip.compress(TEXTS["ttc.txt"].encode(ENCODING)))
+            result = analyse_file(path)
+        expected = analyse_text(TEXTS["ttc.txt"])
+        self.assertEqual(result.variant, expected.variant)
+        self.assertEqual(result.counts, expected.counts)
+
+
+class TestAnalyseURL(unittest.TestCase):
+    def test_fetched_page(self):
+        """Test pages are fetched, parsed and analysed"""
+        markup = "<p>" + TEXTS["ttc.txt"] + "</p>"
+        with patch("src.xiwen.api.fetch_html", return_value=markup):
+            result = analyse_url("https://example.com/ttc")
+        self.assertEqual(result.variant, "Traditional")
+
+    def test_fetch_error(self):
+        """Test fetch failures propagate"""
+        error = FetchError("https://example.com", "timeout")
+        with patch("src.xiwen.api.fetch_html", side_effect=error):
+            with self.assertRaises(FetchError):
+                analyse_url("https://example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
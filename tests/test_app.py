@@ -0,0 +1,178 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+from polars.testing import assert_frame_equal
+from src.xiwen.app import analyse_html, async_coordinator, async_pipeline
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.extract import to_hanzi
+from src.xiwen.utils.scheduler import FetchError, FetchScheduler
+from tests.helpers import FakeResponse
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+    SIMPLIFIED_HTML = "<p>" + f.read() + "</p>"
+with open(os.path.join(TEST_ASSETS, "ttc.txt"), "r", encoding=ENCODING) as f:
+    TRADITIONAL_HTML = "<p>" + f.read() + "</p>"
+
+PAGES = {
+    "https://example.com/bjzd": SIMPLIFIED_HTML,
+    "https://example.com/ttc": TRADITIONAL_HTML,
+    "https://example.com/empty": "<p>no hanzi here</p>",
+    "https://example.com/missing": None,
+}
+
+
+def fake_send(url):
+    markup = PAGES.get(url)
+    return FakeResponse(404 if markup is None else 200, markup)
+
+
+def fake_scheduler(send=fake_send):
+    return FetchScheduler(rate=1000, burst=1000, backoff_base=0.01, send=send)
+
+
+async def collect(urls, **kwargs):
+    kwargs.setdefault("scheduler", fake_scheduler())
+    return {url: result async for url, result in async_pipeline(urls, **kwargs)}
+
+
+class TestAnalyseHTML(unittest.TestCase):
+    def test_variants(self):
+        """Test the CPU stages identify each variant"""
+        self.assertEqual(analyse_html(SIMPLIFIED_HTML)[4], "Simplified")
+        self.assertEqual(analyse_html(TRADITIONAL_HTML)[4], "Traditional")
+
+    def test_no_hanzi(self):
+        """Test documents without hanzi give no result"""
+        self.assertIsNone(analyse_html("<p>no hanzi here</p>"))
+
+    def test_compact(self):
+        """Test codepoint arrays give the same tables as character lists"""
+        for markup in (SIMPLIFIED_HTML, TRADITIONAL_HTML):
+            hanzi_df, stats_df, hanzi_list, outliers, variant = analyse_html(markup)
+            results = analyse_html(markup, compact=True)
+            assert_frame_equal(results[0], hanzi_df)
+            assert_frame_equal(results[1], stats_df)
+            self.assertIsInstance(results[2], array)
+            self.assertEqual(to_hanzi(results[2]), hanzi_list)
+            self.assertEqual(to_hanzi(results[3]), outliers)
+            self.assertEqual(results[4], variant)
+
+
+class TestAsyncCoordinator(unittest.TestCase):
+    def test_matches_sync(self):
+        """Test the coroutine returns the same results as analyse_html"""
+        hanzi_df, stats_df, hanzi_list, _, variant = asyncio.run(
+            async_coordinator("https://example.com/bjzd", scheduler=fake_scheduler())
+        )
+        expected = analyse_html(SIMPLIFIED_HTML)
+        self.assertTrue(hanzi_df.equals(expected[0]))
+        self.assertTrue(stats_df.equals(expected[1]))
+        self.assertEqual(hanzi_list, expected[2])
+        self.assertEqual(variant, expected[4])
+
+    def test_missing(self):
+        """Test failed fetches raise FetchError"""
+        with self.assertRaises(FetchError):
+            asyncio.run(
+                async_coordinator(
+                    "https://example.com/missing", scheduler=fake_scheduler()
+                )
+            )
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    def test_all_urls(self):
+        """Test every URL is yielded once with its result"""
+        with ThreadPoolExecutor(2) as executor:
+            results = asyncio.run(collect(PAGES, executor=executor))
+        self.assertEqual(set(results), set(PAGES))
+        self.assertEqual(results["https://example.com/bjzd"][4], "Simplified")
+        self.assertEqual(results["https://example.com/ttc"][4], "Traditional")
+        self.assertIsNone(results["https://example.com/empty"])
+        self.assertIsInstance(results["https://example.com/missing"], FetchError)
+        self.assertEqual(results["https://example.com/missing"].status, 404)
+
+    def test_process_pool(self):
+        """Test analysis can run in worker processes"""
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(2, mp_context=spawn) as executor:
+            results = asyncio.run(
+                collect(list(PAGES)[:2], executor=executor, fetch_workers=2)
+            )
+        self.assertEqual(results["https://example.com/bjzd"][4], "Simplified")
+        self.assertEqual(results["https://example.com/ttc"][4], "Traditional")
+
+    def test_backpressure(self):
+        """Test fetches stop running ahead while analysis is backed up"""
+        lock = threading.Lock()
+        started = [0]
+
+        def counting_fetch(url):
+            with lock:
+                started[0] += 1
+            return FakeResponse()
+
+        urls = (f"https://example.com/{i}" for i in range(100))
+
+        async def run():
+            seen = 0
+            async for _ in async_pipeline(
+                urls,
+                executor=executor,
+                analysis_workers=1,
+                fetch_workers=2,
+                queue_size=2,
+                scheduler=fake_scheduler(counting_fetch),
+            ):
+                seen += 1
+                if seen == 1:
+                    # Give fetchers time to fill the queues
+                    await asyncio.sleep(0.2)
+                    return started[0]
+
+        with ThreadPoolExecutor(1) as executor:
+            in_flight = asyncio.run(run())
+        # queue_size fetched, queue_size done, plus one per worker
+        self.assertLessEqual(in_flight, 2 + 2 + 2 + 1 + 1)
+
+    def test_errors_propagate(self):
+        """Test errors in the analysis stages are raised to the caller"""
+        with patch("src.xiwen.app.analyse_html", side_effect=RuntimeError):
+            with ThreadPoolExecutor(1) as executor:
+                with self.assertRaises(RuntimeError):
+                    asyncio.run(
+                        collect(["https://example.com/bjzd"], executor=executor)
+                    )
+
+    def test_slow_fetches_overlap(self):
+        """Test fetches run concurrently"""
+
+        def slow_fetch(url):
+            time.sleep(0.2)
+            return FakeResponse(404, None)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(1) as executor:
+            results = asyncio.run(
+                collect(
+                    [f"https://example.com/{i}" for i in range(8)],
+                    executor=executor,
+                    fetch_workers=8,
+                    scheduler=fake_scheduler(slow_fetch),
+                )
+            )
+        self.assertEqual(len(results), 8)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
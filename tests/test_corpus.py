@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from polars.testing import assert_frame_equal
+from src.xiwen.app import analyse_html
+from src.xiwen.corpus import (
+    CorpusAnalysis,
+    analyse_epub,
+    analyse_warc,
+    map_documents,
+)
+from src.xiwen.utils.config import ENCODING
+from tests.test_epub import write_epub
+from tests.test_warc import http_response, warc_record, write_warc
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def square_or_fail(x: int) -> int:
+    """Squares x; raises for negative x, and ends the process for zero"""
+    if x < 0:
+        raise ValueError(f"negative: {x}")
+    if x == 0:
+        os._exit(1)
+    return x * x
+
+
+class TestMapDocuments(unittest.TestCase):
+    def test_order_and_bound(self):
+        """Test results keep document order with few documents in flight"""
+        consumed = []
+
+        def documents():
+            for i in range(20):
+                consumed.append(i)
+                yield f"doc{i}", i
+
+        with ThreadPoolExecutor(4) as executor:
+            results = map_documents(square, documents(), executor, max_pending=3)
+            self.assertEqual(next(results), ("doc0", 0))
+            self.assertLessEqual(len(consumed), 3)
+            self.assertEqual(list(results), [(f"doc{i}", i * i) for i in range(1, 20)])
+
+    def test_errors(self):
+        """Test a raising document yields its error and the others go on"""
+        documents = [("a", 1), ("b", -2), ("c", 3)]
+        with ThreadPoolExecutor(2) as executor:
+            results = list(map_documents(square_or_fail, documents, executor))
+        self.assertEqual([key for key, _ in results], ["a", "b", "c"])
+        self.assertEqual((results[0][1], results[2][1]), (1, 9))
+        self.assertIsInstance(results[1][1], ValueError)
+
+    def test_broken_pool(self):
+        """Test a dead worker fails its document and a new pool takes the rest"""
+        documents = [("a", 1), ("b", 0), ("c", 3)]
+        results = list(map_documents(square_or_fail, documents, max_pending=1))
+        self.assertEqual(results[0], ("a", 1))
+        self.assertIsInstance(results[1][1], BrokenProcessPool)
+        self.assertEqual(results[2], ("c", 9))
+
+    def test_corpus_analysis(self):
+        """Test counts are merged from results as they are iterated"""
+        results = [("a", (None, "Simplified", {"中": 2})), ("b", None)]
+        results.append(("c", (None, "Simplified", {"中": 1, "文": 1})))
+        results.append(("d", ValueError("bad")))
+        corpus = CorpusAnalysis(results)
+        self.assertEqual([key for key, _ in corpus], ["a", "b", "c", "d"])
+        self.assertEqual(corpus.counts, {"中": 3, "文": 1})
+        self.assertEqual((corpus.documents, corpus.empty, corpus.failed), (2, 1, 1))
+
+
+class TestAnalyseWarc(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pages = dict()
+        for name in ("bjzd.txt", "ttc.txt"):
+            with open(os.path.join(TEST_ASSETS, name), "r", encoding=ENCODING) as f:
+                self.pages[f"https://{name}"] = f"<html><p>{f.read()}</p></html>"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_records_and_aggregate(self):
+        """Test each record matches analyse_html, and the aggregate the whole"""
+        records = [
+            warc_record(http_response(markup.encode(ENCODING)), uri)
+            for uri, markup in self.pages.items()
+        ]
+        gb18030 = "Content-Type: text/html; charset=gb18030"
+        first_uri, first = next(iter(self.pages.items()))
+        records.append(
+            warc_record(http_response(first.encode("gb18030"), gb18030), "gb")
+        )
+        records.append(warc_record(http_response(b"<p>no hanzi</p>"), "empty"))
+        paths = [
+            write_warc(self.tmp.name, "one.warc.gz", records[:2]),
+            write_warc(self.tmp.name, "two.warc.gz", records[2:]),
+        ]
+
+        with ThreadPoolExecutor(2) as executor:
+            corpus = analyse_warc(paths, "text", executor=executor, max_pending=2)
+            results = dict(corpus)
+            aggregate = corpus.aggregate()
+
+        self.assertEqual(list(results), [*self.pages, "gb", "empty"])
+        self.assertIsNone(results["empty"])
+        for uri, markup in self.pages.items():
+            _, stats_df, _, _, variant = analyse_html(markup, "text", stats_only=True)
+            self.assertEqual(results[uri][1], variant)
+            self.assertIsNone(assert_frame_equal(results[uri][0], stats_df))
+        self.assertIsNone(assert_frame_equal(results["gb"][0], results[first_uri][0]))
+
+        combined = "".join(self.pages.values()) + first
+        _, stats_df, _, _, variant = analyse_html(combined, "text", stats_only=True)
+        self.assertEqual(aggregate[1], variant)
+        self.assertIsNone(assert_frame_equal(aggregate[0], stats_df))
+        self.assertEqual((corpus.documents, corpus.empty), (3, 1))
+
+    def test_process_pool(self):
+        """Test records are analysed in the default process pool"""
+        uri, markup = next(iter(self.pages.items()))
+        path = write_warc(
+            self.tmp.name,
+            "crawl.warc.gz",
+            [warc_record(http_response(markup.encode(ENCODING)), uri)],
+        )
+        ((key, result),) = list(analyse_warc(path, "text"))
+        self.assertEqual(key, uri)
+        self.assertEqual(result[1], "Simplified")
+
+
+class TestAnalyseEpub(unittest.TestCase):
+    def test_chapters_and_book(self):
+        """Test per-chapter stats, in order, and whole-book stats"""
+        chapters = dict()
+        for i, name in enumerate(["bjzd.txt", "mix90.txt", "iliad.txt"]):
+            with open(os.path.join(TEST_ASSETS, name), "r", encoding=ENCODING) as f:
+                chapters[f"ch{i}.xhtml"] = f.read()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_epub(tmp, chapters)
+            with ThreadPoolExecutor(2) as executor:
+                book = analyse_epub(path, executor=executor)
+                results = list(book)
+                stats_df, variant = book.aggregate()
+
+        self.assertEqual(
+            [chapter for chapter, _ in results], [f"OEBPS/{c}" for c in chapters]
+        )
+        self.assertIsNone(results[2][1])
+        texts = list(chapters.values())
+        for (_, result), text in zip(results, texts):
+            if result is not None:
+                expected = analyse_html(f"<p>{text}</p>", stats_only=True)
+                self.assertIsNone(assert_frame_equal(result[0], expected[1]))
+        whole = analyse_html(f"<p>{''.join(texts)}</p>", stats_only=True)
+        self.assertEqual(variant, whole[4])
+        self.assertIsNone(assert_frame_equal(stats_df, whole[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
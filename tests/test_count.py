@@ -2,15 +2,20 @@ import os
 import polars as pl
 import sys
 import unittest
+from array import array
 from polars.testing import assert_frame_equal
 from src.xiwen.utils.config import HSK_GRADES
 from src.xiwen.utils.count import (
+    count_codepoints,
+    counts_by_hanzi,
     get_counts_per_hanzi,
     get_counts_per_hanzi_per_hsk_grade,
+    get_counts_per_hsk_grade_from_counts,
     get_cumulative_counts_per_hsk_grade,
+    merge_counts,
     unit_counts_per_hanzi,
 )
-from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.extract import filter_codepoints_from_html, filter_hanzi_from_html
 from src.xiwen.utils.hsk_hanzi import HSKHanzi
 from src.xiwen.utils.transform import filter_dataframe_by_hanzi_variant, partition_hanzi
 
@@ -130,6 +135,29 @@ class TestUnitCounts(unittest.TestCase):
         test = {"爱": 3, "气": 3, "车": 2, "愛": 1, "氣": 1, "車": 1}
         self.assertEqual(unit_counts_per_hanzi(hanzi), test)
 
+    def test_codepoint_counts(self):
+        """Test vectorized codepoint counts match the dict counts"""
+        hanzi = ["爱", "气", "爱", "气", "车", "爱", "气", "车", "愛", "氣", "車"]
+        codes = array("I", map(ord, hanzi))
+        counts = count_codepoints(codes)
+        self.assertEqual(counts.schema, {"codepoint": pl.UInt32, "count": pl.Int32})
+        self.assertEqual(
+            dict(counts.rows()),
+            {ord(zi): count for zi, count in unit_counts_per_hanzi(hanzi).items()},
+        )
+        self.assertEqual(counts_by_hanzi(codes), unit_counts_per_hanzi(hanzi))
+        self.assertEqual(count_codepoints(array("I")).height, 0)
+
+    def test_merge_counts(self):
+        """Test merged counts equal counts of the combined hanzi"""
+        first = ["爱", "气", "爱", "车"]
+        second = ["气", "愛", "车", "车"]
+        total = merge_counts(dict(), unit_counts_per_hanzi(first))
+        merged = merge_counts(total, unit_counts_per_hanzi(second))
+        self.assertIs(merged, total)
+        self.assertEqual(total, unit_counts_per_hanzi(first + second))
+        self.assertEqual(merge_counts(dict(), dict()), dict())
+
 
 class TestCumulativeCounts(unittest.TestCase):
     @unittest.skipIf(
@@ -201,6 +229,7 @@ class TestGetCounts(unittest.TestCase):
         """Test counts correct for simplified characters"""
         variant = "Simplified"
         hsk_hanzi = HSKHanzi().get_all_HSK_hanzi()
+        hsk_hanzi = hsk_hanzi.with_columns(pl.col("Pinyin").cast(pl.Utf8))
         for test_case in TEST_CASES.keys():
             with open(os.path.join(TEST_ASSETS, test_case), "r") as f:
                 text = f.read()
@@ -226,6 +255,7 @@ class TestGetCounts(unittest.TestCase):
         """Test counts correct for traditional characters"""
         variant = "Traditional"
         hsk_hanzi = HSKHanzi().get_all_HSK_hanzi()
+        hsk_hanzi = hsk_hanzi.with_columns(pl.col("Pinyin").cast(pl.Utf8))
         for test_case in TEST_CASES.keys():
             with open(os.path.join(TEST_ASSETS, test_case), "r") as f:
                 text = f.read()
@@ -244,6 +274,23 @@ class TestGetCounts(unittest.TestCase):
                 assert_frame_equal(get_counts_per_hanzi(simplified, variant), merged_df)
             )
 
+    def test_codepoints(self):
+        """Test codepoint arrays give the same counts as character lists"""
+        for test_case in TEST_CASES.keys():
+            with open(os.path.join(TEST_ASSETS, test_case), "r", encoding="utf-8") as f:
+                text = f.read()
+            hanzi = partition_hanzi(filter_hanzi_from_html(text))
+            codes = partition_hanzi(filter_codepoints_from_html(text))
+            for variant, index in (
+                ("Simplified", 0),
+                ("Traditional", 1),
+                ("Unknown", 1),
+            ):
+                assert_frame_equal(
+                    get_counts_per_hanzi(codes[index], variant),
+                    get_counts_per_hanzi(hanzi[index], variant),
+                )
+
 
 class TestGranularCounts(unittest.TestCase):
     @unittest.skipIf(
@@ -297,6 +344,27 @@ class TestGranularCounts(unittest.TestCase):
 
             self.assertEqual(TEST_CASES[test_case][variant], counts)
 
+    def test_from_counts(self):
+        """Test breakdowns from per-hanzi counts match the DataFrame path"""
+        texts = []
+        for test_case in TEST_CASES.keys():
+            with open(os.path.join(TEST_ASSETS, test_case), "r", encoding="utf-8") as f:
+                texts.append(f.read())
+        # Polymaps with equal and unequal counts, and shared traditional forms
+        texts += ["發髮发了瞭面麵麵台檯臺颱", "蘋苹只隻衹隻"]
+        for text in texts:
+            hanzi_list = filter_hanzi_from_html(text)
+            simplified, traditional, _ = partition_hanzi(hanzi_list)
+            hanzi_counts = unit_counts_per_hanzi(hanzi_list)
+            for variant in ("Simplified", "Traditional", "Unknown"):
+                subset = simplified if variant == "Simplified" else traditional
+                hanzi_df = get_counts_per_hanzi(subset, variant)
+                filtered_hanzi_df = filter_dataframe_by_hanzi_variant(hanzi_df, variant)
+                self.assertEqual(
+                    get_counts_per_hsk_grade_from_counts(hanzi_counts, variant),
+                    get_counts_per_hanzi_per_hsk_grade(filtered_hanzi_df, hanzi_list),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
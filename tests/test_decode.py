@@ -0,0 +1,124 @@
+import codecs
+import os
+import unittest
+from unittest.mock import patch
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.decode import (
+    decode_html,
+    get_header_charset,
+    is_plausible,
+    normalise_encoding,
+    sniff_meta_charset,
+)
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+    SIMPLIFIED_TEXT = f.read()
+with open(os.path.join(TEST_ASSETS, "ttc.txt"), "r", encoding=ENCODING) as f:
+    TRADITIONAL_TEXT = f.read()
+
+
+class TestNormaliseEncoding(unittest.TestCase):
+    def test_supersets(self):
+        """Test legacy labels map to their superset codecs"""
+        self.assertEqual(normalise_encoding("GB2312"), "gb18030")
+        self.assertEqual(normalise_encoding("gbk"), "gb18030")
+        self.assertEqual(normalise_encoding("Big5"), "big5hkscs")
+        self.assertEqual(normalise_encoding("latin-1"), "cp1252")
+        self.assertEqual(normalise_encoding("ISO-8859-1"), "cp1252")
+        self.assertEqual(normalise_encoding("US-ASCII"), "cp1252")
+        self.assertEqual(normalise_encoding("UTF-8"), "utf-8")
+
+    def test_unknown_labels(self):
+        """Test unrecognised labels are ignored"""
+        self.assertIsNone(normalise_encoding("not-an-encoding"))
+        self.assertIsNone(normalise_encoding(""))
+        self.assertIsNone(normalise_encoding(None))
+
+
+class TestCharsetDeclarations(unittest.TestCase):
+    def test_header_charset(self):
+        """Test charset is read from Content-Type regardless of key case"""
+        headers = {"content-type": 'text/html; charset="GBK"'}
+        self.assertEqual(get_header_charset(headers), "gb18030")
+        self.assertIsNone(get_header_charset({"Content-Type": "text/html"}))
+        self.assertIsNone(get_header_charset(None))
+
+    def test_meta_charset(self):
+        """Test both forms of <meta> declaration are sniffed"""
+        html = b'<html><head><meta charset="big5"></head></html>'
+        self.assertEqual(sniff_meta_charset(html), "big5hkscs")
+        html = b'<meta http-equiv="Content-Type" content="text/html; charset=gb2312">'
+        self.assertEqual(sniff_meta_charset(html), "gb18030")
+
+    def test_meta_charset_beyond_sniff_window(self):
+        """Test declarations past the sniffing window are ignored"""
+        html = b" " * 10000 + b'<meta charset="big5">'
+        self.assertIsNone(sniff_meta_charset(html))
+
+
+class TestDecodeHTML(unittest.TestCase):
+    def test_utf8(self):
+        """Test undeclared UTF-8 decodes first time"""
+        content = SIMPLIFIED_TEXT.encode("utf-8")
+        self.assertEqual(decode_html(content), SIMPLIFIED_TEXT)
+
+    def test_bom(self):
+        """Test byte order marks take precedence"""
+        content = codecs.BOM_UTF8 + "中文".encode("utf-8")
+        self.assertEqual(decode_html(content, {"Content-Type": "charset=big5"}), "中文")
+
+    def test_declared_header(self):
+        """Test charset in headers is honoured"""
+        content = TRADITIONAL_TEXT.encode("big5", errors="ignore")
+        headers = {"Content-Type": "text/html; charset=big5"}
+        self.assertEqual(
+            decode_html(content, headers),
+            content.decode("big5hkscs"),
+        )
+
+    def test_declared_meta(self):
+        """Test charset in <meta> is honoured"""
+        html = '<meta charset="gbk"><p>' + SIMPLIFIED_TEXT + "</p>"
+        content = html.encode("gbk")
+        self.assertEqual(decode_html(content), html)
+
+    def test_declared_latin_1(self):
+        """Test pages declared as Latin-1 decode as Windows-1252, as in browsers"""
+        content = b"<p>\x93caf\xe9\x94 \x96 50\x80</p>"
+        headers = {"Content-Type": "text/html; charset=ISO-8859-1"}
+        self.assertEqual(
+            decode_html(content, headers),
+            "<p>\u201ccaf\u00e9\u201d \u2013 50\u20ac</p>",
+        )
+
+    def test_declared_with_invalid_bytes(self):
+        """Test a declared charset that fails strictly is kept over detection"""
+        content = TRADITIONAL_TEXT.encode("big5", errors="ignore") + b"\xff"
+        headers = {"Content-Type": "text/html; charset=big5"}
+        with patch("src.xiwen.utils.decode.detect_encoding") as detect:
+            text = decode_html(content, headers)
+            detect.assert_not_called()
+        self.assertEqual(text, content.decode("big5hkscs", errors="replace"))
+
+    def test_gb18030_fallback(self):
+        """Test undeclared GB18030 content decodes via fallback"""
+        content = SIMPLIFIED_TEXT.encode("gb18030")
+        self.assertEqual(decode_html(content), SIMPLIFIED_TEXT)
+
+    def test_big5_fallback(self):
+        """Test undeclared Big5 content is not mistaken for GB18030"""
+        content = TRADITIONAL_TEXT.encode("big5", errors="ignore")
+        self.assertEqual(decode_html(content), content.decode("big5hkscs"))
+
+    def test_is_plausible(self):
+        """Test private use codepoints flag mismatched decodes"""
+        self.assertTrue(is_plausible(TRADITIONAL_TEXT))
+        self.assertTrue(is_plausible("ascii only"))
+        self.assertFalse(is_plausible("\ue000\ue001中文"))
+
+
+if __name__ == "__main__":
+    unittest.main()
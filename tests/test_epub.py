@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from urllib.parse import unquote
+from src.xiwen.utils.epub import EpubFormatError, get_spine, iter_epub_chapters
+
+CONTAINER = """<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>"""
+
+
+def chapter_xhtml(text: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml"><body>'
+        f"<p>{text}</p></body></html>"
+    )
+
+
+def write_epub(directory: str, chapters: dict[str, str], name: str = "book.epub"):
+    """
+    An EPUB whose spine lists chapters in order, under OEBPS/, plus a
+    stylesheet and an image that are in the manifest but not chapters
+    """
+    items = [
+        f'<item id="c{i}" href="{href}" media-type="application/xhtml+xml"/>'
+        for i, href in enumerate(chapters)
+    ]
+    items.append('<item id="css" href="style.css" media-type="text/css"/>')
+    items.append('<item id="cover" href="cover.jpg" media-type="image/jpeg"/>')
+    itemrefs = ['<itemref idref="cover"/>']
+    itemrefs += [f'<itemref idref="c{i}"/>' for i in range(len(chapters))]
+    package = (
+        '<?xml version="1.0"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+        f"<manifest>{''.join(items)}</manifest>"
+        f"<spine>{''.join(itemrefs)}</spine></package>"
+    )
+    path = os.path.join(directory, name)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as book:
+        book.writestr("mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+        book.writestr("META-INF/container.xml", CONTAINER)
+        book.writestr("OEBPS/content.opf", package)
+        book.writestr("OEBPS/style.css", "p {}")
+        book.writestr("OEBPS/cover.jpg", b"\xff\xd8")
+        for href, text in chapters.items():
+            book.writestr(f"OEBPS/{unquote(href)}", chapter_xhtml(text))
+
+    return path
+
+
+class TestEpub(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_spine_order(self):
+        """Test chapters are read in spine order, resolved from the OPF"""
+        chapters = {"text/ch2.xhtml": "第二", "ch%201.xhtml": "第一"}
+        path = write_epub(self.tmp.name, chapters)
+        with zipfile.ZipFile(path) as book:
+            spine = get_spine(book)
+        self.assertEqual(spine, ["OEBPS/text/ch2.xhtml", "OEBPS/ch 1.xhtml"])
+        read = list(iter_epub_chapters(path))
+        self.assertEqual([chapter for chapter, _ in read], spine)
+        self.assertIn("第二".encode(), read[0][1])
+
+    def test_malformed(self):
+        """Test non-EPUB files raise EpubFormatError"""
+        path = os.path.join(self.tmp.name, "book.epub")
+        with open(path, "wb") as f:
+            f.write(b"not a zip")
+        with self.assertRaises(EpubFormatError):
+            list(iter_epub_chapters(path))
+        with zipfile.ZipFile(path, "w") as book:
+            book.writestr("mimetype", "application/epub+zip")
+        with self.assertRaises(EpubFormatError):
+            list(iter_epub_chapters(path))
+        with zipfile.ZipFile(path, "a") as book:
+            book.writestr("META-INF/container.xml", "<container")
+        with self.assertRaises(EpubFormatError):
+            list(iter_epub_chapters(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
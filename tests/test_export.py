@@ -0,0 +1,42 @@
+import polars as pl
+import unittest
+from array import array
+from src.xiwen.utils.export import get_outliers_df
+from src.xiwen.utils.heavy_hitters import SpaceSaving
+
+
+class TestGetOutliersDF(unittest.TestCase):
+    def test_outliers_list(self):
+        """Test unique outliers sorted by unicode, without pinyin-less hanzi"""
+        outliers_df = get_outliers_df(["龘", "朕", "朕", "㤙"])
+        self.assertEqual(outliers_df.columns, ["Hanzi", "Unicode", "Pinyin"])
+        self.assertEqual(outliers_df["Hanzi"].to_list(), ["朕", "龘"])
+        self.assertEqual(outliers_df["Unicode"].to_list(), [26389, 40856])
+
+    def test_outliers_summary(self):
+        """Test summaries export counts by descending frequency"""
+        summary = SpaceSaving(10)
+        summary.update(["龘", "朕", "朕", "㤙"])
+        outliers_df = get_outliers_df(summary)
+        self.assertEqual(
+            outliers_df.columns,
+            ["Hanzi", "Unicode", "Pinyin", "Count", "Max. Overcount"],
+        )
+        self.assertEqual(outliers_df["Hanzi"].to_list(), ["朕", "龘"])
+        self.assertEqual(outliers_df["Count"].to_list(), [2, 1])
+        self.assertEqual(outliers_df.schema["Count"], pl.Int32)
+
+    def test_codepoints(self):
+        """Test codepoint outliers export as characters"""
+        codes = array("I", map(ord, ["龘", "朕", "朕", "㤙"]))
+        outliers_df = get_outliers_df(codes)
+        self.assertEqual(outliers_df["Hanzi"].to_list(), ["朕", "龘"])
+        summary = SpaceSaving(10)
+        summary.update(codes)
+        outliers_df = get_outliers_df(summary)
+        self.assertEqual(outliers_df["Hanzi"].to_list(), ["朕", "龘"])
+        self.assertEqual(outliers_df["Count"].to_list(), [2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
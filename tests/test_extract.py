@@ -1,7 +1,13 @@
 import os
 import unittest
+from array import array
 from src.xiwen.utils.config import ENCODING
-from src.xiwen.utils.extract import filter_hanzi_by_unicode, filter_hanzi_from_html
+from src.xiwen.utils.extract import (
+    filter_codepoints_from_html,
+    filter_hanzi_by_unicode,
+    filter_hanzi_from_html,
+    to_hanzi,
+)
 
 
 TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
@@ -93,5 +99,25 @@ class TestFilterText(unittest.TestCase):
             self.assertEqual(len(set(hanzi)), TEST_CASES[test_case][2])
 
 
+class TestCodepoints(unittest.TestCase):
+    def test_matches_hanzi(self):
+        """Test codepoint arrays hold the same hanzi as character lists"""
+        for test_case in TEST_CASES:
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                text = f.read()
+            codes = filter_codepoints_from_html(text)
+            self.assertIsInstance(codes, array)
+            self.assertEqual(codes.typecode, "I")
+            self.assertEqual(to_hanzi(codes), filter_hanzi_from_html(text))
+
+    def test_to_hanzi(self):
+        """Test codepoints convert back and characters pass through"""
+        self.assertEqual(to_hanzi(array("I", [29233, 21315])), ["爱", "千"])
+        self.assertEqual(to_hanzi({29233}), ["爱"])
+        self.assertEqual(to_hanzi(["爱", "千"]), ["爱", "千"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,116 @@
+import os
+import unittest
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.count import unit_counts_per_hanzi
+from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.heavy_hitters import HEAP_REBUILD_FACTOR, SpaceSaving
+from src.xiwen.utils.transform import partition_hanzi
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+    HANZI = filter_hanzi_from_html(f.read())
+
+
+class TestSpaceSaving(unittest.TestCase):
+    def test_invalid_capacity(self):
+        """Test capacity must be positive"""
+        with self.assertRaises(ValueError):
+            SpaceSaving(0)
+
+    def test_exact_below_capacity(self):
+        """Test counts are exact while every item fits"""
+        summary = SpaceSaving(10)
+        summary.update(["朕", "朕", "龘", "朕"])
+        self.assertEqual(summary.most_common(), [("朕", 3, 0), ("龘", 1, 0)])
+        self.assertEqual(summary.min_count(), 0)
+
+    def test_update_in_chunks(self):
+        """Test batches are tallied in chunks with the same guarantees"""
+        exact = unit_counts_per_hanzi(HANZI)
+        for chunk_size in (1, 7, len(HANZI)):
+            summary = SpaceSaving(50)
+            summary.update(iter(HANZI), chunk_size)
+            self.assertEqual(len(summary), 50)
+            self.assertEqual(summary.total, len(HANZI))
+            for zi, count, error in summary.most_common():
+                self.assertGreaterEqual(count, exact[zi])
+                self.assertLessEqual(count - error, exact[zi])
+            self.assertEqual(summary.most_common(1)[0][0], max(exact, key=exact.get))
+
+    def test_guarantees(self):
+        """Test bounded size, overestimates within error, frequent items kept"""
+        exact = unit_counts_per_hanzi(HANZI)
+        summary = SpaceSaving(50)
+        for zi in HANZI:
+            summary.add(zi)
+
+        self.assertEqual(len(summary), 50)
+        self.assertEqual(summary.total, len(HANZI))
+        for zi, count, error in summary.most_common():
+            self.assertGreaterEqual(count, exact[zi])
+            self.assertLessEqual(count - error, exact[zi])
+        for zi, count in exact.items():
+            if count > len(HANZI) / 50:
+                self.assertIn(zi, summary.counts)
+        self.assertEqual(summary.most_common(1)[0][0], max(exact, key=exact.get))
+
+    def test_evicts_least_frequent(self):
+        """Test a new item replaces the least frequent one, whatever its age"""
+        summary = SpaceSaving(3)
+        summary.update(["朕", "朕", "龘", "龘", "龘", "一"])
+        summary.add("朕", 2)
+        summary.add("二")
+        self.assertEqual(
+            summary.most_common(), [("朕", 4, 0), ("龘", 3, 0), ("二", 2, 1)]
+        )
+        self.assertEqual(summary.min_count(), 2)
+
+    def test_heap_bounded(self):
+        """Test stale heap entries are dropped as counts change"""
+        summary = SpaceSaving(10)
+        for zi in HANZI:
+            summary.add(zi)
+            self.assertLessEqual(len(summary.heap), HEAP_REBUILD_FACTOR * 10)
+        self.assertEqual(
+            summary.min_count(), min(count for count, _ in summary.counts.values())
+        )
+
+    def test_merge(self):
+        """Test merged summaries keep the guarantees over both streams"""
+        exact = unit_counts_per_hanzi(HANZI)
+        a, b = SpaceSaving(50), SpaceSaving(50)
+        for zi in HANZI[:9000]:
+            a.add(zi)
+        for zi in HANZI[9000:]:
+            b.add(zi)
+        a.merge(b)
+
+        self.assertEqual(len(a), 50)
+        self.assertEqual(a.total, len(HANZI))
+        for zi, count, error in a.most_common():
+            self.assertGreaterEqual(count, exact[zi])
+            self.assertLessEqual(count - error, exact[zi])
+        self.assertEqual(a.most_common(1)[0][0], max(exact, key=exact.get))
+
+
+class TestPartitionOutliersTopK(unittest.TestCase):
+    def test_summary_matches_list(self):
+        """Test the outlier summary agrees with the full outlier list"""
+        simplified, traditional, outliers = partition_hanzi(HANZI)
+        summary_result = partition_hanzi(HANZI, outliers_top_k=20)
+        self.assertEqual(summary_result[:2], (simplified, traditional))
+
+        summary = summary_result[2]
+        self.assertIsInstance(summary, SpaceSaving)
+        self.assertEqual(summary.total, len(outliers))
+        exact = unit_counts_per_hanzi(outliers)
+        for zi, count, error in summary.most_common():
+            self.assertGreaterEqual(count, exact[zi])
+            self.assertLessEqual(count - error, exact[zi])
+        self.assertEqual(summary.most_common(1)[0][0], max(exact, key=exact.get))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
 import os
 import polars as pl
+import tempfile
 import unittest
+from unittest.mock import patch
 from polars.testing import assert_frame_equal
 from src.xiwen.utils.config import ASSETS_DIR, HSK30_HANZI_SCHEMA
-from src.xiwen.utils.hsk_hanzi import HSKHanzi
+from src.xiwen.utils.hsk_hanzi import (
+    HSK30_PARQUET_PATH,
+    HSKHanzi,
+    load_hsk_hanzi,
+    read_hsk_hanzi_ipc,
+    write_hsk_hanzi_ipc,
+)
 
 
 class TestHSKHanzi(unittest.TestCase):
@@ -20,7 +28,12 @@ class TestHSKHanzi(unittest.TestCase):
             hive_schema=HSK30_HANZI_SCHEMA,
         )
         A = HSKHanzi().HSK_hanzi
-        self.assertIsNone(assert_frame_equal(hsk_hanzi, A))
+        self.assertEqual(A.schema["Pinyin"], pl.Categorical)
+        self.assertIsNone(
+            assert_frame_equal(
+                hsk_hanzi, A.with_columns(pl.col("Pinyin").cast(pl.Utf8))
+            )
+        )
 
     def test_HSKHanzi_creates_Simplified_list(self):
         """Test Simplified list created when Simplified passed in"""
@@ -57,5 +70,52 @@ class TestHSKHanzi(unittest.TestCase):
         self.assertEqual(hsk_hanzi.get_HSK_hanzi_sublist(), hsk_hanzi.HSK_hanzi_sublist)
 
 
+class TestHSKHanziIPC(unittest.TestCase):
+    def test_ipc_matches_parquet(self):
+        """Test IPC file holds the Parquet data with categorical pinyin"""
+        hsk_hanzi = pl.read_parquet(
+            os.path.join(ASSETS_DIR, "hsk30_hanzi.parquet"),
+            hive_schema=HSK30_HANZI_SCHEMA,
+        )
+        ipc = read_hsk_hanzi_ipc()
+        self.assertEqual(ipc.schema["Pinyin"], pl.Categorical)
+        self.assertIsNone(
+            assert_frame_equal(
+                ipc.with_columns(pl.col("Pinyin").cast(pl.Utf8)), hsk_hanzi
+            )
+        )
+
+    def test_ipc_generated_when_missing(self):
+        """Test IPC file is written on first read if absent"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hsk30_hanzi.arrow")
+            generated = read_hsk_hanzi_ipc(path)
+            self.assertTrue(os.path.exists(path))
+            self.assertIsNone(assert_frame_equal(generated, read_hsk_hanzi_ipc()))
+            write_hsk_hanzi_ipc(path)
+            self.assertIsNone(assert_frame_equal(read_hsk_hanzi_ipc(path), generated))
+
+    def test_ipc_regenerated_when_stale(self):
+        """Test IPC file is rewritten once the Parquet file changes"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hsk30_hanzi.arrow")
+            write_hsk_hanzi_ipc(path)
+            with patch("src.xiwen.utils.hsk_hanzi.write_hsk_hanzi_ipc") as write:
+                read_hsk_hanzi_ipc(path)
+                write.assert_not_called()
+            os.utime(path, ns=(0, 0))
+            self.assertIsNone(
+                assert_frame_equal(read_hsk_hanzi_ipc(path), read_hsk_hanzi_ipc())
+            )
+            self.assertEqual(
+                os.stat(path).st_mtime_ns, os.stat(HSK30_PARQUET_PATH).st_mtime_ns
+            )
+
+    def test_loaded_once(self):
+        """Test HSKHanzi instances share one cached frame"""
+        self.assertIs(HSKHanzi().HSK_hanzi, load_hsk_hanzi())
+        self.assertIs(HSKHanzi("Simplified").HSK_hanzi, HSKHanzi().HSK_hanzi)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,161 @@
+import contextlib
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.xiwen.jobs import (
+    DONE,
+    EMPTY,
+    FAILED,
+    Checkpoint,
+    main,
+    read_manifest,
+    run_job,
+)
+from src.xiwen.utils.scheduler import FetchError
+from src.xiwen.utils.store import ResultStore, scan_documents
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+SIMPLIFIED_FILE = os.path.join(TEST_ASSETS, "bjzd.txt")
+TRADITIONAL_FILE = os.path.join(TEST_ASSETS, "ttc.txt")
+
+
+def quietly(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+class TestReadManifest(unittest.TestCase):
+    def test_skips_blanks_and_comments(self):
+        """Test blank and comment lines are ignored"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "manifest.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("# corpus\nhttps://example.com/a\n\n  b.html  \n")
+            self.assertEqual(
+                list(read_manifest(path)), ["https://example.com/a", "b.html"]
+            )
+
+
+class TestRunJob(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp.name, "job.sqlite")
+        self.empty_file = os.path.join(self.tmp.name, "empty.html")
+        with open(self.empty_file, "w", encoding="utf-8") as f:
+            f.write("<p>no hanzi here</p>")
+        self.items = [
+            SIMPLIFIED_FILE,
+            TRADITIONAL_FILE,
+            self.empty_file,
+            os.path.join(self.tmp.name, "missing.html"),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_results_recorded(self):
+        """Test every item is recorded with its status and result"""
+        progress = quietly(run_job, self.items, self.checkpoint_path)
+        self.assertEqual(progress, {DONE: 2, EMPTY: 1, FAILED: 1})
+        with Checkpoint(self.checkpoint_path) as checkpoint:
+            status, variant, stats_df, error = checkpoint.get_result(SIMPLIFIED_FILE)
+            self.assertEqual((status, variant, error), (DONE, "Simplified", None))
+            self.assertEqual(stats_df.height, 8)
+            self.assertEqual(checkpoint.get_result(TRADITIONAL_FILE)[1], "Traditional")
+            status, _, _, error = checkpoint.get_result(self.items[3])
+            self.assertEqual(status, FAILED)
+            self.assertIn("missing.html", error)
+            self.assertIsNone(checkpoint.get_result("not run"))
+
+    def test_resume_skips_completed(self):
+        """Test a restarted job only processes new items"""
+        quietly(run_job, self.items[:2], self.checkpoint_path)
+        with patch("src.xiwen.jobs.analyse_item", side_effect=OSError) as analyse:
+            progress = quietly(run_job, self.items, self.checkpoint_path)
+        self.assertEqual(analyse.call_count, 2)
+        self.assertEqual(progress, {DONE: 2, EMPTY: 0, FAILED: 2})
+
+    def test_retry_failed(self):
+        """Test failed items are only retried on request"""
+        url = "https://example.com/page"
+        with patch("src.xiwen.jobs.fetch_html", side_effect=FetchError(url, "timeout")):
+            quietly(run_job, [url], self.checkpoint_path)
+        with patch("src.xiwen.jobs.fetch_html", return_value="<p>中文</p>") as fetch:
+            quietly(run_job, [url], self.checkpoint_path)
+            fetch.assert_not_called()
+            progress = quietly(run_job, [url], self.checkpoint_path, retry_failed=True)
+        self.assertEqual(progress, {DONE: 1, EMPTY: 0, FAILED: 0})
+
+    def test_interrupted_job_keeps_committed_results(self):
+        """Test results recorded before a crash survive it"""
+        with patch(
+            "src.xiwen.jobs.analyse_path", side_effect=[None, KeyboardInterrupt]
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                quietly(run_job, self.items, self.checkpoint_path)
+        with Checkpoint(self.checkpoint_path) as checkpoint:
+            self.assertEqual(checkpoint.get_completed(), {SIMPLIFIED_FILE})
+
+    def test_unexpected_error(self):
+        """Test any error in analysis fails its item without ending the job"""
+        with patch(
+            "src.xiwen.jobs.analyse_path", side_effect=[ValueError("bad markup"), None]
+        ):
+            progress = quietly(run_job, self.items[:2], self.checkpoint_path)
+        self.assertEqual(progress, {DONE: 0, EMPTY: 1, FAILED: 1})
+        with Checkpoint(self.checkpoint_path) as checkpoint:
+            error = checkpoint.get_result(self.items[0])[3]
+        self.assertEqual(error, "ValueError: bad markup")
+
+    def test_store(self):
+        """Test results are saved to a store by the time they are checkpointed"""
+        store = ResultStore(os.path.join(self.tmp.name, "store"))
+        quietly(run_job, self.items, self.checkpoint_path, store=store)
+        documents = scan_documents(store.root).collect()
+        self.assertEqual(sorted(documents["url"]), sorted(self.items[:2]))
+        self.assertEqual(set(documents["domain"]), {"local"})
+
+    def test_compressed_files(self):
+        """Test files are streamed whatever the parser"""
+        compressed = os.path.join(self.tmp.name, "bjzd.txt.gz")
+        with open(SIMPLIFIED_FILE, "rb") as f, open(compressed, "wb") as out:
+            out.write(gzip.compress(f.read()))
+        with patch("src.xiwen.jobs.load_item") as load:
+            progress = quietly(
+                run_job, [compressed, self.empty_file], self.checkpoint_path
+            )
+            load.assert_not_called()
+        self.assertEqual(progress, {DONE: 1, EMPTY: 1, FAILED: 0})
+        with Checkpoint(self.checkpoint_path) as checkpoint:
+            self.assertEqual(checkpoint.get_result(compressed)[1], "Simplified")
+
+    def test_truncated_file(self):
+        """Test a truncated archive fails its item without ending the job"""
+        truncated = os.path.join(self.tmp.name, "page.html.gz")
+        with open(SIMPLIFIED_FILE, "rb") as f, open(truncated, "wb") as out:
+            out.write(gzip.compress(f.read())[:1000])
+        for parser in ("text", "html.parser"):
+            checkpoint_path = os.path.join(self.tmp.name, f"{parser}.sqlite")
+            progress = quietly(
+                run_job, [truncated, self.empty_file], checkpoint_path, parser
+            )
+            self.assertEqual(progress, {DONE: 0, EMPTY: 1, FAILED: 1})
+            with Checkpoint(checkpoint_path) as checkpoint:
+                self.assertIn("cannot decompress", checkpoint.get_result(truncated)[3])
+
+    def test_cli(self):
+        """Test the command line reads a manifest"""
+        manifest = os.path.join(self.tmp.name, "manifest.txt")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.items[:3]))
+        quietly(main, [manifest])
+        with Checkpoint(os.path.join(self.tmp.name, "manifest.sqlite")) as checkpoint:
+            self.assertEqual(checkpoint.get_progress(), {DONE: 2, EMPTY: 1, FAILED: 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
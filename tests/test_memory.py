@@ -0,0 +1,162 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from src.xiwen.app import analyse_html
+from src.xiwen.utils.memory import (
+    PROFILE_SCHEMA,
+    disable_memory_profiling,
+    enable_memory_profiling,
+    get_memory_profile,
+    get_rss,
+    measure_memory,
+    reset_memory_profile,
+)
+from src.xiwen.utils.tracing import configure_tracing, disable_tracing
+
+ASSETS_DIR = os.path.abspath(os.path.join("tests", "assets"))
+
+
+class MemoryTestCase(unittest.TestCase):
+    def setUp(self):
+        reset_memory_profile()
+        enable_memory_profiling()
+
+    def tearDown(self):
+        disable_memory_profiling()
+        reset_memory_profile()
+
+    def profile(self):
+        return {row["stage"]: row for row in get_memory_profile().rows(named=True)}
+
+
+class TestMeasureMemory(MemoryTestCase):
+    def test_disabled(self):
+        """Test nothing is recorded, and tracemalloc stops, when disabled"""
+        disable_memory_profiling()
+        self.assertFalse(tracemalloc.is_tracing())
+        with measure_memory("stage"):
+            pass
+        self.assertTrue(get_memory_profile().is_empty())
+        self.assertEqual(get_memory_profile().schema, PROFILE_SCHEMA)
+
+    def test_peak_and_net(self):
+        """Test freed allocations count towards peak but not net"""
+        with measure_memory("stage"):
+            kept = bytearray(2_000_000)
+            freed = bytearray(4_000_000)
+            del freed
+        row = self.profile()["stage"]
+        self.assertEqual(row["calls"], 1)
+        self.assertGreaterEqual(row["peak_bytes"], 6_000_000)
+        self.assertGreaterEqual(row["net_bytes"], 2_000_000)
+        self.assertLess(row["net_bytes"], 3_000_000)
+        self.assertGreater(row["seconds"], 0)
+        del kept
+
+    def test_nested(self):
+        """Test an enclosing stage's peak includes its nested stage's"""
+        with measure_memory("outer"):
+            with measure_memory("inner"):
+                freed = bytearray(4_000_000)
+                del freed
+            kept = bytearray(1_000_000)
+        profile = self.profile()
+        self.assertGreaterEqual(profile["inner"]["peak_bytes"], 4_000_000)
+        self.assertGreaterEqual(
+            profile["outer"]["peak_bytes"], profile["inner"]["peak_bytes"]
+        )
+        self.assertLess(profile["outer"]["net_bytes"], 2_000_000)
+        del kept
+
+    def test_threads(self):
+        """Test stages open in several threads each end their own"""
+        entered, exited = threading.Event(), threading.Event()
+
+        def first():
+            with measure_memory("first"):
+                time.sleep(0.2)
+                entered.wait()
+            exited.set()
+
+        def second():
+            time.sleep(0.1)
+            with measure_memory("second"):
+                entered.set()
+                exited.wait()
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        profile = self.profile()
+        self.assertGreaterEqual(profile["first"]["seconds"], 0.2)
+        self.assertLess(profile["second"]["seconds"], 0.2)
+
+    def test_calls(self):
+        """Test repeated stages accumulate calls and net bytes"""
+        kept = []
+        for _ in range(3):
+            with measure_memory("stage"):
+                kept.append(bytearray(1_000_000))
+        row = self.profile()["stage"]
+        self.assertEqual(row["calls"], 3)
+        self.assertGreaterEqual(row["net_bytes"], 3_000_000)
+        self.assertLess(row["peak_bytes"], 2_000_000)
+
+    @unittest.skipIf(get_rss() is None, "RSS not readable on this platform")
+    def test_rss(self):
+        """Test RSS is sampled"""
+        self.assertGreater(get_rss(), 0)
+        with measure_memory("stage"):
+            block = bytearray(32_000_000)
+            block[::4096] = b"x" * len(block[::4096])  # Touch every page
+        self.assertGreater(self.profile()["stage"]["rss_peak_bytes"], 16_000_000)
+        del block
+
+
+class TestPipelineStages(MemoryTestCase):
+    def test_analyse_html(self):
+        """Test every stage of analyse_html is profiled"""
+        with open(os.path.join(ASSETS_DIR, "bjzd.txt"), encoding="utf-8") as f:
+            markup = f"<p>{f.read()}</p>"
+        analyse_html(markup, "html.parser")
+        profile = self.profile()
+        for stage in (
+            "parse.soup",
+            "parse.serialise",
+            "parse",
+            "extract",
+            "partition",
+            "analyse",
+            "analyse_html",
+        ):
+            self.assertEqual(profile[stage]["calls"], 1)
+        self.assertGreaterEqual(
+            profile["analyse_html"]["peak_bytes"], profile["extract"]["peak_bytes"]
+        )
+
+    def test_span_attributes(self):
+        """Test memory figures are set on trace spans"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            configure_tracing(path, sample_rate=1.0)
+            try:
+                analyse_html("<p>中文</p>", "text")
+            finally:
+                disable_tracing()
+            with open(path, encoding="utf-8") as f:
+                (line,) = f.read().splitlines()
+        spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        for otlp_span in spans:
+            keys = {a["key"] for a in otlp_span["attributes"]}
+            self.assertIn("memory.peak_bytes", keys)
+            self.assertIn("memory.rss_net_bytes", keys)
+
+
+if __name__ == "__main__":
+    unittest.main()
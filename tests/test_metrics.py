@@ -0,0 +1,207 @@
+import asyncio
+import multiprocessing
+import os
+import requests
+import unittest
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from src.xiwen.app import analyse_html
+from src.xiwen.corpus import map_documents
+from src.xiwen.utils.cache import cached
+from src.xiwen.utils.metrics import (
+    disable_metrics,
+    enable_metrics,
+    inc,
+    merge_metrics,
+    observe,
+    render_metrics,
+    reset_metrics,
+    serve_metrics,
+    take_metrics,
+    timed,
+)
+from src.xiwen.utils.scheduler import FetchError, FetchScheduler
+from tests.helpers import FakeResponse
+from tests.test_app import PAGES, collect
+
+ASSETS_DIR = os.path.abspath(os.path.join("tests", "assets"))
+URL = "https://example.com/page"
+
+
+def count_hanzi(n: int) -> int:
+    inc("xiwen_hanzi_total", n)
+    return n
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        reset_metrics()
+        enable_metrics()
+
+    def tearDown(self):
+        disable_metrics()
+        reset_metrics()
+
+
+class TestRegistry(MetricsTestCase):
+    def test_disabled(self):
+        """Test nothing is recorded while metrics are disabled"""
+        disable_metrics()
+        inc("xiwen_hanzi_total", 5)
+        observe("xiwen_fetch_seconds", 0.1)
+        with timed("xiwen_stage_seconds", stage="parse"):
+            pass
+        self.assertNotIn("xiwen_hanzi_total 5", render_metrics())
+        self.assertNotIn("xiwen_fetch_seconds_count", render_metrics())
+
+    def test_counter(self):
+        """Test counters sum per label set"""
+        inc("xiwen_fetch_retries_total", reason="timeout")
+        inc("xiwen_fetch_retries_total", 2, reason="timeout")
+        inc("xiwen_fetch_retries_total", reason="http_status")
+        text = render_metrics()
+        self.assertIn("# TYPE xiwen_fetch_retries_total counter", text)
+        self.assertIn('xiwen_fetch_retries_total{reason="timeout"} 3', text)
+        self.assertIn('xiwen_fetch_retries_total{reason="http_status"} 1', text)
+
+    def test_histogram(self):
+        """Test histogram buckets are cumulative with sum and count"""
+        observe("xiwen_fetch_seconds", 0.003)
+        observe("xiwen_fetch_seconds", 0.2)
+        observe("xiwen_fetch_seconds", 60)
+        text = render_metrics()
+        self.assertIn("# TYPE xiwen_fetch_seconds histogram", text)
+        self.assertIn('xiwen_fetch_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('xiwen_fetch_seconds_bucket{le="0.25"} 2', text)
+        self.assertIn('xiwen_fetch_seconds_bucket{le="30"} 2', text)
+        self.assertIn('xiwen_fetch_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("xiwen_fetch_seconds_count 3", text)
+        self.assertIn("xiwen_fetch_seconds_sum 60.203", text)
+
+    def test_timed(self):
+        """Test timed records the block's duration"""
+        with timed("xiwen_stage_seconds", stage="parse"):
+            pass
+        self.assertIn('xiwen_stage_seconds_count{stage="parse"} 1', render_metrics())
+
+    def test_label_escaping(self):
+        """Test quotes and backslashes in label values are escaped"""
+        inc("xiwen_exports_total", format='a"b\\c')
+        self.assertIn('xiwen_exports_total{format="a\\"b\\\\c"} 1', render_metrics())
+
+    def test_serve(self):
+        """Test the HTTP endpoint serves the metrics text"""
+        inc("xiwen_hanzi_total", 7)
+        server = serve_metrics(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                text = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn("xiwen_hanzi_total 7", text)
+
+
+class TestInstrumentation(MetricsTestCase):
+    def test_analyse_html(self):
+        """Test documents, hanzi and stage durations are recorded"""
+        with open(os.path.join(ASSETS_DIR, "bjzd.txt"), encoding="utf-8") as f:
+            markup = f"<p>{f.read()}</p>"
+        hanzi_list = analyse_html(markup)[2]
+        analyse_html("<p>no hanzi</p>")
+        text = render_metrics()
+        self.assertIn('xiwen_documents_total{result="analysed"} 1', text)
+        self.assertIn('xiwen_documents_total{result="empty"} 1', text)
+        self.assertIn(f"xiwen_hanzi_total {len(hanzi_list)}", text)
+        # The document without hanzi stops after extraction
+        for stage, count in (("parse", 2), ("extract", 2), ("partition", 1)):
+            self.assertIn(f'xiwen_stage_seconds_count{{stage="{stage}"}} {count}', text)
+        self.assertIn('xiwen_stage_seconds_count{stage="analyse"} 1', text)
+
+    def test_fetch(self):
+        """Test requests, retries, bytes and errors are recorded"""
+        outcomes = [FakeResponse(503), FakeResponse(200)]
+        scheduler = FetchScheduler(
+            rate=1000, burst=1000, backoff_base=0.001, send=lambda url: outcomes.pop(0)
+        )
+        scheduler.fetch(URL)
+
+        def timeout(url):
+            raise requests.Timeout("timed out")
+
+        scheduler = FetchScheduler(
+            rate=1000, burst=1000, backoff_base=0.001, max_retries=1, send=timeout
+        )
+        with self.assertRaises(FetchError):
+            scheduler.fetch(URL)
+
+        text = render_metrics()
+        self.assertIn('xiwen_fetch_requests_total{outcome="ok"} 1', text)
+        self.assertIn('xiwen_fetch_requests_total{outcome="error"} 2', text)
+        self.assertIn('xiwen_fetch_retries_total{reason="http_status"} 1', text)
+        self.assertIn('xiwen_fetch_errors_total{reason="timeout"} 1', text)
+        self.assertIn(f"xiwen_fetch_bytes_total {len('<p>中文</p>'.encode())}", text)
+        self.assertIn("xiwen_fetch_seconds_count 3", text)
+
+    def test_process_pool(self):
+        """Test metrics recorded in pipeline worker processes are merged"""
+        urls = [url for url, markup in PAGES.items() if markup is not None]
+        results = asyncio.run(collect(urls, fetch_workers=2))
+        text = render_metrics()
+        self.assertIn('xiwen_documents_total{result="analysed"} 2', text)
+        self.assertIn('xiwen_documents_total{result="empty"} 1', text)
+        hanzi = sum(len(r[2]) for r in results.values() if r is not None)
+        self.assertIn(f"xiwen_hanzi_total {hanzi}", text)
+        self.assertIn('xiwen_stage_seconds_count{stage="parse"} 3', text)
+        self.assertIn('xiwen_stage_seconds_count{stage="analyse"} 2', text)
+
+    @unittest.skipUnless(
+        "fork" in multiprocessing.get_all_start_methods(), "fork not available"
+    )
+    def test_fork_pool(self):
+        """Test forked workers do not send back values inherited from the parent"""
+        inc("xiwen_fetch_bytes_total", 1000)
+        pool = ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("fork"))
+        with pool:
+            documents = [("a", 1), ("b", 2)]
+            results = list(map_documents(count_hanzi, documents, pool))
+        self.assertEqual(results, [("a", 1), ("b", 2)])
+        text = render_metrics()
+        self.assertIn("xiwen_fetch_bytes_total 1000", text)
+        self.assertIn("xiwen_hanzi_total 3", text)
+
+    def test_merge(self):
+        """Test merged counters and histograms add up"""
+        inc("xiwen_hanzi_total", 5)
+        observe("xiwen_fetch_seconds", 0.1)
+        values = take_metrics()
+        self.assertNotIn("xiwen_hanzi_total 5", render_metrics())
+        merge_metrics(values)
+        merge_metrics(values)
+        text = render_metrics()
+        self.assertIn("xiwen_hanzi_total 10", text)
+        self.assertIn("xiwen_fetch_seconds_count 2", text)
+        self.assertIn('xiwen_fetch_seconds_bucket{le="0.1"} 2', text)
+
+    def test_cache(self):
+        """Test cache hits and misses are recorded per function"""
+
+        @cached
+        def square(x):
+            return x * x
+
+        square(2)
+        square(2)
+        name = f"{square.__module__}.{square.__qualname__}"
+        text = render_metrics()
+        self.assertIn(
+            f'xiwen_cache_requests_total{{function="{name}",result="miss"}} 1', text
+        )
+        self.assertIn(
+            f'xiwen_cache_requests_total{{function="{name}",result="hit"}} 1', text
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
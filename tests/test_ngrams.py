@@ -0,0 +1,92 @@
+import os
+import polars as pl
+import unittest
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.extract import iter_hanzi_runs
+from src.xiwen.utils.ngrams import (
+    NGramCounter,
+    count_ngrams,
+    get_ngrams_df,
+    iter_ngrams,
+)
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+
+class TestIterNGrams(unittest.TestCase):
+    def test_window(self):
+        """Test window slides one character at a time"""
+        self.assertEqual(list(iter_ngrams("今天天氣", 2)), ["今天", "天天", "天氣"])
+        self.assertEqual(list(iter_ngrams("今天天氣", 3)), ["今天天", "天天氣"])
+
+    def test_short_runs(self):
+        """Test runs shorter than n yield nothing"""
+        self.assertEqual(list(iter_ngrams("今", 2)), [])
+        self.assertEqual(list(iter_ngrams("", 2)), [])
+
+    def test_text_boundaries(self):
+        """Test n-grams do not span punctuation or markup"""
+        runs = list(iter_hanzi_runs("<p>今天</p>天氣，很好。OK好"))
+        self.assertEqual(runs, ["今天", "天氣", "很好", "好"])
+        counter = count_ngrams(runs, 2)
+        self.assertEqual(counter.counts, {"今天": 1, "天氣": 1, "很好": 1})
+        self.assertEqual(counter.total, 3)
+
+
+class TestNGramCounter(unittest.TestCase):
+    def test_invalid_arguments(self):
+        """Test invalid n and table sizes are rejected"""
+        with self.assertRaises(ValueError):
+            NGramCounter(0)
+        with self.assertRaises(ValueError):
+            NGramCounter(2, max_entries=1)
+
+    def test_most_common(self):
+        """Test ranking by count then codepoint"""
+        counter = count_ngrams(["天天天", "今天"], 2)
+        self.assertEqual(counter.most_common(), [("天天", 2), ("今天", 1)])
+        self.assertEqual(counter.most_common(1), [("天天", 2)])
+
+    def test_pruning_bounds(self):
+        """Test pruned tables stay bounded and within the reported error"""
+        with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+            runs = list(iter_hanzi_runs(f.read()))
+        exact = count_ngrams(runs, 2)
+        pruned = count_ngrams(runs, 2, max_entries=500)
+
+        self.assertLessEqual(len(pruned.counts), 500)
+        self.assertEqual(pruned.total, exact.total)
+        self.assertGreater(pruned.max_undercount, 0)
+        for ngram, count in pruned.counts.items():
+            self.assertLessEqual(count, exact.counts[ngram])
+            self.assertGreaterEqual(count, exact.counts[ngram] - pruned.max_undercount)
+        self.assertEqual(pruned.most_common(1), exact.most_common(1))
+
+    def test_pruning_within_run(self):
+        """Test one long run cannot grow the table beyond max_entries"""
+        run = "".join(chr(0x4E00 + i) for i in range(2000))
+        counter = count_ngrams([run], 2, max_entries=10)
+        self.assertLessEqual(len(counter.counts), 10)
+        self.assertEqual(counter.total, 1999)
+
+
+class TestGetNGramsDF(unittest.TestCase):
+    def test_grades(self):
+        """Test n-grams take the highest grade of their hanzi"""
+        counter = count_ngrams(["爱好", "爱朕", "爱好"], 2)
+        ngrams_df = get_ngrams_df(counter, "Simplified")
+        self.assertEqual(ngrams_df["N-gram"].to_list(), ["爱好", "爱朕"])
+        self.assertEqual(ngrams_df["Count"].to_list(), [2, 1])
+        self.assertEqual(ngrams_df["HSK Grade"].to_list(), [1, 10])
+        self.assertEqual(ngrams_df.schema["Count"], pl.Int32)
+
+    def test_top_k(self):
+        """Test only the top_k n-grams are returned"""
+        counter = count_ngrams(["愛好愛好", "今天"], 2)
+        ngrams_df = get_ngrams_df(counter, "Traditional", top_k=2)
+        self.assertEqual(ngrams_df["N-gram"].to_list(), ["愛好", "今天"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import unittest
+import warnings
+from unittest import mock
+from src.xiwen.utils import parse
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.parse import get_parser, iter_text_nodes, parse_html
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>北京折疊</title>
+<script type="text/javascript">var t = "&#20013;文" < 1;</script>
+<style>p::after { content: "樣式" }</style></head>
+<body><!-- 注釋 --><p title="屬&#24615;" data-x='單引號'>中&#25991;&nbsp;<b>字</b></p>
+<img alt="圖片"/>&#x6F22;&#23383; &amp; 1 < 2 未完
+"""
+
+
+class TestIterTextNodes(unittest.TestCase):
+    def test_text_nodes(self):
+        """Test text, attributes, comments and raw text are all yielded"""
+        text = "".join(iter_text_nodes(HTML))
+        for expected in ["北京折疊", '"&#20013;文" < 1', "樣式", "注釋", "屬性"]:
+            self.assertIn(expected, text)
+        for expected in ["單引號", "中文\xa0", "字", "圖片", "漢字 & 1 < 2 未完"]:
+            self.assertIn(expected, text)
+
+    def test_empty(self):
+        """Test empty input yields nothing"""
+        self.assertEqual(list(iter_text_nodes("")), [])
+
+
+class TestParseHTML(unittest.TestCase):
+    def test_backends_extract_same_hanzi(self):
+        """Test every available backend extracts the same hanzi as html.parser"""
+        # html.parser may reorder attributes so only the hanzi counts must match
+        documents = [HTML, "", "no hanzi here"]
+        for test_case in ["bjzd.txt", "ttc.txt", "mix50.txt"]:
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                documents.append(f"<html><body><p>{f.read()}</p></body></html>")
+
+        backends = ["text"] + (["lxml"] if parse.lxml is not None else [])
+        for document in documents:
+            expected = sorted(
+                filter_hanzi_from_html(parse_html(document, "html.parser"))
+            )
+            for backend in backends:
+                self.assertEqual(
+                    sorted(filter_hanzi_from_html(parse_html(document, backend))),
+                    expected,
+                )
+
+    def test_unknown_backend(self):
+        """Test unknown backend names are rejected"""
+        with self.assertRaises(ValueError):
+            get_parser("html5lib")
+
+    def test_lxml_fallback(self):
+        """Test lxml falls back to html.parser when not installed"""
+        with mock.patch.object(parse, "lxml", None):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                parser = get_parser("lxml")
+        self.assertIs(parser, parse.parse_with_html_parser)
+        self.assertEqual(len(caught), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import polars as pl
+from datetime import datetime, timezone
+from src.xiwen.app import analyse_html
+from src.xiwen.query import (
+    collect,
+    coverage_distribution,
+    document_scores,
+    documents_by_coverage,
+    main,
+    top_outliers,
+)
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.store import ResultStore
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+    _, SIMPLIFIED_STATS, SIMPLIFIED_HANZI, _, _ = analyse_html(f.read())
+with open(os.path.join(TEST_ASSETS, "ttc.txt"), "r", encoding=ENCODING) as f:
+    _, TRADITIONAL_STATS, TRADITIONAL_HANZI, _, _ = analyse_html(f.read())
+
+
+def coverage(stats_df, max_grade):
+    """Reference coverage from the cumulative stats column"""
+    row = stats_df.filter(pl.col("HSK\nGrade") == max_grade)
+    return row["% of\nCumul.\nCount"].item() / 100
+
+
+class TestQueries(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.root = cls.tmp.name
+        with ResultStore(cls.root) as store:
+            for i, day in enumerate([1, 2]):
+                timestamp = datetime(2024, 5, day, tzinfo=timezone.utc)
+                store.add(
+                    f"https://a.com/{i}",
+                    SIMPLIFIED_HANZI,
+                    SIMPLIFIED_STATS,
+                    "Simplified",
+                    timestamp,
+                )
+                store.add(
+                    f"https://b.org/{i}",
+                    TRADITIONAL_HANZI,
+                    TRADITIONAL_STATS,
+                    "Traditional",
+                    timestamp,
+                )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_documents_by_coverage(self):
+        """Test documents are selected by share of hanzi up to a grade"""
+        simplified = coverage(SIMPLIFIED_STATS, 4)
+        traditional = coverage(TRADITIONAL_STATS, 4)
+        threshold = (simplified + traditional) / 2
+        df = collect(documents_by_coverage(self.root, 4, threshold))
+        self.assertEqual(df["url"].to_list(), ["https://a.com/0", "https://a.com/1"])
+        self.assertAlmostEqual(df["coverage"][0], simplified, places=4)
+        df = collect(documents_by_coverage(self.root, 4, 0.0))
+        self.assertEqual(df.height, 4)
+
+    def test_invalid_max_grade(self):
+        """Test grades outside HSK 1 to 7 are rejected"""
+        for max_grade in (0, 8):
+            with self.assertRaises(ValueError):
+                documents_by_coverage(self.root, max_grade)
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main([self.root, "coverage", "--max-grade", "9"])
+
+    def test_partition_filters(self):
+        """Test date and domain filters"""
+        df = collect(documents_by_coverage(self.root, 4, 0.0, date_from="2024-05-02"))
+        self.assertEqual(set(df["date"]), {"2024-05-02"})
+        df = collect(documents_by_coverage(self.root, 4, 0.0, domains=["b.org"]))
+        self.assertEqual(set(df["domain"]), {"b.org"})
+        df = collect(documents_by_coverage(self.root, 4, 0.0, date_to="2024-04-30"))
+        self.assertEqual(df.height, 0)
+
+    def test_top_outliers(self):
+        """Test outliers are ranked within each domain"""
+        df = collect(top_outliers(self.root, top_k=3))
+        self.assertEqual(df.height, 6)
+        a_com = df.filter(pl.col("domain") == "a.com")
+        self.assertEqual(a_com["count"].to_list(), sorted(a_com["count"], reverse=True))
+        self.assertEqual(set(a_com["documents"]), {2})
+        beyond = SIMPLIFIED_STATS.filter(pl.col("HSK\nGrade") == 10)
+        self.assertLessEqual(
+            a_com["count"].sum(), 2 * beyond["No. Hanzi\n(Count)"].item()
+        )
+
+    def test_coverage_distribution(self):
+        """Test coverage quantiles per grade"""
+        df = collect(coverage_distribution(self.root, quantiles=[0.5]))
+        self.assertEqual(df["grade"].to_list(), list(range(1, 8)))
+        self.assertEqual(set(df["documents"]), {4})
+        self.assertTrue(df["mean"].is_sorted())
+        grade4 = df.filter(pl.col("grade") == 4)
+        expected = (coverage(SIMPLIFIED_STATS, 4) + coverage(TRADITIONAL_STATS, 4)) / 2
+        self.assertAlmostEqual(grade4["mean"].item(), expected, places=4)
+
+    def test_document_scores(self):
+        """Test scores are computed per stored document"""
+        df = collect(document_scores(self.root))
+        self.assertEqual(df.height, 4)
+        simplified = df.filter(pl.col("url") == "https://a.com/0")
+        self.assertAlmostEqual(
+            simplified["coverage_hsk4"].item(), coverage(SIMPLIFIED_STATS, 4), places=4
+        )
+        self.assertEqual(set(df["domain"]), {"a.com", "b.org"})
+
+    def test_empty_store(self):
+        """Test queries on an empty store return no rows"""
+        with tempfile.TemporaryDirectory() as root:
+            self.assertEqual(collect(documents_by_coverage(root)).height, 0)
+            self.assertEqual(collect(top_outliers(root)).height, 0)
+
+    def test_cli(self):
+        """Test the command line writes query results"""
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "outliers.csv")
+            main([self.root, "--domain", "b.org", "--output", output, "outliers"])
+            df = pl.read_csv(output)
+            self.assertEqual(set(df["domain"]), {"b.org"})
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            main([self.root, "distribution"])
+        self.assertIn("p50", stdout.getvalue())
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            main([self.root, "scores", "--sort", "min_grade_95", "--limit", "1"])
+        self.assertIn("a.com", stdout.getvalue())
+        self.assertNotIn("b.org", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import asyncio
+import requests
+import time
+import unittest
+from email.utils import formatdate
+from unittest.mock import patch
+from src.xiwen.utils.scheduler import (
+    CircuitBreaker,
+    FetchError,
+    FetchScheduler,
+    TokenBucket,
+    parse_retry_after,
+)
+from tests.helpers import FakeResponse
+
+
+URL = "https://example.com/page"
+
+
+class FakeSend:
+    """Returns queued outcomes (responses, or exceptions to raise) in order"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, url):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else FakeResponse()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_scheduler(send, **kwargs):
+    kwargs = {"rate": 1000, "burst": 1000, "backoff_base": 0.001, **kwargs}
+    return FetchScheduler(send=send, **kwargs)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        """Test a full bucket allows a burst, then spaces requests by rate"""
+        bucket = TokenBucket(rate=2, capacity=3)
+        now = bucket.updated
+        self.assertEqual([bucket.reserve(now) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(now), 0.5)
+        self.assertAlmostEqual(bucket.reserve(now), 1.0)
+        # Tokens refill over time
+        self.assertAlmostEqual(bucket.reserve(now + 2.0), 0.0)
+
+    def test_pause(self):
+        """Test a pause holds back reservations"""
+        bucket = TokenBucket(rate=10, capacity=10)
+        now = bucket.updated
+        bucket.pause(5, now)
+        self.assertAlmostEqual(bucket.reserve(now), 5.0)
+        self.assertAlmostEqual(bucket.reserve(now + 5), 0.0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_and_recovers(self):
+        """Test the circuit opens at the threshold and allows one trial"""
+        breaker = CircuitBreaker(threshold=2, cooldown=10)
+        breaker.record_failure(now=0)
+        self.assertTrue(breaker.allow(now=0))
+        breaker.record_failure(now=0)
+        self.assertFalse(breaker.allow(now=5))
+        self.assertTrue(breaker.allow(now=10))
+        self.assertFalse(breaker.allow(now=10))
+        breaker.record_success()
+        self.assertTrue(breaker.allow(now=10))
+
+    def test_failed_trial_reopens(self):
+        """Test a failed trial request reopens the circuit"""
+        breaker = CircuitBreaker(threshold=1, cooldown=10)
+        breaker.record_failure(now=0)
+        self.assertTrue(breaker.allow(now=10))
+        breaker.record_failure(now=10)
+        self.assertFalse(breaker.allow(now=15))
+
+    def test_trial_without_verdict(self):
+        """Test a trial that ends without a verdict frees the trial slot"""
+        breaker = CircuitBreaker(threshold=1, cooldown=10)
+        breaker.record_failure(now=0)
+        self.assertTrue(breaker.allow(now=10))
+        breaker.end_trial()
+        self.assertTrue(breaker.allow(now=10))
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_formats(self):
+        """Test seconds and HTTP dates are parsed"""
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        delay = parse_retry_after(formatdate(time.time() + 30, usegmt=True))
+        self.assertTrue(28 <= delay <= 30)
+        self.assertEqual(parse_retry_after(formatdate(0, usegmt=True)), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestFetchScheduler(unittest.TestCase):
+    def test_success(self):
+        """Test HTML is decoded from the response"""
+        self.assertEqual(make_scheduler(FakeSend()).fetch(URL), "<p>中文</p>")
+
+    def test_invalid_url(self):
+        """Test invalid URLs fail without a request"""
+        send = FakeSend()
+        for url in ["", "Test with invalid URL input", "ftp://example.com"]:
+            with self.assertRaises(FetchError) as cm:
+                make_scheduler(send).fetch(url)
+            self.assertEqual(cm.exception.reason, "invalid_url")
+        self.assertEqual(send.calls, 0)
+
+    def test_retries_transient_errors(self):
+        """Test timeouts and 5xx responses are retried"""
+        send = FakeSend(requests.Timeout(), FakeResponse(503))
+        self.assertEqual(make_scheduler(send).fetch(URL), "<p>中文</p>")
+        self.assertEqual(send.calls, 3)
+
+    def test_no_retry_for_client_errors(self):
+        """Test 404s fail at once, with the status"""
+        send = FakeSend(FakeResponse(404))
+        with self.assertRaises(FetchError) as cm:
+            make_scheduler(send).fetch(URL)
+        self.assertEqual(
+            (cm.exception.reason, cm.exception.status), ("http_status", 404)
+        )
+        self.assertEqual(send.calls, 1)
+
+    def test_no_sleep_after_final_failure(self):
+        """Test the last failed attempt raises without backing off"""
+        send = FakeSend(*[requests.ConnectionError()] * 3)
+        with patch("src.xiwen.utils.scheduler.time.sleep") as sleep:
+            with self.assertRaises(FetchError) as cm:
+                make_scheduler(send, backoff_base=100).fetch(URL)
+        self.assertEqual(cm.exception.reason, "connection")
+        self.assertEqual(cm.exception.attempts, 3)
+        backoffs = [c.args[0] for c in sleep.call_args_list if c.args[0] > 0]
+        self.assertEqual(len(backoffs), 2)
+
+    def test_retry_after(self):
+        """Test Retry-After sets the minimum wait before retrying"""
+        send = FakeSend(FakeResponse(429, headers={"Retry-After": "7"}))
+        with patch("src.xiwen.utils.scheduler.time.sleep") as sleep:
+            make_scheduler(send).fetch(URL)
+        self.assertGreaterEqual(max(c.args[0] for c in sleep.call_args_list), 7)
+
+    def test_retry_after_too_long(self):
+        """Test Retry-After beyond the limit fails instead of waiting"""
+        send = FakeSend(FakeResponse(429, headers={"Retry-After": "3600"}))
+        with self.assertRaises(FetchError) as cm:
+            make_scheduler(send).fetch(URL)
+        self.assertEqual(cm.exception.reason, "rate_limited")
+        self.assertEqual(send.calls, 1)
+
+    def test_circuit_breaker(self):
+        """Test repeated host failures fail fast for later URLs"""
+        send = FakeSend(*[FakeResponse(500)] * 3)
+        scheduler = make_scheduler(send, breaker_threshold=3)
+        with self.assertRaises(FetchError):
+            scheduler.fetch(URL)
+        with self.assertRaises(FetchError) as cm:
+            scheduler.fetch("https://example.com/other")
+        self.assertEqual(cm.exception.reason, "circuit_open")
+        self.assertEqual(send.calls, 3)
+        # Other hosts are unaffected
+        self.assertEqual(scheduler.fetch("https://example.org/"), "<p>中文</p>")
+
+    def test_circuit_recovers_after_trial(self):
+        """Test trials ending in a client error or an exception do not
+        leave the circuit open for good"""
+        send = FakeSend(FakeResponse(500), FakeResponse(500), FakeResponse(404))
+        scheduler = make_scheduler(send, breaker_threshold=2, breaker_cooldown=0)
+        with self.assertRaises(FetchError) as cm:
+            scheduler.fetch(URL)
+        self.assertEqual(cm.exception.status, 404)
+        self.assertEqual(scheduler.fetch(URL), "<p>中文</p>")
+
+        send = FakeSend(FakeResponse(500), FakeResponse(500), RuntimeError())
+        scheduler = make_scheduler(send, breaker_threshold=2, breaker_cooldown=0)
+        with self.assertRaises(RuntimeError):
+            scheduler.fetch(URL)
+        self.assertEqual(scheduler.fetch(URL), "<p>中文</p>")
+
+    def test_cancelled_trial(self):
+        """Test a cancelled async trial frees the trial slot"""
+        scheduler = make_scheduler(FakeSend(), breaker_threshold=1, breaker_cooldown=0)
+        scheduler._get_host(URL)
+        scheduler._reserve(URL, "example.com", 0)
+        scheduler.breakers["example.com"].record_failure(now=0)
+
+        async def cancel():
+            task = asyncio.create_task(scheduler.afetch(URL))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with patch.object(scheduler.buckets["example.com"], "reserve", return_value=1):
+            asyncio.run(cancel())
+        self.assertFalse(scheduler.breakers["example.com"].trial)
+
+    def test_afetch(self):
+        """Test the async fetch retries without blocking the loop"""
+        send = FakeSend(requests.Timeout(), FakeResponse(502))
+        scheduler = make_scheduler(send)
+        with patch("src.xiwen.utils.scheduler.time.sleep") as sleep:
+            markup = asyncio.run(scheduler.afetch(URL))
+        self.assertEqual(markup, "<p>中文</p>")
+        self.assertEqual(send.calls, 3)
+        sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import math
+import os
+import unittest
+import polars as pl
+from src.xiwen.app import analyse_html
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.score import (
+    get_reference_scores,
+    score_documents,
+    score_hanzi_lists,
+)
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+    _, SIMPLIFIED_STATS, SIMPLIFIED_HANZI, _, SIMPLIFIED_VARIANT = analyse_html(
+        f.read()
+    )
+with open(os.path.join(TEST_ASSETS, "ttc.txt"), "r", encoding=ENCODING) as f:
+    _, TRADITIONAL_STATS, TRADITIONAL_HANZI, _, TRADITIONAL_VARIANT = analyse_html(
+        f.read()
+    )
+
+
+def cumulative_shares(stats_df):
+    return dict(
+        stats_df.select("HSK\nGrade", pl.col("% of\nCumul.\nCount") / 100).rows()
+    )
+
+
+class TestScoreHanziLists(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.scores = score_hanzi_lists(
+            {"s": SIMPLIFIED_HANZI, "t": TRADITIONAL_HANZI},
+            {"s": SIMPLIFIED_VARIANT, "t": TRADITIONAL_VARIANT},
+        )
+
+    def test_coverage_matches_stats(self):
+        """Test coverage agrees with the cumulative stats columns"""
+        for doc_id, stats_df in [("s", SIMPLIFIED_STATS), ("t", TRADITIONAL_STATS)]:
+            row = self.scores.filter(pl.col("id") == doc_id).row(0, named=True)
+            shares = cumulative_shares(stats_df)
+            for grade in range(1, 8):
+                self.assertAlmostEqual(
+                    row[f"coverage_hsk{grade}"], shares[grade], places=4
+                )
+            self.assertAlmostEqual(row["unknown_share"], 1 - shares[7], places=4)
+
+    def test_min_grades(self):
+        """Test the minimum grade is the first to reach each threshold"""
+        for doc_id, stats_df in [("s", SIMPLIFIED_STATS), ("t", TRADITIONAL_STATS)]:
+            row = self.scores.filter(pl.col("id") == doc_id).row(0, named=True)
+            shares = cumulative_shares(stats_df)
+            for threshold in [90, 95, 98]:
+                expected = next(
+                    (g for g in range(1, 8) if shares[g] >= threshold / 100), 10
+                )
+                self.assertEqual(row[f"min_grade_{threshold}"], expected)
+
+    def test_difficulty(self):
+        """Test difficulty is the count-weighted mean JD Percentile"""
+        reference = dict(get_reference_scores().select("hanzi", "JD Percentile").rows())
+        scores = score_hanzi_lists({"doc": ["爱", "爱", "八", "㐀"]})
+        expected = (2 * reference["爱"] + reference["八"] + 100) / 4
+        self.assertAlmostEqual(scores["difficulty"].item(), expected)
+        self.assertAlmostEqual(scores["unknown_share"].item(), 0.25)
+        self.assertEqual(scores["min_grade_90"].item(), 10)
+        self.assertTrue(0 < self.scores["difficulty"].min() < 100)
+
+    def test_log_frequency(self):
+        """Test texts of commoner hanzi score higher mean log frequency"""
+        reference = get_reference_scores()
+        common = reference.sort("JD Percentile").head(10)["hanzi"].to_list()
+        rare = reference.sort("JD Percentile").tail(10)["hanzi"].to_list()
+        scores = score_hanzi_lists({"common": common, "rare": rare})
+        common_row, rare_row = scores.rows(named=True)
+        self.assertGreater(
+            common_row["mean_log_frequency"], rare_row["mean_log_frequency"]
+        )
+        self.assertLess(common_row["difficulty"], rare_row["difficulty"])
+        self.assertTrue(math.isfinite(rare_row["mean_log_frequency"]))
+
+
+class TestScoreDocuments(unittest.TestCase):
+    def test_grade_column_used(self):
+        """Test stored grades take precedence over the reference table"""
+        counts = pl.DataFrame(
+            {
+                "url": ["a", "a"],
+                "hanzi": ["爱", "八"],
+                "count": [3, 1],
+                "grade": [1, 10],
+            }
+        )
+        scores = score_documents(counts).collect()
+        self.assertAlmostEqual(scores["unknown_share"].item(), 0.25)
+        self.assertEqual(scores["min_grade_90"].item(), 10)
+        scores = score_documents(counts.drop("grade")).collect()
+        self.assertEqual(scores["unknown_share"].item(), 0.0)
+        self.assertEqual(scores["min_grade_90"].item(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
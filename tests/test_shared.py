@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from polars.testing import assert_frame_equal
+from src.xiwen.app import analyse_html
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.export import get_outliers_df
+from src.xiwen.utils.extract import filter_codepoints_from_html
+from src.xiwen.utils.hsk_hanzi import HSKHanzi
+from src.xiwen.utils.pinyin import map_pinyin
+from src.xiwen.utils.shared import (
+    HEADER,
+    PinyinTable,
+    attach_reference_tables,
+    detach_reference_tables,
+    get_reference_tables,
+    read_reference_tables,
+)
+from src.xiwen.utils.transform import partition_hanzi
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+TEST_CASES = ["bjzd.txt", "ttc.txt", "mix50.txt", "mix90.txt"]
+
+
+def read_text(test_case):
+    with open(os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING) as f:
+        return f.read()
+
+
+def attached_pid(_):
+    return os.getpid(), get_reference_tables() is not None
+
+
+class TestReferenceTables(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "tables.bin")
+        cls.tables = read_reference_tables(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def tearDown(self):
+        detach_reference_tables()
+
+    def test_generated(self):
+        """Test a missing tables file is generated"""
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_rebuilt_when_stale(self):
+        """Test files of another layout or from other assets are rebuilt"""
+        path = os.path.join(self.tmp.name, "stale.bin")
+        with open(self.path, "rb") as f:
+            current = f.read()
+        magic, version, *sizes, fingerprint = HEADER.unpack_from(current)
+        for header in (
+            HEADER.pack(magic, version, *sizes, bytes(16)),
+            HEADER.pack(magic, version - 1, *sizes, fingerprint),
+        ):
+            with open(path, "wb") as f:
+                f.write(header + current[HEADER.size :])
+            read_reference_tables(path)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), current)
+        with open(path, "wb") as f:
+            f.write(b"XW")
+        read_reference_tables(path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), current)
+
+    def test_grade_tables(self):
+        """Test grade tables match the HSK grade maps"""
+        for variant in ("Simplified", "Traditional", "Unknown"):
+            table = self.tables.grade_table(variant)
+            grade_map = HSKHanzi().get_HSK_grade_map(variant)
+            self.assertEqual(
+                {chr(code): grade for code, grade in enumerate(table) if grade},
+                grade_map,
+            )
+
+    def test_pinyin_table(self):
+        """Test the packed pinyin table matches the pinyin dict"""
+        pinyin = self.tables.pinyin
+        self.assertIsInstance(pinyin, PinyinTable)
+        self.assertEqual(dict(pinyin), map_pinyin())
+        self.assertNotIn("a", pinyin)
+        self.assertNotIn("爱爱", pinyin)
+
+    def test_attached_lookups(self):
+        """Test partitions and exports are unchanged with tables attached"""
+        codes = {t: filter_codepoints_from_html(read_text(t)) for t in TEST_CASES}
+        private = {t: partition_hanzi(c) for t, c in codes.items()}
+        attach_reference_tables(self.path)
+        self.assertIsInstance(map_pinyin(), PinyinTable)
+        for test_case, partitions in private.items():
+            self.assertEqual(partition_hanzi(codes[test_case]), partitions)
+            shared = get_outliers_df(partitions[2])
+            detach_reference_tables()
+            assert_frame_equal(shared, get_outliers_df(partitions[2]))
+            attach_reference_tables(self.path)
+
+    def test_process_pool(self):
+        """Test workers attach as a pool initializer"""
+        pool = ProcessPoolExecutor(
+            2,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=attach_reference_tables,
+            initargs=(self.path,),
+        )
+        html = read_text("bjzd.txt")
+        with pool:
+            self.assertTrue(all(a for _, a in pool.map(attached_pid, range(4))))
+            results = pool.submit(analyse_html, html, "text", None, False, True)
+            results = results.result()
+        expected = analyse_html(html, "text", compact=True)
+        assert_frame_equal(results[1], expected[1])
+        self.assertEqual(results[2], expected[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import pickle
+import unittest
+from src.xiwen.utils.analyse import analyse_hanzi
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.sketch import (
+    CountMinSketch,
+    HanziSketch,
+    HyperLogLog,
+    analyse_hanzi_approx,
+    hash64,
+)
+from src.xiwen.utils.transform import partition_hanzi
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+
+def load_hanzi(test_case: str) -> list[str]:
+    with open(os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING) as f:
+        return filter_hanzi_from_html(f.read())
+
+
+class TestHash64(unittest.TestCase):
+    def test_deterministic(self):
+        """Test hanzi and codepoints hash identically, seeds differ"""
+        self.assertEqual(hash64("中"), hash64(ord("中")))
+        self.assertNotEqual(hash64("中"), hash64("中", seed=1))
+        self.assertNotEqual(hash64("中文"), hash64("文中"))
+        self.assertLess(hash64(2**70), 2**64)
+
+
+class TestCountMinSketch(unittest.TestCase):
+    def test_error_bound(self):
+        """Test estimates never undercount and stay within the bound"""
+        hanzi = load_hanzi("bjzd.txt")
+        sketch = CountMinSketch(0.001, 0.01)
+        exact = dict()
+        for zi in hanzi:
+            sketch.add(zi)
+            exact[zi] = exact.get(zi, 0) + 1
+
+        self.assertEqual(sketch.total, len(hanzi))
+        for zi, count in exact.items():
+            self.assertGreaterEqual(sketch.estimate(zi), count)
+            self.assertLessEqual(sketch.estimate(zi), count + sketch.error_bound())
+
+    def test_merge(self):
+        """Test merged sketches equal one sketch over both inputs"""
+        a, b, both = (CountMinSketch(0.01, 0.01) for _ in range(3))
+        for i in range(1000):
+            (a if i % 2 else b).add(i % 37)
+            both.add(i % 37)
+        a.merge(b)
+        self.assertEqual(a.rows, both.rows)
+        self.assertEqual(a.total, both.total)
+        with self.assertRaises(ValueError):
+            a.merge(CountMinSketch(0.01, 0.01, seed=1))
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_accuracy(self):
+        """Test estimates within 4 standard errors across cardinalities"""
+        for n in [0, 10, 1000, 100000]:
+            hll = HyperLogLog(12)
+            for i in range(n):
+                hll.add(i)
+            self.assertLessEqual(abs(hll.count() - n), 4 * hll.relative_error() * n)
+
+    def test_merge(self):
+        """Test merged sketches estimate the union"""
+        a, b, both = (HyperLogLog(10) for _ in range(3))
+        for i in range(5000):
+            a.add(i)
+            b.add(i + 2500)
+        for i in range(7500):
+            both.add(i)
+        a.merge(b)
+        self.assertEqual(a.registers, both.registers)
+        with self.assertRaises(ValueError):
+            a.merge(HyperLogLog(11))
+
+    def test_from_error(self):
+        """Test sizing from a target error"""
+        self.assertLessEqual(HyperLogLog.from_error(0.02).relative_error(), 0.02)
+        self.assertEqual(HyperLogLog.from_error(10).precision, 4)
+
+
+class TestAnalyseHanziApprox(unittest.TestCase):
+    def test_matches_exact(self):
+        """Test approximate stats track the exact pipeline"""
+        for test_case in ["bjzd.txt", "ttc.txt", "mix90.txt", "mix10.txt"]:
+            hanzi = load_hanzi(test_case)
+            simplified, traditional, _ = partition_hanzi(hanzi)
+            _, exact_df, exact_variant = analyse_hanzi(hanzi, simplified, traditional)
+            stats_df, variant, errors = analyse_hanzi_approx(hanzi)
+
+            self.assertEqual(variant, exact_variant)
+            self.assertEqual(stats_df.schema, exact_df.schema)
+            self.assertEqual(
+                stats_df["HSK\nGrade"].to_list(), exact_df["HSK\nGrade"].to_list()
+            )
+            # Totals are exact, unique figures are estimates
+            self.assertEqual(
+                stats_df["No. Hanzi\n(Count)"].to_list(),
+                exact_df["No. Hanzi\n(Count)"].to_list(),
+            )
+            for estimate, actual in zip(
+                stats_df["Cumul.\nUnique"], exact_df["Cumul.\nUnique"]
+            ):
+                self.assertLessEqual(
+                    abs(estimate - actual), 4 * errors["unique"] * actual + 1
+                )
+
+    def test_shards_merge(self):
+        """Test sketches built per shard merge to the single-pass result"""
+        hanzi = load_hanzi("bjzd.txt")
+        single = HanziSketch()
+        single.update(hanzi)
+        shards = [HanziSketch(), HanziSketch()]
+        shards[0].update(hanzi[:5000])
+        shards[1].update(hanzi[5000:])
+        # Sketch state survives serialisation between processes
+        merged = pickle.loads(pickle.dumps(shards[0]))
+        merged.merge(shards[1])
+
+        self.assertEqual(merged.total, single.total)
+        self.assertEqual(merged.get_variant(), single.get_variant())
+        self.assertEqual(
+            merged.get_counts_per_hsk_grade("Simplified"),
+            single.get_counts_per_hsk_grade("Simplified"),
+        )
+        self.assertEqual(merged.estimate("老"), single.estimate("老"))
+
+    def test_pickled_state(self):
+        """Test pickled sketches carry no reference lookups"""
+        sketch = HanziSketch()
+        sketch.update(["爱"])
+        data = pickle.dumps(sketch)
+        self.assertNotIn("书".encode(), data)
+        self.assertEqual(
+            pickle.loads(data).get_counts_per_hsk_grade("Simplified")[1], [1, 1]
+        )
+
+    def test_no_hanzi(self):
+        """Test empty input is rejected"""
+        with self.assertRaises(ValueError):
+            analyse_hanzi_approx([])
+
+
+if __name__ == "__main__":
+    unittest.main()
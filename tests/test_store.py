@@ -0,0 +1,146 @@
+import glob
+import os
+import tempfile
+import unittest
+import polars as pl
+from array import array
+from datetime import datetime, timezone
+from unittest.mock import patch
+from src.xiwen.app import analyse_html, coordinator
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.store import (
+    ResultStore,
+    get_domain,
+    scan_counts,
+    scan_documents,
+)
+
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+
+with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+    SIMPLIFIED_HTML = f.read()
+with open(os.path.join(TEST_ASSETS, "ttc.txt"), "r", encoding=ENCODING) as f:
+    TRADITIONAL_HTML = f.read()
+
+_, SIMPLIFIED_STATS, SIMPLIFIED_HANZI, _, _ = analyse_html(SIMPLIFIED_HTML)
+_, TRADITIONAL_STATS, TRADITIONAL_HANZI, _, _ = analyse_html(TRADITIONAL_HTML)
+DAY1 = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+DAY2 = datetime(2024, 5, 2, 12, tzinfo=timezone.utc)
+
+
+def parquet_files(root):
+    return glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True)
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_examples(self, store):
+        store.add(
+            "https://a.com/1", SIMPLIFIED_HANZI, SIMPLIFIED_STATS, "Simplified", DAY1
+        )
+        store.add(
+            "https://b.org/2", TRADITIONAL_HANZI, TRADITIONAL_STATS, "Traditional", DAY2
+        )
+
+    def test_get_domain(self):
+        """Test URLs map to host names and paths to local"""
+        self.assertEqual(get_domain("https://Example.com:8080/a?b"), "example.com")
+        self.assertEqual(get_domain("/data/page.html"), "local")
+
+    def test_partitions(self):
+        """Test rows are written to date and domain partitions"""
+        with ResultStore(self.root) as store:
+            self.add_examples(store)
+        partitions = {
+            os.path.relpath(os.path.dirname(p), self.root)
+            for p in parquet_files(self.root)
+        }
+        self.assertEqual(
+            partitions,
+            {
+                os.path.join(dataset, date, domain)
+                for dataset in ["documents", "counts"]
+                for date, domain in [
+                    ("date=2024-05-01", "domain=a.com"),
+                    ("date=2024-05-02", "domain=b.org"),
+                ]
+            },
+        )
+
+    def test_documents(self):
+        """Test stats rows round-trip through the documents dataset"""
+        with ResultStore(self.root) as store:
+            self.add_examples(store)
+        documents = scan_documents(self.root).filter(pl.col("domain") == "a.com")
+        row = documents.collect().row(0, named=True)
+        self.assertEqual(row["url"], "https://a.com/1")
+        self.assertEqual(row["variant"], "Simplified")
+        self.assertEqual(row["date"], "2024-05-01")
+        self.assertEqual(row["total_count"], len(SIMPLIFIED_HANZI))
+        self.assertEqual(row["total_unique"], len(set(SIMPLIFIED_HANZI)))
+        stats = dict(SIMPLIFIED_STATS.select("HSK\nGrade", "No. Hanzi\n(Count)").rows())
+        self.assertEqual(row["hsk1_count"], stats[1])
+        self.assertEqual(row["beyond_count"], stats[10])
+
+    def test_counts(self):
+        """Test per-hanzi counts and grades are stored"""
+        with ResultStore(self.root) as store:
+            self.add_examples(store)
+        counts = scan_counts(self.root).filter(pl.col("url") == "https://a.com/1")
+        counts = counts.collect()
+        self.assertEqual(counts["count"].sum(), len(SIMPLIFIED_HANZI))
+        self.assertEqual(counts.height, len(set(SIMPLIFIED_HANZI)))
+        by_grade = counts.group_by("grade").agg(pl.col("count").sum())
+        self.assertEqual(
+            dict(by_grade.rows()),
+            dict(SIMPLIFIED_STATS.select("HSK\nGrade", "No. Hanzi\n(Count)").rows()),
+        )
+
+    def test_codepoints(self):
+        """Test codepoint arrays are stored as characters"""
+        codes = array("I", map(ord, SIMPLIFIED_HANZI))
+        with ResultStore(self.root) as store:
+            store.add("https://a.com/1", codes, SIMPLIFIED_STATS, "Simplified")
+        counts = scan_counts(self.root).collect()
+        self.assertEqual(counts.height, len(set(SIMPLIFIED_HANZI)))
+        self.assertEqual(set(counts["hanzi"]), set(SIMPLIFIED_HANZI))
+
+    def test_batching(self):
+        """Test nothing is written until a batch is full"""
+        store = ResultStore(self.root, batch_size=2)
+        store.add("https://a.com/1", SIMPLIFIED_HANZI, SIMPLIFIED_STATS, "Simplified")
+        self.assertEqual(parquet_files(self.root), [])
+        store.add("https://a.com/2", SIMPLIFIED_HANZI, SIMPLIFIED_STATS, "Simplified")
+        self.assertEqual(len(parquet_files(self.root)), 2)
+        self.assertEqual(scan_documents(self.root).collect().height, 2)
+
+    def test_max_rows(self):
+        """Test buffered count rows are bounded"""
+        store = ResultStore(self.root, max_rows=100)
+        store.add("https://a.com/1", SIMPLIFIED_HANZI, SIMPLIFIED_STATS, "Simplified")
+        self.assertEqual(len(parquet_files(self.root)), 2)
+        self.assertEqual(store.buffered_rows, 0)
+
+    def test_empty_store(self):
+        """Test scanning an empty store gives empty frames"""
+        self.assertEqual(scan_documents(self.root).collect().height, 0)
+        self.assertIn("domain", scan_counts(self.root).columns)
+
+    def test_coordinator(self):
+        """Test coordinator appends to a store"""
+        with patch("src.xiwen.app.fetch_html", return_value=SIMPLIFIED_HTML):
+            with ResultStore(self.root) as store:
+                coordinator("https://a.com/1", store=store)
+        documents = scan_documents(self.root).collect()
+        self.assertEqual(documents["url"].to_list(), ["https://a.com/1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.xiwen.app import analyse_html, analyse_path
+from src.xiwen.utils.config import ENCODING
+from src.xiwen.utils.extract import (
+    filter_codepoints_from_html,
+    read_codepoints,
+    to_hanzi,
+)
+from src.xiwen.utils.html import read_html
+from src.xiwen.utils.parse import parse_html
+from src.xiwen.utils.stream import (
+    DecompressionError,
+    detect_compression,
+    iter_text,
+    iter_unescaped,
+    open_stream,
+    zstandard,
+)
+
+TEST_ASSETS = os.path.abspath(os.path.join("tests", "assets"))
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstandard.ZstdCompressor().compress
+
+
+class StreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(TEST_ASSETS, "bjzd.txt"), "r", encoding=ENCODING) as f:
+            self.markup = f"<html><body><p>{f.read()}</p>&#x4e2d;&amp;</body></html>"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+
+class TestDetectCompression(StreamTestCase):
+    def test_magic_bytes(self):
+        """Test each format is recognised from its first bytes"""
+        data = self.markup.encode(ENCODING)
+        for compression, compress in COMPRESSORS.items():
+            self.assertEqual(detect_compression(compress(data)[:6]), compression)
+        self.assertIsNone(detect_compression(data[:6]))
+        self.assertIsNone(detect_compression(b""))
+
+    def test_open_stream(self):
+        """Test compressed and plain files read back identically"""
+        data = self.markup.encode(ENCODING)
+        paths = [self.write("plain.html", data)]
+        for compression, compress in COMPRESSORS.items():
+            paths.append(self.write(f"page.{compression}", compress(data)))
+        for path in paths:
+            with open_stream(path) as stream:
+                self.assertEqual(stream.read(), data)
+
+    def test_multi_member(self):
+        """Test concatenated gzip members are read through"""
+        path = self.write("pages.gz", gzip.compress(b"<p>a</p>") + gzip.compress(b"b"))
+        with open_stream(path) as stream:
+            self.assertEqual(stream.read(), b"<p>a</p>b")
+
+    @unittest.skipIf(zstandard is not None, "zstandard is installed")
+    def test_zstd_missing(self):
+        """Test Zstandard files need the optional dependency"""
+        path = self.write("page.zst", b"\x28\xb5\x2f\xfd" + bytes(16))
+        with self.assertRaises(DecompressionError):
+            open_stream(path)
+
+    def test_truncated(self):
+        """Test truncated and corrupt archives raise DecompressionError"""
+        data = self.markup.encode(ENCODING) * 20
+        for compression, compress in COMPRESSORS.items():
+            compressed = compress(data)
+            for name, damaged in [
+                ("truncated", compressed[: len(compressed) // 2]),
+                ("corrupt", compressed[:12] + bytes(64) + compressed[76:]),
+            ]:
+                path = self.write(f"{name}.{compression}", damaged)
+                with self.subTest(compression=compression, damage=name):
+                    with self.assertRaises(DecompressionError):
+                        with open_stream(path) as stream:
+                            stream.read()
+                    with self.assertRaises(DecompressionError):
+                        read_codepoints(path, chunk_size=1024)
+
+
+class TestIterText(StreamTestCase):
+    def test_chunk_boundaries(self):
+        """Test multi-byte characters split across chunks decode whole"""
+        path = self.write("page.gz", gzip.compress(self.markup.encode(ENCODING)))
+        self.assertEqual("".join(iter_text(path, chunk_size=7)), self.markup)
+
+    def test_legacy_encoding(self):
+        """Test the encoding is detected from the first chunk"""
+        text = "<p>中文的文字</p>" * 200
+        path = self.write("page.bz2", bz2.compress(text.encode("gb18030")))
+        self.assertEqual("".join(iter_text(path, chunk_size=64)), text)
+
+    def test_declared_encoding(self):
+        """Test a <meta> charset declaration is used"""
+        text = '<meta charset="big5"><p>繁體中文</p>'
+        path = self.write("page.html", text.encode("big5"))
+        self.assertEqual("".join(iter_text(path)), text)
+
+    def test_unescaped(self):
+        """Test character references split across chunks are decoded"""
+        chunks = ["<p>&#x4e", "2d;&#25", "991;&am", "p;&", "nbsp", "; a & b"]
+        self.assertEqual("".join(iter_unescaped(chunks)), "<p>中文&\xa0 a & b")
+
+
+class TestReadCodepoints(StreamTestCase):
+    def test_matches_text_parser(self):
+        """Test streamed extraction finds the same hanzi as the text parser"""
+        expected = filter_codepoints_from_html(parse_html(self.markup, "text"))
+        path = self.write("page.html.xz", lzma.compress(self.markup.encode(ENCODING)))
+        for chunk_size in (5, 1000, 1 << 16):
+            self.assertEqual(read_codepoints(path, chunk_size), expected)
+
+    def test_bounded_reads(self):
+        """Test the file is read in chunks, never in full"""
+        path = self.write("page.gz", gzip.compress(self.markup.encode(ENCODING)))
+        reads = []
+        read = gzip.GzipFile.read
+
+        def record(stream, size=-1):
+            reads.append(size)
+            return read(stream, size)
+
+        with patch.object(gzip.GzipFile, "read", record):
+            read_codepoints(path, chunk_size=4096)
+        self.assertGreater(len(reads), 2)
+        self.assertTrue(all(0 < size <= 4096 for size in reads))
+
+    def test_read_html(self):
+        """Test read_html decompresses transparently"""
+        path = self.write("page.bz2", bz2.compress(self.markup.encode(ENCODING)))
+        self.assertEqual(read_html(path), self.markup)
+
+
+class TestAnalysePath(StreamTestCase):
+    def test_matches_analyse_html(self):
+        """Test a compressed file gives the same results as its markup"""
+        path = self.write("page.gz", gzip.compress(self.markup.encode(ENCODING)))
+        expected = analyse_html(self.markup, "text")
+        for compact in (False, True):
+            result = analyse_path(path, compact=compact)
+            self.assertEqual(result[4], expected[4])
+            self.assertEqual(result[1].rows(), expected[1].rows())
+            self.assertEqual(to_hanzi(result[2]), expected[2])
+
+    def test_empty(self):
+        """Test files without HSK hanzi return None"""
+        path = self.write("empty.gz", gzip.compress(b"<p>no hanzi</p>"))
+        self.assertIsNone(analyse_path(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
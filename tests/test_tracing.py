@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+import requests
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.xiwen.app import analyse_html, coordinator
+from src.xiwen.utils.scheduler import FetchError, FetchScheduler
+from src.xiwen.utils.tracing import configure_tracing, disable_tracing, span
+from tests.helpers import FakeResponse
+from tests.test_app import PAGES, collect
+
+ASSETS_DIR = os.path.abspath(os.path.join("tests", "assets"))
+URL = "https://example.com/page"
+
+
+def read_traces(path):
+    """Spans of each written trace, keyed by name"""
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+
+    return [
+        {s["name"]: s for s in line["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+        for line in lines
+    ]
+
+
+def attributes(otlp_span):
+    return {a["key"]: list(a["value"].values())[0] for a in otlp_span["attributes"]}
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "traces.jsonl")
+
+    def tearDown(self):
+        disable_tracing()
+        self.tmp.cleanup()
+
+
+class TestSpan(TracingTestCase):
+    def test_disabled(self):
+        """Test nothing is written while tracing is off"""
+        with span("root", url=URL) as s:
+            s.set_attribute("hanzi", 1)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_nesting(self):
+        """Test child spans share the trace and point to their parent"""
+        configure_tracing(self.path, sample_rate=1.0)
+        with span("root", url=URL):
+            with span("child") as child:
+                child.set_attribute("hanzi", 3)
+        (trace,) = read_traces(self.path)
+        root, child = trace["root"], trace["child"]
+        self.assertEqual(root["traceId"], child["traceId"])
+        self.assertEqual(child["parentSpanId"], root["spanId"])
+        self.assertNotIn("parentSpanId", root)
+        self.assertEqual(attributes(root), {"url": URL})
+        self.assertEqual(attributes(child), {"hanzi": "3"})
+        self.assertLessEqual(
+            int(root["startTimeUnixNano"]), int(child["startTimeUnixNano"])
+        )
+        self.assertGreaterEqual(
+            int(root["endTimeUnixNano"]), int(child["endTimeUnixNano"])
+        )
+
+    def test_error(self):
+        """Test exceptions mark the span as failed and propagate"""
+        configure_tracing(self.path, sample_rate=1.0)
+        with self.assertRaises(ValueError):
+            with span("root"):
+                raise ValueError("bad")
+        (trace,) = read_traces(self.path)
+        self.assertEqual(
+            trace["root"]["status"], {"code": 2, "message": "ValueError: bad"}
+        )
+
+    def test_sampling(self):
+        """Test unsampled traces are dropped unless they are slow"""
+        configure_tracing(self.path, sample_rate=0.0, slow_threshold=None)
+        with span("root"):
+            pass
+        self.assertFalse(os.path.exists(self.path))
+
+        configure_tracing(self.path, sample_rate=0.0, slow_threshold=0.0)
+        with span("root"):
+            pass
+        self.assertEqual(len(read_traces(self.path)), 1)
+
+    def test_invalid_sample_rate(self):
+        """Test sample rates outside 0 to 1 are rejected"""
+        with self.assertRaises(ValueError):
+            configure_tracing(self.path, sample_rate=1.5)
+
+
+class TestPipelineSpans(TracingTestCase):
+    def test_analyse_html(self):
+        """Test pipeline stages are traced with document attributes"""
+        configure_tracing(self.path, sample_rate=1.0)
+        with open(os.path.join(ASSETS_DIR, "bjzd.txt"), encoding="utf-8") as f:
+            markup = f"<p>{f.read()}</p>"
+        hanzi_df, stats_df, hanzi_list, outliers, variant = analyse_html(markup)
+        (trace,) = read_traces(self.path)
+        for name in ("parse", "extract", "partition", "analyse"):
+            self.assertEqual(
+                trace[name]["parentSpanId"], trace["analyse_html"]["spanId"]
+            )
+        document = attributes(trace["analyse_html"])
+        self.assertEqual(document["bytes"], str(len(markup)))
+        self.assertEqual(document["hanzi"], str(len(hanzi_list)))
+        self.assertEqual(document["variant"], variant)
+
+    def test_fetch_retries(self):
+        """Test each fetch attempt is traced within the fetch"""
+        configure_tracing(self.path, sample_rate=1.0)
+        outcomes = [FakeResponse(503), FakeResponse(200)]
+        scheduler = FetchScheduler(
+            rate=1000, burst=1000, backoff_base=0.001, send=lambda url: outcomes.pop(0)
+        )
+        with patch("src.xiwen.utils.html.get_scheduler", return_value=scheduler):
+            coordinator(URL)
+        with open(self.path, encoding="utf-8") as f:
+            (line,) = f.read().splitlines()
+        spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        by_id = {s["spanId"]: s for s in spans}
+        attempts = [s for s in spans if s["name"] == "fetch.attempt"]
+        self.assertEqual(
+            [attributes(s)["http.status_code"] for s in attempts], ["503", "200"]
+        )
+        for attempt in attempts:
+            self.assertEqual(by_id[attempt["parentSpanId"]]["name"], "fetch")
+        fetch = next(s for s in spans if s["name"] == "fetch")
+        self.assertEqual(by_id[fetch["parentSpanId"]]["name"], "coordinator")
+        self.assertEqual(attributes(fetch)["url"], URL)
+
+    def test_fetch_error(self):
+        """Test a failed fetch is traced as an error"""
+        configure_tracing(self.path, sample_rate=1.0)
+
+        def timeout(url):
+            raise requests.Timeout("timed out")
+
+        scheduler = FetchScheduler(max_retries=1, send=timeout)
+        with self.assertRaises(FetchError):
+            scheduler.fetch(URL)
+        (trace,) = read_traces(self.path)
+        self.assertEqual(trace["fetch"]["status"]["code"], 2)
+        self.assertEqual(attributes(trace["fetch.attempt"])["error"], "Timeout")
+
+    def test_async_pipeline(self):
+        """Test each URL is one trace, including spans from worker processes"""
+        configure_tracing(self.path, sample_rate=1.0)
+        results = asyncio.run(collect(PAGES, fetch_workers=2))
+        with open(self.path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), len(PAGES))
+        traces = dict()
+        for line in lines:
+            spans = line["resourceSpans"][0]["scopeSpans"][0]["spans"]
+            self.assertEqual(len({s["traceId"] for s in spans}), 1)
+            by_id = {s["spanId"]: s for s in spans}
+            for otlp_span in spans:
+                if otlp_span["name"] != "document":
+                    self.assertIn(otlp_span["parentSpanId"], by_id)
+            (root,) = [s for s in spans if "parentSpanId" not in s]
+            self.assertEqual(root["name"], "document")
+            traces[attributes(root)["url"]] = {s["name"] for s in spans}
+        for url, result in results.items():
+            if isinstance(result, FetchError):
+                self.assertNotIn("analyse_html", traces[url])
+            else:
+                self.assertIn("fetch.attempt", traces[url])
+                self.assertIn("extract", traces[url])
+        self.assertIn("analyse", traces["https://example.com/bjzd"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
 import os
 import unittest
+from array import array
 from src.xiwen.utils.config import ENCODING
-from src.xiwen.utils.extract import filter_hanzi_from_html
+from src.xiwen.utils.extract import (
+    filter_codepoints_from_html,
+    filter_hanzi_from_html,
+    to_hanzi,
+)
 from src.xiwen.utils.transform import partition_hanzi
 
 
@@ -95,6 +100,23 @@ class TestPartitionHanzi(unittest.TestCase):
             self.assertEqual(len(trad), TEST_CASES[test_case][4])
             self.assertEqual(len(outliers), TEST_CASES[test_case][5])
 
+    def test_codepoints(self):
+        """Test codepoint arrays partition into matching codepoint arrays"""
+        for test_case in TEST_CASES.keys():
+            with open(
+                os.path.join(TEST_ASSETS, test_case), "r", encoding=ENCODING
+            ) as f:
+                text = f.read()
+            hanzi = filter_hanzi_from_html(text)
+            codes = filter_codepoints_from_html(text)
+            for variant in (None, "Simplified", "Traditional"):
+                parts = partition_hanzi(codes, variant=variant)
+                self.assertTrue(all(isinstance(p, array) for p in parts))
+                self.assertEqual(
+                    [to_hanzi(p) for p in parts],
+                    list(partition_hanzi(hanzi, variant=variant)),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,157 @@
+import gzip
+import io
+import os
+import re
+import tempfile
+import unittest
+import zlib
+from src.xiwen.utils.warc import (
+    WarcFormatError,
+    dechunk,
+    iter_warc_responses,
+    parse_http_response,
+    read_header_block,
+)
+
+
+def http_response(
+    body: bytes, headers: str = "Content-Type: text/html", status: str = "200 OK"
+) -> bytes:
+    return f"HTTP/1.1 {status}\r\n{headers}\r\n\r\n".encode() + body
+
+
+def warc_record(block: bytes, uri: str, warc_type: str = "response") -> bytes:
+    """A WARC record, gzipped on its own as in Common Crawl archives"""
+    content_type = "application/http; msgtype=response"
+    if warc_type != "response":
+        content_type = "application/json"
+    head = (
+        f"WARC/1.0\r\nWARC-Type: {warc_type}\r\nWARC-Target-URI: {uri}\r\n"
+        f"Content-Type: {content_type}\r\nContent-Length: {len(block)}\r\n\r\n"
+    )
+
+    return gzip.compress(head.encode() + block + b"\r\n\r\n")
+
+
+def write_warc(directory: str, name: str, records: list[bytes]) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"".join(records))
+    return path
+
+
+class TestParseHTTPResponse(unittest.TestCase):
+    def test_plain(self):
+        """Test headers are lowercased and the body returned as is"""
+        headers, body = parse_http_response(http_response("<p>中文</p>".encode()))
+        self.assertEqual(headers["content-type"], "text/html")
+        self.assertEqual(body, "<p>中文</p>".encode())
+
+    def test_encodings(self):
+        """Test chunked and compressed bodies are decoded"""
+        body = "<p>中文</p>".encode()
+        chunked = b"4\r\n" + body[:4] + b"\r\n9;ext=1\r\n" + body[4:] + b"\r\n0\r\n\r\n"
+        self.assertEqual(dechunk(chunked), body)
+        response = http_response(chunked, "Transfer-Encoding: chunked")
+        self.assertEqual(parse_http_response(response)[1], body)
+        response = http_response(gzip.compress(body), "Content-Encoding: gzip")
+        self.assertEqual(parse_http_response(response)[1], body)
+        response = http_response(zlib.compress(body), "Content-Encoding: deflate")
+        self.assertEqual(parse_http_response(response)[1], body)
+
+    def test_skipped(self):
+        """Test failed and undecodable responses are skipped"""
+        self.assertIsNone(parse_http_response(http_response(b"", status="404 NF")))
+        self.assertIsNone(
+            parse_http_response(http_response(b"x", "Content-Encoding: br"))
+        )
+        self.assertIsNone(
+            parse_http_response(http_response(b"x", "Content-Encoding: gzip"))
+        )
+        self.assertIsNone(parse_http_response(b""))
+
+    def test_inflation_limit(self):
+        """Test compressed payloads inflating past max_payload are skipped"""
+        body = b"<p>" + b"a" * 100_000 + b"</p>"
+        for encoding, compressed in (
+            ("gzip", gzip.compress(body)),
+            ("deflate", zlib.compress(body)),
+        ):
+            response = http_response(compressed, f"Content-Encoding: {encoding}")
+            self.assertEqual(parse_http_response(response, len(body))[1], body)
+            self.assertIsNone(parse_http_response(response, len(body) - 1))
+
+
+class TestIterWarcResponses(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_responses(self):
+        """Test only HTML and text responses are yielded, in order"""
+        path = write_warc(
+            self.tmp.name,
+            "crawl.warc.gz",
+            [
+                warc_record(b'{"a": 1}', "https://a.cn", "metadata"),
+                warc_record(http_response("<p>中文</p>".encode()), "https://b.cn"),
+                warc_record(http_response(b"\x89PNG", "Content-Type: image/png"), "c"),
+                warc_record(
+                    http_response("繁體".encode(), "Content-Type: text/plain"), "d"
+                ),
+                warc_record(b"GET / HTTP/1.1\r\n\r\n", "https://e.cn", "request"),
+            ],
+        )
+        records = list(iter_warc_responses(path))
+        self.assertEqual([uri for uri, _, _ in records], ["https://b.cn", "d"])
+        self.assertEqual(records[0][1], "<p>中文</p>".encode())
+        self.assertEqual(records[1][2]["content-type"], "text/plain")
+
+    def test_max_payload(self):
+        """Test oversized records are skipped"""
+        block = http_response(b"<p>" + "中".encode() * 1000 + b"</p>")
+        path = write_warc(self.tmp.name, "big.warc.gz", [warc_record(block, "a")])
+        self.assertEqual(len(list(iter_warc_responses(path, len(block)))), 1)
+        self.assertEqual(list(iter_warc_responses(path, len(block) - 1)), [])
+
+    def test_uncompressed(self):
+        """Test plain WARC files are read too"""
+        record = gzip.decompress(warc_record(http_response(b"<p>a</p>"), "a"))
+        path = write_warc(self.tmp.name, "plain.warc", [record, record])
+        self.assertEqual(len(list(iter_warc_responses(path))), 2)
+
+    def test_malformed(self):
+        """Test non-WARC and truncated files raise WarcFormatError"""
+        path = write_warc(self.tmp.name, "page.html", [b"<html></html>\r\n\r\n"])
+        with self.assertRaises(WarcFormatError):
+            list(iter_warc_responses(path))
+        record = gzip.decompress(warc_record(b'{"a": 1}', "a", "metadata"))
+        path = write_warc(self.tmp.name, "cut.warc", [record[:-10]])
+        with self.assertRaises(WarcFormatError):
+            list(iter_warc_responses(path))
+
+    def test_negative_length(self):
+        """Test a negative Content-Length raises WarcFormatError"""
+        record = gzip.decompress(warc_record(http_response(b"<p>a</p>"), "a"))
+        record = re.sub(rb"Content-Length: \d+", b"Content-Length: -1", record)
+        path = write_warc(self.tmp.name, "negative.warc", [record, record])
+        with self.assertRaises(WarcFormatError):
+            list(iter_warc_responses(path))
+
+    def test_header_limit(self):
+        """Test header blocks over the limit raise WarcFormatError"""
+        record = gzip.decompress(warc_record(b'{"a": 1}', "a", "metadata"))
+        head = record[: record.index(b"\r\n\r\n") + 4]
+        self.assertEqual(read_header_block(io.BytesIO(head), len(head))[0], "WARC/1.0")
+        for block in (head, b"x" * len(head)):
+            with self.assertRaises(WarcFormatError):
+                read_header_block(io.BytesIO(block), len(head) - 1)
+        path = write_warc(self.tmp.name, "binary.warc", [b"\x00" * 200_000])
+        with self.assertRaises(WarcFormatError):
+            list(iter_warc_responses(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from src.xiwen.utils.cache import cached, clear_cached, get_cached
+from src.xiwen.utils.hsk_hanzi import get_hsk_lookup, get_hsk_rows, load_hsk_hanzi
+from src.xiwen.utils.pinyin import map_pinyin, read_pinyin
+from src.xiwen.utils.shared import PinyinTable, detach_reference_tables
+from src.xiwen.utils.warm import load_snapshot, save_snapshot, warm_up
+
+
+def cached_names():
+    return {name.rpartition(".")[2] for name, _ in get_cached()}
+
+
+class TestCached(unittest.TestCase):
+    def test_calls_once_per_arguments(self):
+        """Test results are computed once per argument tuple"""
+        calls = []
+
+        @cached
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        self.assertEqual([square(2), square(2), square(3)], [4, 4, 9])
+        self.assertEqual(calls, [2, 3])
+
+    def test_keyword_and_default_arguments(self):
+        """Test keyword and default arguments share the positional entry"""
+        calls = []
+
+        @cached
+        def power(x, exponent=2):
+            calls.append((x, exponent))
+            return x**exponent
+
+        self.assertEqual([power(3), power(3, 2), power(x=3, exponent=2)], [9, 9, 9])
+        self.assertEqual(power(2, exponent=3), 8)
+        self.assertEqual(calls, [(3, 2), (2, 3)])
+        self.assertIs(get_hsk_lookup(codepoints=True), get_hsk_lookup(True))
+        self.assertIs(get_hsk_lookup(), get_hsk_lookup(False))
+
+
+class TestWarmUp(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "warm.pkl")
+
+    def tearDown(self):
+        detach_reference_tables()
+        self.tmp.cleanup()
+
+    def test_warm_up(self):
+        """Test all reference data is cached"""
+        clear_cached()
+        warm_up()
+        self.assertEqual(
+            cached_names(),
+            {
+                "load_hsk_hanzi",
+                "get_exclusive_hanzi",
+                "get_hsk_grade_map",
+                "get_hsk_lookup",
+                "get_hsk_rows",
+                "read_pinyin",
+                "get_reference_scores",
+            },
+        )
+
+    def test_snapshot(self):
+        """Test a snapshot restores the cache without recomputing"""
+        save_snapshot(self.path)
+        saved = get_cached()
+        clear_cached()
+        self.assertTrue(load_snapshot(self.path))
+        self.assertEqual(
+            {name for name, _ in saved} - {name for name, _ in get_cached()},
+            {load_hsk_hanzi.cache_name, read_pinyin.cache_name},
+        )
+        rows = get_cached()[(get_hsk_rows.__module__ + ".get_hsk_rows", ("Unknown",))]
+        self.assertIs(get_hsk_rows("Unknown"), rows)
+        self.assertIsInstance(map_pinyin(), PinyinTable)
+        self.assertEqual(
+            dict(map_pinyin()), saved[(read_pinyin.__module__ + ".read_pinyin", ())]
+        )
+
+    def test_stale_snapshot(self):
+        """Test a snapshot from other assets or versions is not restored"""
+        save_snapshot(self.path)
+        clear_cached()
+        with patch(
+            "src.xiwen.utils.warm.get_snapshot_fingerprint", return_value=bytes(16)
+        ):
+            with self.assertLogs("src.xiwen.utils.warm", "WARNING"):
+                self.assertFalse(load_snapshot(self.path))
+        self.assertEqual(cached_names(), set())
+
+    def test_process_pool(self):
+        """Test spawned workers start with the snapshot loaded"""
+        save_snapshot(self.path)
+        pool = ProcessPoolExecutor(
+            1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=load_snapshot,
+            initargs=(self.path,),
+        )
+        with pool:
+            names = pool.submit(cached_names).result()
+        self.assertNotIn("read_pinyin", names)
+        self.assertIn("get_hsk_rows", names)
+
+
+if __name__ == "__main__":
+    unittest.main()